@@ -13,12 +13,15 @@
 -- =====================================================
 
 -- =====================================================
--- 1. Regional Delay Predictions Table
+-- 1. Regional Delay Predictions Table (history)
 -- =====================================================
+-- prediction_created_at の日単位（UTC）でレンジパーティション分割。
+-- バッチジョブが保存前にパーティションを作成し、保持期間を過ぎたパーティションを削除する
+DROP VIEW IF EXISTS gtfs_realtime.regional_predictions_latest;
 DROP TABLE IF EXISTS gtfs_realtime.regional_delay_predictions;
 
 CREATE TABLE IF NOT EXISTS gtfs_realtime.regional_delay_predictions (
-    prediction_id BIGSERIAL PRIMARY KEY,
+    prediction_id BIGSERIAL,
     -- メタデータ
     region_id VARCHAR(50) NOT NULL,
     route_id VARCHAR(20) NOT NULL,
@@ -50,11 +53,12 @@ CREATE TABLE IF NOT EXISTS gtfs_realtime.regional_delay_predictions (
     prediction_execution_time_ms INTEGER,  -- 予測実行時間（ミリ秒）
     -- データ管理
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    -- 制約
+    -- 制約（パーティションキーを主キーに含める）
+    PRIMARY KEY (prediction_id, prediction_created_at),
     CONSTRAINT fk_region FOREIGN KEY (region_id)
         REFERENCES gtfs_static.regions(region_id) ON DELETE CASCADE,
     CONSTRAINT check_hour_offset CHECK (prediction_hour_offset IN (1, 2, 3))
-);
+) PARTITION BY RANGE (prediction_created_at);
 
 -- =====================================================
 -- 2. Indexes for Performance
@@ -77,9 +81,165 @@ COMMENT ON COLUMN gtfs_realtime.regional_delay_predictions.confidence_score
     IS '予測信頼度スコア（0.0-1.0、将来の拡張用）';
 
 -- =====================================================
--- 3. Latest Predictions View (for API)
+-- 3. Partition Maintenance
 -- =====================================================
-drop view if exists gtfs_realtime.regional_predictions_latest;
+
+-- from_time〜to_time を含む日（UTC）のパーティションを作成（既存はスキップ）
+CREATE OR REPLACE FUNCTION gtfs_realtime.ensure_regional_prediction_partitions(
+    from_time TIMESTAMPTZ,
+    to_time TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    partition_day DATE;
+    last_day DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    partition_day := (from_time AT TIME ZONE 'UTC')::DATE;
+    last_day := (COALESCE(to_time, from_time) AT TIME ZONE 'UTC')::DATE;
+    WHILE partition_day <= last_day LOOP
+        partition_name := 'regional_delay_predictions_' || TO_CHAR(partition_day, 'YYYYMMDD');
+        IF TO_REGCLASS('gtfs_realtime.' || partition_name) IS NULL THEN
+            EXECUTE FORMAT(
+                'CREATE TABLE gtfs_realtime.%I PARTITION OF gtfs_realtime.regional_delay_predictions '
+                'FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                partition_day::TIMESTAMP AT TIME ZONE 'UTC',
+                (partition_day + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        partition_day := partition_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- retention_days 日より前（UTC）のパーティションを削除（DELETE + VACUUM の代わり）
+CREATE OR REPLACE FUNCTION gtfs_realtime.drop_regional_prediction_partitions(retention_days INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    cutoff DATE;
+    partition_name TEXT;
+    dropped INTEGER := 0;
+BEGIN
+    cutoff := (NOW() AT TIME ZONE 'UTC')::DATE - retention_days;
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        INNER JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'gtfs_realtime.regional_delay_predictions'::REGCLASS
+            AND c.relname ~ '^regional_delay_predictions_[0-9]{8}$'
+            AND TO_DATE(RIGHT(c.relname, 8), 'YYYYMMDD') < cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE FORMAT('DROP TABLE gtfs_realtime.%I', partition_name);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
+SELECT gtfs_realtime.ensure_regional_prediction_partitions(NOW(), NOW() + INTERVAL '1 day');
+
+-- =====================================================
+-- 4. Current Predictions Table (for API)
+-- =====================================================
+-- 各 (route_id, stop_id, stop_sequence, direction_id) の最新の予測のみを保持。
+-- バッチジョブが予測の保存と同じトランザクションで作り直す:
+--   1. prepare_regional_predictions_staging() でステージングテーブルを作成
+--   2. 今回の予測をステージングテーブルに COPY
+--   3. swap_regional_predictions_current() で今回予測しなかったキーの行を引き継ぎ、
+--      インデックスを作成してテーブル名を入れ替え
+-- APIは入れ替え前後どちらかの完全な予測セットのみを参照する
+
+CREATE OR REPLACE FUNCTION gtfs_realtime.prepare_regional_predictions_staging()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DROP TABLE IF EXISTS gtfs_realtime.regional_predictions_current_staging;
+    CREATE TABLE gtfs_realtime.regional_predictions_current_staging (
+        region_id VARCHAR(50) NOT NULL,
+        route_id VARCHAR(20) NOT NULL,
+        direction_id INTEGER NOT NULL,
+        stop_id VARCHAR(20) NOT NULL,
+        stop_name VARCHAR(255),
+        stop_lat NUMERIC(10, 6),
+        stop_lon NUMERIC(11, 6),
+        stop_sequence INTEGER,
+        prediction_created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        prediction_target_time TIMESTAMP WITH TIME ZONE NOT NULL,
+        prediction_hour_offset INTEGER NOT NULL,
+        predicted_delay_seconds NUMERIC(10, 2) NOT NULL,
+        predicted_delay_minutes NUMERIC(8, 2) NOT NULL,
+        model_version VARCHAR(100)
+    );
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION gtfs_realtime.swap_regional_predictions_current()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    row_cnt BIGINT;
+BEGIN
+    IF TO_REGCLASS('gtfs_realtime.regional_predictions_current') IS NOT NULL THEN
+        -- 今回予測しなかったキー（インクリメンタルモードの引き継ぎ、対象外の地域）は前回の予測を残す
+        INSERT INTO gtfs_realtime.regional_predictions_current_staging
+        SELECT c.*
+        FROM gtfs_realtime.regional_predictions_current c
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM gtfs_realtime.regional_predictions_current_staging s
+            WHERE s.route_id = c.route_id
+                AND s.stop_id = c.stop_id
+                AND s.stop_sequence IS NOT DISTINCT FROM c.stop_sequence
+                AND s.direction_id = c.direction_id
+        );
+        DROP TABLE gtfs_realtime.regional_predictions_current;
+    END IF;
+
+    ALTER TABLE gtfs_realtime.regional_predictions_current_staging
+        RENAME TO regional_predictions_current;
+
+    -- 地域別（ORDER BY と同じ順序）
+    CREATE INDEX idx_regional_predictions_current_region
+        ON gtfs_realtime.regional_predictions_current(
+            region_id, route_id, direction_id, stop_id, prediction_hour_offset
+        );
+    -- バス停別（stop_sequence と予測対象時刻で結合）
+    CREATE INDEX idx_regional_predictions_current_stop
+        ON gtfs_realtime.regional_predictions_current(stop_id, stop_sequence, prediction_target_time);
+    -- バス停・路線別
+    CREATE INDEX idx_regional_predictions_current_stop_route
+        ON gtfs_realtime.regional_predictions_current(stop_id, route_id, prediction_target_time);
+
+    ANALYZE gtfs_realtime.regional_predictions_current;
+    SELECT COUNT(*) INTO row_cnt FROM gtfs_realtime.regional_predictions_current;
+    RETURN row_cnt;
+END;
+$$;
+
+-- 空の regional_predictions_current を作成
+DROP TABLE IF EXISTS gtfs_realtime.regional_predictions_current;
+SELECT gtfs_realtime.prepare_regional_predictions_staging();
+SELECT gtfs_realtime.swap_regional_predictions_current();
+
+COMMENT ON TABLE gtfs_realtime.regional_predictions_current
+    IS '各バス停・路線の最新予測（API用、バッチジョブが予測の保存ごとに入れ替え）';
+
+-- =====================================================
+-- 5. Latest Predictions View (ad-hoc queries over the history)
+-- =====================================================
+-- regional_predictions_current と同じ行を履歴テーブルから集計する（保持期間内の予測のみ）。
+-- APIは regional_predictions_current を参照する
 CREATE OR REPLACE VIEW gtfs_realtime.regional_predictions_latest AS
 WITH latest_batch AS (
     SELECT route_id, stop_id, stop_sequence, direction_id, MAX(prediction_created_at) as latest_time
@@ -93,10 +253,15 @@ SELECT
     p.direction_id,
     p.stop_id,
     p.stop_name,
+    p.stop_lat,
+    p.stop_lon,
     p.stop_sequence,
+    p.prediction_created_at,
     p.prediction_target_time,
+    p.prediction_hour_offset,
     p.predicted_delay_seconds,
-    p.predicted_delay_minutes
+    p.predicted_delay_minutes,
+    p.model_version
 FROM gtfs_realtime.regional_delay_predictions p
 INNER JOIN latest_batch lb
     ON p.stop_id = lb.stop_id
@@ -107,4 +272,4 @@ INNER JOIN latest_batch lb
 ORDER BY p.region_id, p.route_id, p.direction_id, p.stop_id, p.prediction_hour_offset;
 
 COMMENT ON VIEW gtfs_realtime.regional_predictions_latest
-    IS '各地域の最新予測バッチのみを表示（API用）';
\ No newline at end of file
+    IS '各地域の最新予測バッチのみを表示（履歴からの集計、APIは regional_predictions_current を参照）';
\ No newline at end of file
@@ -0,0 +1,142 @@
+-- =====================================================
+-- Stop Departures Table (precomputed timetable for the stop endpoints)
+-- =====================================================
+--
+-- Purpose: Scheduled arrivals per stop with the absolute timestamp, for the
+--          service days around today. The stop prediction API reads it with an
+--          index range scan on (stop_id, scheduled_ts) instead of joining
+--          gtfs_stop_times, gtfs_trips_static and gtfs_active_service_dates_mv
+--          and calling get_stop_actual_time for every row on each request.
+--
+-- Prerequisites:
+--   1. DB/01_create_gtfs_static_tables.sql executed (get_stop_actual_time)
+--   2. DB/04_create_enriched_materialized_views.sql executed (gtfs_active_service_dates_mv)
+--
+-- Refresh:
+--   python batch/run.py refresh-departures (after load-static and once a day)
+--
+-- Usage:
+--   psql -d <database> -f DB/08_create_stop_departures_table.sql
+-- =====================================================
+
+-- =====================================================
+-- 1. Stop Departures Table
+-- =====================================================
+DROP TABLE IF EXISTS gtfs_static.gtfs_stop_departures;
+
+CREATE TABLE IF NOT EXISTS gtfs_static.gtfs_stop_departures (
+    service_date DATE NOT NULL,
+    stop_id VARCHAR(20) NOT NULL,
+    route_id VARCHAR(20),
+    trip_id VARCHAR(20) NOT NULL,
+    service_id VARCHAR(20),
+    direction_id INTEGER,
+    trip_headsign VARCHAR(100),
+    stop_sequence INTEGER NOT NULL,
+    arrival_time TIME WITHOUT TIME ZONE,
+    arrival_day_offset INTEGER,
+    -- get_stop_actual_time(service_date, arrival_time, arrival_day_offset)
+    scheduled_ts TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (service_date, trip_id, stop_sequence)
+);
+
+-- =====================================================
+-- 2. Indexes for Performance
+-- =====================================================
+
+-- 停留所の次の到着（/stops/{stop_id}/predictions）
+CREATE INDEX IF NOT EXISTS idx_stop_departures_stop_time
+    ON gtfs_static.gtfs_stop_departures(stop_id, scheduled_ts);
+
+-- 停留所・路線の到着（/stops/{stop_id}/routes/{route_id}/predictions）
+CREATE INDEX IF NOT EXISTS idx_stop_departures_stop_route_time
+    ON gtfs_static.gtfs_stop_departures(stop_id, route_id, scheduled_ts);
+
+COMMENT ON TABLE gtfs_static.gtfs_stop_departures
+    IS '停留所ごとの時刻表（前日〜翌日の運行日、到着時刻は絶対時刻）。refresh_stop_departures() で作り直す';
+
+COMMENT ON COLUMN gtfs_static.gtfs_stop_departures.scheduled_ts
+    IS '予定到着時刻（運行日・到着時刻・日付オフセットから計算した timestamptz）';
+
+-- =====================================================
+-- 3. Refresh Function
+-- =====================================================
+-- 今日（バンクーバー時刻）の days_back 日前〜 days_ahead 日後の運行日で作り直す。
+-- 1トランザクションで DELETE + INSERT するため、APIは作り直し前後どちらかの時刻表を参照する。
+-- 翌日分も作成するため、日次の更新が遅れても当日の時刻表は存在する
+
+CREATE OR REPLACE FUNCTION gtfs_static.refresh_stop_departures(
+    days_back INTEGER DEFAULT 1,
+    days_ahead INTEGER DEFAULT 1
+)
+RETURNS TABLE(
+    status TEXT,
+    rows_affected BIGINT,
+    execution_time INTERVAL
+) AS $$
+DECLARE
+    start_time TIMESTAMP;
+    end_time TIMESTAMP;
+    today DATE;
+    row_count BIGINT;
+BEGIN
+    start_time := clock_timestamp();
+    today := (NOW() AT TIME ZONE 'America/Vancouver')::DATE;
+
+    DELETE FROM gtfs_static.gtfs_stop_departures;
+
+    INSERT INTO gtfs_static.gtfs_stop_departures (
+        service_date, stop_id, route_id, trip_id, service_id, direction_id, trip_headsign,
+        stop_sequence, arrival_time, arrival_day_offset, scheduled_ts
+    )
+    SELECT
+        asd.service_date,
+        st.stop_id,
+        trip.route_id,
+        st.trip_id,
+        trip.service_id,
+        trip.direction_id,
+        trip.trip_headsign,
+        st.stop_sequence,
+        st.arrival_time,
+        st.arrival_day_offset,
+        gtfs_static.get_stop_actual_time(asd.service_date, st.arrival_time, st.arrival_day_offset)
+    FROM gtfs_static.gtfs_active_service_dates_mv asd
+    INNER JOIN gtfs_static.gtfs_trips_static trip
+        ON trip.service_id = asd.service_id
+    INNER JOIN gtfs_static.gtfs_stop_times st
+        ON st.trip_id = trip.trip_id
+    WHERE asd.service_date BETWEEN today - days_back AND today + days_ahead
+        AND st.stop_id IS NOT NULL
+        AND st.arrival_time IS NOT NULL;
+
+    GET DIAGNOSTICS row_count = ROW_COUNT;
+    ANALYZE gtfs_static.gtfs_stop_departures;
+    end_time := clock_timestamp();
+
+    -- Log the refresh
+    INSERT INTO gtfs_static.mv_refresh_log (mv_name, last_refresh, row_count, execution_time)
+    VALUES ('gtfs_stop_departures', end_time, row_count, end_time - start_time);
+
+    RETURN QUERY SELECT
+        'SUCCESS'::TEXT,
+        row_count,
+        end_time - start_time;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- 4. Initial refresh
+-- =====================================================
+
+SELECT * FROM gtfs_static.refresh_stop_departures();
+
+-- Display creation summary
+SELECT
+    'gtfs_stop_departures' AS table_name,
+    COUNT(*) AS total_departures,
+    COUNT(DISTINCT service_date) AS service_dates,
+    COUNT(DISTINCT stop_id) AS stops,
+    pg_size_pretty(pg_total_relation_size('gtfs_static.gtfs_stop_departures')) AS size,
+    'Created successfully' AS status
+FROM gtfs_static.gtfs_stop_departures;
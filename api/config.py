@@ -84,6 +84,56 @@ class DatabaseConfig:
         return {}
 
 
+class DatabaseAccessConfig:
+    """APIのクエリ実行（ワーカースレッド・タイムアウト・キュー待ちメトリクス）設定クラス"""
+
+    def __init__(self):
+        # クエリを実行するワーカースレッド数（同時に実行するクエリの上限）
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", "8"))
+        # 1クエリの実行時間の上限（ミリ秒、PostgreSQLの statement_timeout。0で無制限）
+        self.statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+        # 空きワーカーを待つ時間の上限（秒）。超えたリクエストは503を返す
+        self.queue_timeout = float(os.getenv("DB_QUEUE_TIMEOUT_SECONDS", "10"))
+        # キュー待ちがこの時間（ミリ秒）を超えたクエリを警告ログに出力（0で出力しない）
+        self.queue_wait_warn_ms = float(os.getenv("DB_QUEUE_WAIT_WARN_MS", "500"))
+        # キュー待ち・実行時間のパーセンタイルを計算する直近のクエリ数
+        self.metrics_window = int(os.getenv("DB_METRICS_WINDOW", "1000"))
+
+        # 接続プール（常時保持する接続数は pool_size。ワーカースレッドごとに1接続）
+        # pool_size を超えて一時的に作成できる接続数（ORMセッションなどワーカー外の利用分）
+        self.pool_max_overflow = int(os.getenv("DB_POOL_MAX_OVERFLOW", "2"))
+        # プールから接続を取得する待ち時間の上限（秒）
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+        # この時間（秒）を超えて使用した接続は次の取得時に再接続（-1で無効）
+        self.pool_recycle = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+        # 起動時に pool_size 本の接続を事前に作成する
+        self.pool_prewarm = os.getenv("DB_POOL_PREWARM", "true").lower() == "true"
+
+        if self.pool_size < 1:
+            raise ValueError(f"DB_POOL_SIZE must be at least 1 (got {self.pool_size})")
+
+    def get_connection_options(self) -> str:
+        """psycopg2 の options 引数に追加するサーバー設定"""
+        if self.statement_timeout_ms > 0:
+            return f"-c statement_timeout={self.statement_timeout_ms}"
+        return ""
+
+
+class PredictionCacheConfig:
+    """最新予測のインメモリスナップショット（キャッシュ）設定クラス"""
+
+    def __init__(self):
+        # 最新予測をメモリに保持し、予測APIをDBへの問い合わせなしで返す
+        self.enabled = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+        # 最新の予測バッチ（max(prediction_id)）を確認する間隔（秒）
+        self.probe_interval = float(os.getenv("PREDICTION_CACHE_PROBE_SECONDS", "10"))
+        # 予測バッチが変わらなくてもこの時間（秒）を超えたスナップショットは再読み込み（予測の削除を反映）
+        self.max_age = float(os.getenv("PREDICTION_CACHE_MAX_AGE_SECONDS", "900"))
+        # バッチジョブの NOTIFY を LISTEN して即座に確認する（DB接続を1本使用）
+        self.listen = os.getenv("PREDICTION_CACHE_LISTEN", "false").lower() == "true"
+        self.channel = os.getenv("PREDICTION_CACHE_CHANNEL", "regional_predictions_updated")
+
+
 class AppConfig:
     """アプリケーション全体の設定クラス"""
     
@@ -94,6 +144,8 @@ class AppConfig:
         
         # データベース設定
         self.database = DatabaseConfig()
+        self.database_access = DatabaseAccessConfig()
+        self.prediction_cache = PredictionCacheConfig()
         
         # ログ設定
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
@@ -14,8 +14,9 @@ from ..models import (
     AllRegionsResponse,
     ErrorResponse
 )
-from ..database_connector import DatabaseConnector
+from ..database_connector import DatabaseConnector, get_database_connector
 from ..repositories import RegionalDelayRepository
+from ..repositories.prediction_snapshot_cache import get_prediction_cache
 from ..services import RegionalDelayService, DelayPredictService
 
 logger = logging.getLogger(__name__)
@@ -34,7 +35,7 @@ def _initialize_services():
 
     if _db_connector is None:
         try:
-            _db_connector = DatabaseConnector()
+            _db_connector = get_database_connector()
             logger.info("DatabaseConnector initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize DatabaseConnector: {e}")
@@ -51,7 +52,9 @@ def _initialize_services():
         logger.info("RegionalDelayService initialized successfully")
 
     if _delay_predict_service is None:
-        delay_predict_repository = RegionalDelayRepository(_db_connector)
+        delay_predict_repository = RegionalDelayRepository(
+            _db_connector, get_prediction_cache(_db_connector)
+        )
         _delay_predict_service = DelayPredictService(
             delay_predict_repository
         )
@@ -163,7 +166,7 @@ async def get_all_regions_status():
         logger.info("Fetching status for all regions")
 
         service = get_regional_delay_service()
-        result = service.get_all_regions_status()
+        result = await service.get_all_regions_status()
 
         # logger.info(f"Retrieved status for {result['total_regions']} regions")
 
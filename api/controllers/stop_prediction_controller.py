@@ -13,8 +13,9 @@ from ..models import (
     RouteStopPredictionsResponse,
     ErrorResponse
 )
-from ..database_connector import DatabaseConnector
+from ..database_connector import DatabaseConnector, DatabaseBusyError, get_database_connector
 from ..repositories.delay_prediction_repository import DelayPredictionRepository
+from ..repositories.prediction_snapshot_cache import get_prediction_cache
 from ..services import StopPredictionService
 
 logger = logging.getLogger(__name__)
@@ -32,7 +33,7 @@ def _initialize_services():
 
     if _db_connector is None:
         try:
-            _db_connector = DatabaseConnector()
+            _db_connector = get_database_connector()
             logger.info("DatabaseConnector initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize DatabaseConnector: {e}")
@@ -42,7 +43,9 @@ def _initialize_services():
             )
 
     if _stop_prediction_service is None:
-        delay_prediction_repository = DelayPredictionRepository(_db_connector)
+        delay_prediction_repository = DelayPredictionRepository(
+            _db_connector, get_prediction_cache(_db_connector)
+        )
         _stop_prediction_service = StopPredictionService(
             delay_prediction_repository
         )
@@ -83,7 +86,8 @@ def get_stop_prediction_service() -> StopPredictionService:
     responses={
         200: {"description": "Upcoming arrivals with predictions"},
         404: {"model": ErrorResponse, "description": "Stop not found"},
-        500: {"model": ErrorResponse, "description": "Internal server error"}
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "All database workers busy"}
     }
 )
 async def get_stop_predictions(
@@ -111,6 +115,12 @@ async def get_stop_predictions(
 
         return result
 
+    except DatabaseBusyError as e:
+        logger.warning(f"Failed to fetch stop predictions: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Failed to fetch stop predictions: {e}", exc_info=True)
         raise HTTPException(
@@ -144,7 +154,8 @@ async def get_stop_predictions(
     responses={
         200: {"description": "Route-specific arrivals with predictions"},
         404: {"model": ErrorResponse, "description": "Stop or route not found"},
-        500: {"model": ErrorResponse, "description": "Internal server error"}
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "All database workers busy"}
     }
 )
 async def get_route_stop_predictions(
@@ -177,6 +188,12 @@ async def get_route_stop_predictions(
 
         return result
 
+    except DatabaseBusyError as e:
+        logger.warning(f"Failed to fetch route-stop predictions: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Failed to fetch route-stop predictions: {e}", exc_info=True)
         raise HTTPException(
@@ -1,18 +1,87 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import psycopg2
 import warnings
 warnings.filterwarnings('ignore')
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 import sys
 import os
+from typing import Optional
 from urllib.parse import urlparse
 
+logger = logging.getLogger(__name__)
+
 # SQLAlchemy Base for ORM models
 Base = declarative_base()
 
+
+class DatabaseBusyError(RuntimeError):
+    """All query workers stayed busy for longer than the queue timeout."""
+
+
+class QueryMetrics:
+    """Queue-wait and execution times of read_sql_async (thread-safe)."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=max(window, 1))
+        self._durations = deque(maxlen=max(window, 1))
+        self.queries = 0
+        self.failed = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.running = 0
+        self.max_wait = 0.0
+
+    def enter_queue(self):
+        with self._lock:
+            self.waiting += 1
+
+    def leave_queue(self, wait: float, rejected: bool = False):
+        with self._lock:
+            self.waiting -= 1
+            if rejected:
+                self.rejected += 1
+                return
+            self.running += 1
+            self._waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+
+    def finish(self, duration: float, failed: bool = False):
+        with self._lock:
+            self.running -= 1
+            self.queries += 1
+            self.failed += int(failed)
+            self._durations.append(duration)
+
+    def snapshot(self) -> dict:
+        """Counters and recent queue-wait / query-time percentiles in milliseconds."""
+        with self._lock:
+            waits = np.array(self._waits) * 1000.0
+            durations = np.array(self._durations) * 1000.0
+            stats = {
+                'queries': self.queries,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'waiting': self.waiting,
+                'running': self.running,
+                'max_queue_wait_ms': round(self.max_wait * 1000.0, 1),
+            }
+        for name, values in (('queue_wait', waits), ('query', durations)):
+            for q in (50, 95):
+                stats[f'{name}_p{q}_ms'] = round(float(np.percentile(values, q)), 1) if len(values) else None
+        return stats
+
+
 class DatabaseConnector:
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, access_config=None):
         # 環境変数からデータベースURLを取得
         if database_url is None:
             database_url = os.getenv('DATABASE_URL') or os.getenv('POSTGRES_URL')
@@ -35,19 +104,46 @@ class DatabaseConnector:
         # データベースURLを保存
         self.database_url = database_url
 
+        # ワーカースレッド数・statement_timeout・キュー待ちメトリクスの設定
+        if access_config is None:
+            from .config import DatabaseAccessConfig
+            access_config = DatabaseAccessConfig()
+        self.access_config = access_config
+        self.connection_options = ' '.join(
+            filter(None, ['-c timezone=America/Vancouver', access_config.get_connection_options()])
+        )
+
         # Add timezone to connect_args
         connect_args = {
-            'options': '-c timezone=America/Vancouver'
+            'options': self.connection_options
         }
 
+        # read_sql もこのエンジンの接続プールを使用する
+        # （取得時に pre_ping で切断済みの接続を検出し、pool_recycle 秒を超えた接続は再接続）
         self.engine = create_engine(
             self.database_url,
             connect_args=connect_args,
             pool_pre_ping=True,
+            pool_size=access_config.pool_size,
+            max_overflow=access_config.pool_max_overflow,
+            pool_timeout=access_config.pool_timeout,
+            pool_recycle=access_config.pool_recycle,
         )
+        self._connections_opened = 0
+        self._connections_invalidated = 0
+        event.listen(self.engine, 'connect', self._on_pool_connect)
+        event.listen(self.engine, 'invalidate', self._on_pool_invalidate)
 
         # Create SessionLocal for ORM operations
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        # read_sql_async 用のワーカースレッド（同時実行クエリ数の上限）
+        self._executor = ThreadPoolExecutor(
+            max_workers=access_config.pool_size, thread_name_prefix='db-query'
+        )
+        self._slots = None
+        self._slots_loop = None
+        self.metrics = QueryMetrics(access_config.metrics_window)
     
     def get_connection(self):
         """データベース接続を取得"""
@@ -57,19 +153,123 @@ class DatabaseConnector:
             database=self.database,
             user=self.username,
             password=self.password,
-            options='-c timezone=America/Vancouver'
+            options=self.connection_options
         )
     
     def read_sql(self, query, params=None) -> pd.DataFrame:
-        """SQLクエリを実行してDataFrameを返す"""
-        with self.get_connection() as conn:
+        """SQLクエリを実行してDataFrameを返す（接続はプールから借用）"""
+        conn = self.engine.raw_connection()
+        try:
             df = pd.read_sql_query(query, conn, params=params)
+        finally:
+            # プールに返却（返却時にロールバックされる）
+            conn.close()
         # PostgreSQLは接続時にtimezone=America/Vancouverを設定しているため、
         # 返されるtimestampはすでにPacific Timeです。
         # pandasはこれをtimezone-naiveとして読み込むので、正しいタイムゾーンを明示的に設定します。
         for col in df.select_dtypes(include=['datetime64']).columns:
             df[col] = df[col].dt.tz_localize('America/Vancouver')
         return df
+
+    async def read_sql_async(self, query, params=None) -> pd.DataFrame:
+        """
+        read_sql をワーカースレッドで実行（イベントループをブロックしない）
+
+        同時に実行するクエリは DB_POOL_SIZE まで。空きがない場合は DB_QUEUE_TIMEOUT_SECONDS まで待ち、
+        超えた場合は DatabaseBusyError を送出する。
+        """
+        slots = self._slots_for_running_loop()
+        queued_at = time.perf_counter()
+        self.metrics.enter_queue()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.access_config.queue_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.leave_queue(time.perf_counter() - queued_at, rejected=True)
+            raise DatabaseBusyError(
+                f"No database worker became available within {self.access_config.queue_timeout:g}s "
+                f"({self.access_config.pool_size} workers busy)"
+            )
+        except BaseException:
+            self.metrics.leave_queue(time.perf_counter() - queued_at, rejected=True)
+            raise
+
+        wait = time.perf_counter() - queued_at
+        self.metrics.leave_queue(wait)
+        if 0 < self.access_config.queue_wait_warn_ms < wait * 1000.0:
+            logger.warning(f"Query waited {wait * 1000.0:.0f}ms for a database worker")
+
+        loop = asyncio.get_running_loop()
+        started_at = time.perf_counter()
+        try:
+            future = self._executor.submit(self.read_sql, query, params)
+        except BaseException:
+            self.metrics.finish(0.0, failed=True)
+            slots.release()
+            raise
+
+        def _done(f):
+            # リクエストがキャンセルされてもクエリの終了までワーカーは使用中のため、終了時に枠を返す
+            self.metrics.finish(time.perf_counter() - started_at, failed=f.cancelled() or f.exception() is not None)
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # イベントループ終了後
+
+        future.add_done_callback(_done)
+        return await asyncio.wrap_future(future)
+
+    def _slots_for_running_loop(self) -> asyncio.Semaphore:
+        # asyncio.Semaphore は最初に待機したイベントループでのみ使用できるため、ループごとに作成する
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.access_config.pool_size)
+            self._slots_loop = loop
+        return self._slots
+
+    def warm_pool(self) -> int:
+        """
+        接続プールに pool_size 本の接続を事前に作成（最初のリクエストが接続を待たないように）
+
+        Returns:
+            作成済みの接続数
+        """
+        connections = []
+        try:
+            for _ in range(self.access_config.pool_size):
+                connections.append(self.engine.raw_connection())
+        finally:
+            for conn in connections:
+                conn.close()
+        return len(connections)
+
+    def get_pool_stats(self) -> dict:
+        """接続プールの状態と、作成・破棄した接続数"""
+        pool = self.engine.pool
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': self.access_config.pool_max_overflow,
+            'recycle_seconds': self.access_config.pool_recycle,
+            'connections_opened': self._connections_opened,
+            'connections_invalidated': self._connections_invalidated,
+        }
+
+    def _on_pool_connect(self, dbapi_connection, connection_record):
+        self._connections_opened += 1
+
+    def _on_pool_invalidate(self, dbapi_connection, connection_record, exception):
+        self._connections_invalidated += 1
+
+    def get_query_stats(self) -> dict:
+        """read_sql_async のワーカー数・キュー待ち・実行時間の統計"""
+        return {'pool_size': self.access_config.pool_size, **self.metrics.snapshot()}
+
+    def close(self):
+        """ワーカースレッドを終了"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.engine.dispose()
     
     def insert_dataframe(self, df: pd.DataFrame, table_name: str, if_exists: str = 'append', schema: str = None):
         """DataFrameをテーブルに挿入"""
@@ -90,3 +290,31 @@ class DatabaseConnector:
         except Exception as e:
             print(f"Database connection failed: {e}")
             return False
+
+
+# プロセス内で共有する DatabaseConnector（接続プールとワーカースレッドをコントローラー間で共有）
+_shared_connector: Optional[DatabaseConnector] = None
+_shared_lock = threading.Lock()
+
+
+def get_database_connector() -> DatabaseConnector:
+    """共有の DatabaseConnector を取得（初回呼び出し時に作成）"""
+    global _shared_connector
+    with _shared_lock:
+        if _shared_connector is None:
+            _shared_connector = DatabaseConnector()
+        return _shared_connector
+
+
+def peek_database_connector() -> Optional[DatabaseConnector]:
+    """作成済みの共有 DatabaseConnector（未作成の場合は None。接続は作成しない）"""
+    return _shared_connector
+
+
+def close_database_connector():
+    """共有の DatabaseConnector を終了（アプリケーション終了時）"""
+    global _shared_connector
+    with _shared_lock:
+        if _shared_connector is not None:
+            _shared_connector.close()
+            _shared_connector = None
@@ -5,9 +5,11 @@ Vancouver transit bus delay prediction API using ConvLSTM models.
 Provides both single-route predictions and regional delay aggregations.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 from datetime import datetime
 import os
@@ -19,6 +21,10 @@ os.environ['TZ'] = 'America/Vancouver'
 
 # Import controllers (routers)
 from .controllers import regional_delay_router, stop_prediction_router
+from .database_connector import get_database_connector, peek_database_connector, close_database_connector
+from .repositories.prediction_snapshot_cache import (
+    get_prediction_cache, peek_prediction_cache, close_prediction_cache
+)
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +33,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the shared database connection pool and load the latest prediction snapshot at startup,
+    and close both on shutdown.
+    """
+    connector = None
+    try:
+        connector = get_database_connector()
+        if connector.access_config.pool_prewarm:
+            opened = await asyncio.to_thread(connector.warm_pool)
+            logger.info(f"Database connection pool warmed up ({opened} connections)")
+    except Exception as e:
+        # Endpoints retry the connection lazily and answer 503 until the database is reachable
+        logger.error(f"Failed to warm up database connection pool: {e}")
+    if connector is not None:
+        cache = get_prediction_cache(connector)
+        if cache is not None:
+            # Failures are logged and retried by the background refresh
+            await cache.start()
+    yield
+    await close_prediction_cache()
+    close_database_connector()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="GTFS Bus Delay Prediction API",
@@ -83,7 +115,8 @@ app = FastAPI(
     },
     license_info={
         "name": "MIT License"
-    }
+    },
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -152,13 +185,35 @@ async def health_check():
             "components": {
                 "regional": "Check /api/v1/regional/health",
                 "stops": "Check /api/v1/health"
-            }
+            },
+            "database": _database_stats(),
+            "prediction_cache": _prediction_cache_stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
 
 
+def _database_stats() -> dict:
+    """Connection pool and query worker statistics (without opening a connection)."""
+    connector = peek_database_connector()
+    if connector is None:
+        return {"status": "not initialized"}
+    return {
+        "status": "initialized",
+        "pool": connector.get_pool_stats(),
+        "queries": connector.get_query_stats()
+    }
+
+
+def _prediction_cache_stats() -> dict:
+    """Latest prediction snapshot version, size, age and refresh counters."""
+    cache = peek_prediction_cache()
+    if cache is None:
+        return {"enabled": False}
+    return cache.get_stats()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler for unhandled errors."""
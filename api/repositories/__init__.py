@@ -4,8 +4,10 @@ Repository layer for database access
 
 from .regional_delay_repository import RegionalDelayRepository
 from .delay_prediction_repository import DelayPredictionRepository
+from .prediction_snapshot_cache import PredictionSnapshotCache
 
 __all__ = [
     'RegionalDelayRepository',
     'DelayPredictionRepository',
+    'PredictionSnapshotCache',
 ]
@@ -3,23 +3,57 @@ Delay Prediction Repository - Database access for delay prediction data
 """
 
 from typing import Optional
+import asyncio
 import logging
 import pandas as pd
 from ..database_connector import DatabaseConnector
+from .prediction_snapshot_cache import PredictionSnapshotCache
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
+def _hour_key(values: pd.Series) -> pd.Series:
+    """Start of the (UTC) hour, the prediction_target_time that covers each timestamp."""
+    # Vancouver's UTC offsets are whole hours, so this matches DATE_TRUNC('hour') in Pacific Time
+    return pd.to_datetime(values, utc=True).dt.floor('h')
+
+
+def _attach_predictions(
+    df: pd.DataFrame,
+    predictions: pd.DataFrame,
+    time_column: str,
+    keys: list,
+    fallback_column: str
+) -> pd.DataFrame:
+    """
+    LEFT JOIN the latest predictions onto timetable rows by the hour of time_column
+    (and keys), falling back to the realtime average delay like the SQL COALESCE.
+    """
+    left = df.assign(_target_hour=_hour_key(df[time_column]))
+    right = predictions.assign(_target_hour=_hour_key(predictions['prediction_target_time']))
+    merged = left.merge(right, on=keys + ['_target_hour'], how='left', sort=False)
+    merged['predicted_delay_seconds'] = merged['predicted_delay_seconds'].fillna(merged[fallback_column])
+    return merged.drop(columns=['_target_hour', fallback_column])
+
+
 class DelayPredictionRepository:
     """Delay prediction data access layer"""
 
-    def __init__(self, db_connector: DatabaseConnector):
+    def __init__(self, db_connector: DatabaseConnector, prediction_cache: Optional[PredictionSnapshotCache] = None):
         self.db_connector = db_connector
-    
-    def find_predictions_by_stop(self, stop_id: str) -> Optional[pd.DataFrame]:
+        # 最新予測のスナップショット（Noneの場合は regional_predictions_current から取得）
+        self.prediction_cache = prediction_cache
+
+    async def find_predictions_by_stop(self, stop_id: str) -> Optional[pd.DataFrame]:
         """
         指定した停車駅の予測データを取得
+
+        時刻表は gtfs_stop_departures（前日・当日の運行日、予定到着時刻付き）から取得し、
+        予測は prediction_target_time = 到着時刻の時（hour）で結合する
+        直前停車駅の遅延は trip_id の配列で絞り込む（IN (SELECT ...) の準結合は
+        gtfs_rt_base_v 全体を組み立てた後に適用されるため）
+
         Args:
             stop_id: 停車駅ID
         Returns:
@@ -27,115 +61,94 @@ class DelayPredictionRepository:
         """
 
         query = """
-            WITH 
-            relevant_service_dates AS (
-                SELECT CURRENT_DATE as service_date
-                UNION
-                SELECT CURRENT_DATE - INTERVAL '1 day' as service_date
-            ),
-            stop_times_filtered AS (
-                SELECT 
-                    st.trip_id,
-                    st.stop_id,
-                    st.stop_sequence,
-                    st.arrival_time,
-                    st.arrival_day_offset,
-                    asd.service_date,
-                    gtfs_static.get_stop_actual_time(asd.service_date, st.arrival_time, st.arrival_day_offset) as actual_time
-                FROM gtfs_static.gtfs_stop_times st
-                INNER JOIN gtfs_static.gtfs_trips_static trip USING (trip_id)
-                INNER JOIN gtfs_static.gtfs_active_service_dates_mv asd
-                    ON trip.service_id = asd.service_id
-                INNER JOIN relevant_service_dates rsd
-                    ON asd.service_date = rsd.service_date
-                WHERE st.stop_id = %s
+            WITH
+            departures AS (
+                SELECT
+                    trip_id,
+                    route_id,
+                    service_id,
+                    direction_id,
+                    trip_headsign,
+                    stop_sequence,
+                    arrival_time,
+                    service_date,
+                    scheduled_ts
+                FROM gtfs_static.gtfs_stop_departures
+                WHERE stop_id = %s
+                    AND scheduled_ts >= NOW()
+                    AND service_date IN (CURRENT_DATE, CURRENT_DATE - 1)
             ),
-            rt_data AS (
-                SELECT 
-                    stop_id, 
-                    trip_id, 
+            next_arrivals AS (
+                SELECT
                     route_id,
-                    stop_sequence, 
-                    arrival_delay,
-                    actual_arrival_time
-                FROM gtfs_realtime.gtfs_rt_base_v
+                    trip_headsign,
+                    service_id,
+                    service_date,
+                    MIN(scheduled_ts) as next_arrival_timestamp,
+                    MIN(arrival_time) as next_arrival_time
+                FROM departures
+                GROUP BY route_id, trip_headsign, service_id, service_date
             ),
             rt_data_prev AS (
                 SELECT DISTINCT ON (trip_id, stop_sequence)
                     trip_id,
                     stop_sequence,
                     arrival_delay
-                FROM rt_data
+                FROM gtfs_realtime.gtfs_rt_base_v
+                WHERE trip_id = ANY(ARRAY(SELECT trip_id FROM departures))
                 ORDER BY trip_id, stop_sequence, actual_arrival_time DESC
             ),
             rt_data_avg AS (
-                SELECT 
-                    stop_id,
+                SELECT
                     route_id,
                     AVG(arrival_delay) as avg_arrival_delay
-                FROM rt_data
-                GROUP BY route_id, stop_id
-            ),
-            next_arrivals AS (
-                SELECT
-                    trip.route_id,
-                    trip.trip_headsign,
-                    trip.service_id,
-                    stf.service_date,
-                    MIN(stf.actual_time) as next_arrival_timestamp,
-                    MIN(stf.arrival_time) as next_arrival_time
-                FROM stop_times_filtered stf
-                INNER JOIN gtfs_static.gtfs_trips_static trip USING (trip_id)
-                WHERE stf.actual_time >= NOW()
-                GROUP BY trip.route_id, trip.trip_headsign, trip.service_id, stf.service_date
-            ),
-            predictions_filtered AS (
-                SELECT 
-                    stop_id,
-                    stop_sequence,
-                    prediction_target_time,
-                    predicted_delay_seconds
-                FROM gtfs_realtime.regional_predictions_latest
+                FROM gtfs_realtime.gtfs_rt_base_v
                 WHERE stop_id = %s
+                GROUP BY route_id
             )
             SELECT
                 na.route_id,
                 na.service_id,
                 na.next_arrival_timestamp as next_arrival_time,
-                trip.trip_id,
-                trip.direction_id,
-                trip.trip_headsign,
-                stf.stop_sequence,
-                COALESCE(rpl.predicted_delay_seconds, rt_current.avg_arrival_delay) as predicted_delay_seconds,
+                d.trip_id,
+                d.direction_id,
+                d.trip_headsign,
+                d.stop_sequence,
+                rt_current.avg_arrival_delay,
                 rt_prev.arrival_delay as previous_stop_arrival_delay
-            FROM stop_times_filtered stf
+            FROM departures d
             INNER JOIN next_arrivals na
-                ON stf.arrival_time = na.next_arrival_time
-                AND stf.service_date = na.service_date
-            INNER JOIN gtfs_static.gtfs_trips_static trip
-                ON trip.trip_id = stf.trip_id
-                AND trip.trip_headsign = na.trip_headsign
-                AND trip.service_id = na.service_id
+                ON d.arrival_time = na.next_arrival_time
+                AND d.service_date = na.service_date
+                AND d.trip_headsign = na.trip_headsign
+                AND d.service_id = na.service_id
             LEFT JOIN rt_data_prev rt_prev
-                ON rt_prev.trip_id = trip.trip_id
-                AND rt_prev.stop_sequence = stf.stop_sequence - 1
+                ON rt_prev.trip_id = d.trip_id
+                AND rt_prev.stop_sequence = d.stop_sequence - 1
             LEFT JOIN rt_data_avg rt_current
-                ON rt_current.route_id = trip.route_id
-                AND rt_current.stop_id = stf.stop_id
-            LEFT JOIN predictions_filtered rpl
-                ON rpl.stop_id = stf.stop_id
-                AND rpl.stop_sequence = stf.stop_sequence
-                AND rpl.prediction_target_time = DATE_TRUNC('hour', na.next_arrival_timestamp)
+                ON rt_current.route_id = d.route_id
             ORDER BY na.next_arrival_timestamp;
         """
 
-        return self.db_connector.read_sql(query, params=(stop_id, stop_id))
+        df, predictions = await asyncio.gather(
+            self.db_connector.read_sql_async(query, params=(stop_id, stop_id)),
+            self._find_current_predictions(stop_id)
+        )
+        df = _attach_predictions(
+            df, predictions[['stop_sequence', 'prediction_target_time', 'predicted_delay_seconds']],
+            time_column='next_arrival_time', keys=['stop_sequence'], fallback_column='avg_arrival_delay'
+        )
+        return df.drop(columns=['prediction_target_time'])
 
 
-    def find_arrival_time_and_predictions(self, stop_id: str, route_id: str) -> Optional[pd.DataFrame]:
+    async def find_arrival_time_and_predictions(self, stop_id: str, route_id: str) -> Optional[pd.DataFrame]:
         """
         指定したroute_idとstop_idの時刻表と予測データを取得
 
+        prediction_target_time は毎正時のため、target <= 到着時刻 < target + 1時間 の予測は
+        到着時刻の時（hour）との一致で結合する
+        平均遅延（1行）は MATERIALIZED で1回だけ評価する（インライン化されると到着ごとに再評価される）
+
         Args:
             stop_id: 停車駅ID
             route_id: 路線ID
@@ -144,68 +157,65 @@ class DelayPredictionRepository:
             最新の予測データと時刻表のDataFrame
         """
         query = """
-            WITH 
-            relevant_service_dates AS (
-                SELECT CURRENT_DATE as service_date
-                UNION
-                SELECT CURRENT_DATE - INTERVAL '1 day' as service_date
-            ),
-            rt_data_avg AS (
-                SELECT 
-                    stop_id,
-                    route_id,
+            WITH
+            rt_data_avg AS MATERIALIZED (
+                SELECT
                     AVG(arrival_delay) as avg_arrival_delay
                 FROM gtfs_realtime.gtfs_rt_base_v
-                GROUP BY route_id, stop_id
+                WHERE stop_id = %s
+                    AND route_id = %s
             )
             SELECT
-                trip.route_id,
-                st.trip_id,
-                st.stop_id,
-                trip.direction_id,
-                st.stop_sequence,
-                trip.trip_headsign,
-                st.arrival_time,
-                st.arrival_day_offset,
-                asd.service_date,
-                gtfs_static.get_stop_actual_time(
-                    asd.service_date,
-                    st.arrival_time,
-                    st.arrival_day_offset
-                ) as actual_arrival_timestamp,
-                rpl.prediction_target_time,
-                COALESCE(rpl.predicted_delay_seconds, rt.avg_arrival_delay) as predicted_delay_seconds
-            FROM gtfs_static.gtfs_stops s
-            INNER JOIN gtfs_static.gtfs_stop_times st USING (stop_id)
-            INNER JOIN gtfs_static.gtfs_trips_static trip USING (trip_id)
-            INNER JOIN gtfs_static.gtfs_active_service_dates_mv asd
-                ON trip.service_id = asd.service_id
-            INNER JOIN relevant_service_dates rsd
-                ON asd.service_date = rsd.service_date
-            LEFT JOIN rt_data_avg rt
-                ON rt.route_id = trip.route_id
-                AND rt.stop_id = st.stop_id
-            LEFT JOIN gtfs_realtime.regional_predictions_latest rpl
-                ON rpl.stop_id = st.stop_id
-                AND rpl.route_id = trip.route_id
-                AND rpl.prediction_target_time <= gtfs_static.get_stop_actual_time(
-                    asd.service_date,
-                    st.arrival_time,
-                    st.arrival_day_offset
-                )
-                AND rpl.prediction_target_time + INTERVAL '1 hour' > gtfs_static.get_stop_actual_time(
-                    asd.service_date,
-                    st.arrival_time,
-                    st.arrival_day_offset
-                )
-            WHERE s.stop_id = %s
-                AND trip.route_id = %s
-                AND gtfs_static.get_stop_actual_time(
-                    asd.service_date,
-                    st.arrival_time,
-                    st.arrival_day_offset
-                ) >= NOW() - INTERVAL '5 minutes'
-            ORDER BY trip.trip_headsign, actual_arrival_timestamp;
+                d.route_id,
+                d.trip_id,
+                d.stop_id,
+                d.direction_id,
+                d.stop_sequence,
+                d.trip_headsign,
+                d.arrival_time,
+                d.arrival_day_offset,
+                d.service_date,
+                d.scheduled_ts as actual_arrival_timestamp,
+                rt.avg_arrival_delay
+            FROM gtfs_static.gtfs_stop_departures d
+            CROSS JOIN rt_data_avg rt
+            WHERE d.stop_id = %s
+                AND d.route_id = %s
+                AND d.scheduled_ts >= NOW() - INTERVAL '5 minutes'
+                AND d.service_date IN (CURRENT_DATE, CURRENT_DATE - 1)
+            ORDER BY d.trip_headsign, actual_arrival_timestamp;
         """
 
-        return self.db_connector.read_sql(query, params=(stop_id, route_id))
\ No newline at end of file
+        df, predictions = await asyncio.gather(
+            self.db_connector.read_sql_async(query, params=(stop_id, route_id, stop_id, route_id)),
+            self._find_current_predictions(stop_id, route_id)
+        )
+        return _attach_predictions(
+            df, predictions[['prediction_target_time', 'predicted_delay_seconds']],
+            time_column='actual_arrival_timestamp', keys=[], fallback_column='avg_arrival_delay'
+        )
+
+    async def _find_current_predictions(self, stop_id: str, route_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        停車駅（と路線）の最新予測を取得
+
+        予測キャッシュがある場合はスナップショットから、ない場合は regional_predictions_current から取得
+        """
+        if self.prediction_cache is not None:
+            snapshot = await self.prediction_cache.get()
+            return snapshot.stop(stop_id) if route_id is None else snapshot.stop_route(stop_id, route_id)
+
+        query = """
+            SELECT
+                route_id,
+                stop_sequence,
+                prediction_target_time,
+                predicted_delay_seconds
+            FROM gtfs_realtime.regional_predictions_current
+            WHERE stop_id = %s
+        """
+        params = (stop_id,)
+        if route_id is not None:
+            query += " AND route_id = %s"
+            params = (stop_id, route_id)
+        return await self.db_connector.read_sql_async(query, params=params)
@@ -0,0 +1,290 @@
+"""
+Prediction Snapshot Cache - In-memory copy of the latest regional predictions
+
+The batch job writes a new prediction run at most a few times per hour, so the latest prediction
+set is loaded once per run and served from memory. A background task probes the newest
+prediction_id (a primary-key lookup) and reloads the snapshot only when it changes, or as soon
+as the batch job's NOTIFY arrives when listening is enabled.
+"""
+
+from typing import Optional
+import asyncio
+import logging
+import select
+import threading
+import time
+import pandas as pd
+from ..database_connector import DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+PROBE_QUERY = """
+    SELECT MAX(prediction_id) AS latest_prediction_id
+    FROM gtfs_realtime.regional_delay_predictions;
+"""
+
+# Latest prediction per route/stop/sequence/direction, maintained by the batch job
+SNAPSHOT_QUERY = """
+    SELECT
+        region_id,
+        route_id,
+        direction_id,
+        stop_id,
+        stop_name,
+        stop_lat,
+        stop_lon,
+        stop_sequence,
+        prediction_created_at,
+        prediction_target_time,
+        prediction_hour_offset,
+        predicted_delay_seconds,
+        predicted_delay_minutes,
+        model_version
+    FROM gtfs_realtime.regional_predictions_current
+    ORDER BY region_id, route_id, direction_id, stop_id, prediction_hour_offset;
+"""
+
+DATETIME_COLUMNS = ['prediction_created_at', 'prediction_target_time']
+
+
+class PredictionSnapshot:
+    """Immutable latest prediction set with row positions per region, stop and (stop, route)."""
+
+    def __init__(self, frame: pd.DataFrame, version: Optional[int], loaded_at: float):
+        frame = frame.reset_index(drop=True)
+        for col in DATETIME_COLUMNS:
+            # Object columns (mixed UTC offsets across a DST change) are normalised to Pacific Time,
+            # the same timezone read_sql returns
+            frame[col] = pd.to_datetime(frame[col], utc=True).dt.tz_convert('America/Vancouver')
+        self.frame = frame
+        self.version = version
+        self.loaded_at = loaded_at
+        self._by_region = self._positions(frame, 'region_id')
+        self._by_stop = self._positions(frame, 'stop_id')
+        self._by_stop_route = self._positions(frame, ['stop_id', 'route_id'])
+
+    @staticmethod
+    def _positions(frame: pd.DataFrame, keys) -> dict:
+        if frame.empty:
+            return {}
+        return frame.groupby(keys, sort=False).indices
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _take(self, positions) -> pd.DataFrame:
+        if positions is None:
+            return self.frame.iloc[0:0].copy()
+        return self.frame.take(positions).reset_index(drop=True)
+
+    def region(self, region_id: str, forecast_hours: Optional[int] = None) -> pd.DataFrame:
+        """Predictions of a region, ordered by route, direction, stop and hour offset."""
+        df = self._take(self._by_region.get(region_id))
+        if forecast_hours is not None:
+            df = df[df['prediction_hour_offset'] <= forecast_hours].reset_index(drop=True)
+        return df
+
+    def stop(self, stop_id: str) -> pd.DataFrame:
+        return self._take(self._by_stop.get(stop_id))
+
+    def stop_route(self, stop_id: str, route_id: str) -> pd.DataFrame:
+        return self._take(self._by_stop_route.get((stop_id, route_id)))
+
+    def all(self) -> pd.DataFrame:
+        return self.frame.copy()
+
+
+class PredictionSnapshotCache:
+    """Latest prediction snapshot, refreshed when a new batch run is written."""
+
+    def __init__(self, db_connector: DatabaseConnector, cache_config=None):
+        if cache_config is None:
+            from ..config import PredictionCacheConfig
+            cache_config = PredictionCacheConfig()
+        self.db_connector = db_connector
+        self.cache_config = cache_config
+        self._snapshot: Optional[PredictionSnapshot] = None
+        self._last_probe = 0.0
+        self._generation = 0
+        self._lock = None
+        self._lock_loop = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._listener: Optional[threading.Thread] = None
+        self._stop_listening = threading.Event()
+        self.stats = {'probes': 0, 'reloads': 0, 'notifications': 0, 'last_error': None}
+
+    async def get(self) -> PredictionSnapshot:
+        """
+        Current snapshot. Served from memory while the background task keeps it fresh;
+        without the task (no lifespan), it is probed at most once per probe interval.
+        """
+        if self._snapshot is None:
+            await self.refresh(force=True)
+        elif not self.running and time.monotonic() - self._last_probe >= self.cache_config.probe_interval:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the previous snapshot while the database is unreachable
+                self.stats['last_error'] = str(e)
+                logger.warning(f"Prediction snapshot refresh failed, serving previous snapshot: {e}")
+        return self._snapshot
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Probe the latest prediction batch and reload the snapshot when it changed
+        (or when forced / older than the max age).
+
+        Returns:
+            True when the snapshot was reloaded
+        """
+        generation = self._generation
+        async with self._lock_for_running_loop():
+            snapshot = self._snapshot
+            if snapshot is not None and generation != self._generation:
+                return False  # Refreshed by a concurrent caller while waiting for the lock
+
+            probe = await self.db_connector.read_sql_async(PROBE_QUERY)
+            self._last_probe = time.monotonic()
+            self._generation += 1
+            self.stats['probes'] += 1
+            latest = probe['latest_prediction_id'].iloc[0] if not probe.empty else None
+            version = int(latest) if pd.notna(latest) else None
+
+            expired = snapshot is not None and time.monotonic() - snapshot.loaded_at >= self.cache_config.max_age
+            if snapshot is not None and not force and not expired and version == snapshot.version:
+                return False
+
+            started_at = time.perf_counter()
+            frame = await self.db_connector.read_sql_async(SNAPSHOT_QUERY)
+            self._snapshot = PredictionSnapshot(frame, version, time.monotonic())
+            self.stats['reloads'] += 1
+            self.stats['last_error'] = None
+            logger.info(
+                f"Loaded prediction snapshot {version} ({len(frame)} rows) "
+                f"in {(time.perf_counter() - started_at) * 1000:.0f}ms"
+            )
+            return True
+
+    def _lock_for_running_loop(self) -> asyncio.Lock:
+        # asyncio.Lock can only be used from the event loop it was first used on
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Load the first snapshot and start the background refresh (and NOTIFY listener)."""
+        if self.running:
+            return
+        self._changed = asyncio.Event()
+        if self.cache_config.listen:
+            self._stop_listening.clear()
+            self._listener = threading.Thread(
+                target=self._listen, args=(asyncio.get_running_loop(),),
+                name='prediction-cache-listener', daemon=True
+            )
+            self._listener.start()
+        try:
+            await self.refresh(force=True)
+        except Exception as e:
+            self.stats['last_error'] = str(e)
+            logger.error(f"Failed to load prediction snapshot: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stop_listening.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._listener is not None:
+            await asyncio.to_thread(self._listener.join, 5)
+            self._listener = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.cache_config.probe_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.stats['last_error'] = str(e)
+                logger.warning(f"Prediction snapshot refresh failed, serving previous snapshot: {e}")
+
+    def _listen(self, loop):
+        """LISTEN for the batch job's notification on a dedicated connection (reconnects on errors)."""
+        while not self._stop_listening.is_set():
+            conn = None
+            try:
+                conn = self.db_connector.get_connection()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.cache_config.channel}"')
+                logger.info(f"Listening for prediction batches on '{self.cache_config.channel}'")
+                while not self._stop_listening.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        if conn.notifies:
+                            conn.notifies.clear()
+                            self.stats['notifications'] += 1
+                            loop.call_soon_threadsafe(self._changed.set)
+            except Exception as e:
+                logger.warning(f"Prediction batch listener failed, reconnecting: {e}")
+                self._stop_listening.wait(5.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def get_stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            'enabled': True,
+            'running': self.running,
+            'listening': self._listener is not None and self._listener.is_alive(),
+            'version': snapshot.version if snapshot is not None else None,
+            'rows': len(snapshot) if snapshot is not None else 0,
+            'age_seconds': round(time.monotonic() - snapshot.loaded_at, 1) if snapshot is not None else None,
+            **self.stats,
+        }
+
+
+# Process-wide cache shared by the controllers (created on first use)
+_shared_cache: Optional[PredictionSnapshotCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_prediction_cache(db_connector: DatabaseConnector) -> Optional[PredictionSnapshotCache]:
+    """Shared cache, or None when PREDICTION_CACHE_ENABLED is off."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            from ..config import PredictionCacheConfig
+            cache_config = PredictionCacheConfig()
+            if not cache_config.enabled:
+                return None
+            _shared_cache = PredictionSnapshotCache(db_connector, cache_config)
+        return _shared_cache
+
+
+def peek_prediction_cache() -> Optional[PredictionSnapshotCache]:
+    return _shared_cache
+
+
+async def close_prediction_cache():
+    global _shared_cache
+    cache = _shared_cache
+    _shared_cache = None
+    if cache is not None:
+        await cache.stop()
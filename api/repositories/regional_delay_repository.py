@@ -6,6 +6,7 @@ from typing import Optional, Dict
 import logging
 import pandas as pd
 from ..database_connector import DatabaseConnector
+from .prediction_snapshot_cache import PredictionSnapshotCache
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +14,12 @@ logger = logging.getLogger(__name__)
 class RegionalDelayRepository:
     """Regional delay data access layer"""
 
-    def __init__(self, db_connector: DatabaseConnector):
+    def __init__(self, db_connector: DatabaseConnector, prediction_cache: Optional[PredictionSnapshotCache] = None):
         self.db_connector = db_connector
+        # 最新予測のスナップショット（Noneの場合は毎回 regional_predictions_current を参照）
+        self.prediction_cache = prediction_cache
 
-    def find_recent_status(self) -> Optional[Dict]:
+    async def find_recent_status(self) -> Optional[Dict]:
         """
         Find recent status for a region
 
@@ -35,9 +38,9 @@ class RegionalDelayRepository:
             order by base.region_id;
         """
 
-        return self.db_connector.read_sql(query)
+        return await self.db_connector.read_sql_async(query)
 
-    def find_latest_predictions(self, region_id: str, forecast_hours: int = 3) -> Optional[pd.DataFrame]:
+    async def find_latest_predictions(self, region_id: str, forecast_hours: int = 3) -> Optional[pd.DataFrame]:
         """
         バッチジョブで作成された最新の予測データを取得
 
@@ -48,7 +51,11 @@ class RegionalDelayRepository:
         Returns:
             最新の予測データのDataFrame
         """
-        query = f"""
+        if self.prediction_cache is not None:
+            snapshot = await self.prediction_cache.get()
+            return snapshot.region(region_id, forecast_hours)
+
+        query = """
             SELECT
                 region_id,
                 route_id,
@@ -63,21 +70,25 @@ class RegionalDelayRepository:
                 predicted_delay_seconds,
                 predicted_delay_minutes,
                 model_version
-            FROM gtfs_realtime.regional_predictions_latest
-            WHERE region_id = '{region_id}'
-                AND prediction_hour_offset <= {forecast_hours}
+            FROM gtfs_realtime.regional_predictions_current
+            WHERE region_id = %s
+                AND prediction_hour_offset <= %s
             ORDER BY route_id, direction_id, stop_id, prediction_hour_offset;
         """
 
-        return self.db_connector.read_sql(query)
+        return await self.db_connector.read_sql_async(query, params=(region_id, forecast_hours))
 
-    def find_all_latest_predictions(self) -> Optional[pd.DataFrame]:
+    async def find_all_latest_predictions(self) -> Optional[pd.DataFrame]:
         """
         全地域の最新予測データを取得
 
         Returns:
             全地域の最新予測データのDataFrame
         """
+        if self.prediction_cache is not None:
+            snapshot = await self.prediction_cache.get()
+            return snapshot.all()
+
         query = """
             SELECT
                 region_id,
@@ -93,8 +104,8 @@ class RegionalDelayRepository:
                 predicted_delay_seconds,
                 predicted_delay_minutes,
                 model_version
-            FROM gtfs_realtime.regional_predictions_latest
+            FROM gtfs_realtime.regional_predictions_current
             ORDER BY region_id, route_id, direction_id, stop_id, prediction_hour_offset;
         """
 
-        return self.db_connector.read_sql(query)
\ No newline at end of file
+        return await self.db_connector.read_sql_async(query)
\ No newline at end of file
@@ -38,7 +38,7 @@ class DelayPredictService:
             Stop-level prediction data
         """
         # Get the latest prediction data created by the batch job
-        predictions_df = self.delay_repository.find_latest_predictions(
+        predictions_df = await self.delay_repository.find_latest_predictions(
             region_id, forecast_hours
         )
 
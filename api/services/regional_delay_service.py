@@ -21,7 +21,7 @@ class RegionalDelayService:
     ):
         self.delay_repository = regional_delay_repository
 
-    def get_all_regions_status(self) -> Dict:
+    async def get_all_regions_status(self) -> Dict:
         """
         Get status for all regions
 
@@ -32,7 +32,7 @@ class RegionalDelayService:
             Status information for all regions
         """
         try:
-            recent_status = self.delay_repository.find_recent_status()
+            recent_status = await self.delay_repository.find_recent_status()
 
             # Filter out rows with NULL region_id
             recent_status = recent_status.dropna(subset=['region_id'])
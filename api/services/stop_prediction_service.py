@@ -43,7 +43,7 @@ class StopPredictionService:
         logger.info(f"Fetching predictions for stop: {stop_id}")
 
         # Get predictions from repository
-        df = self.repository.find_predictions_by_stop(stop_id)
+        df = await self.repository.find_predictions_by_stop(stop_id)
 
         if df is None or df.empty:
             logger.warning(f"No predictions found for stop: {stop_id}")
@@ -93,7 +93,7 @@ class StopPredictionService:
         logger.info(f"Fetching predictions for stop: {stop_id}, route: {route_id}")
 
         # Get predictions from repository
-        df = self.repository.find_arrival_time_and_predictions(stop_id, route_id)
+        df = await self.repository.find_arrival_time_and_predictions(stop_id, route_id)
 
         if df is None or df.empty:
             logger.warning(f"No predictions found for stop: {stop_id}, route: {route_id}")
@@ -14,10 +14,22 @@ Schedulers:
 - systemd: Systemd Timer用設定ファイル
 """
 
-from batch.jobs.gtfs_static_load import GTFSStaticLoadJob
-from batch.jobs.gtfs_realtime_load import GTFSRealtimeFetchJob
-from batch.jobs.weather_scraper import WeatherScraperJob
-from batch.jobs.regional_delay_prediction import RegionalDelayPredictionJob
+import importlib
+
+# ジョブクラスは参照時にインポートする（batch.config 等の読み込みでTensorFlow等を読み込まないため）
+_JOB_MODULES = {
+    'GTFSStaticLoadJob': 'batch.jobs.gtfs_static_load',
+    'GTFSRealtimeFetchJob': 'batch.jobs.gtfs_realtime_load',
+    'WeatherScraperJob': 'batch.jobs.weather_scraper',
+    'RegionalDelayPredictionJob': 'batch.jobs.regional_delay_prediction',
+}
+
+
+def __getattr__(name):
+    if name in _JOB_MODULES:
+        return getattr(importlib.import_module(_JOB_MODULES[name]), name)
+    raise AttributeError(f"module 'batch' has no attribute {name!r}")
+
 
 __version__ = '1.0.0'
 
@@ -1,3 +1,7 @@
+import io
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
 import pandas as pd
 import psycopg2
 import warnings
@@ -48,6 +52,46 @@ class DatabaseConnector:
         """SQLクエリを実行してDataFrameを返す"""
         with self.get_connection() as conn:
             df = pd.read_sql_query(query, conn, params=params)
+        return self._localize_datetimes(df)
+
+    def iter_sql(self, query, params=None, chunksize: int = 50000):
+        """
+        サーバーサイドカーソルでクエリ結果をチャンクごとのDataFrameとして返す
+
+        結果全体をクライアントに展開せず、chunksize 行ずつ取得する。
+        日時カラムは read_sql() と同じくバンクーバー時刻に変換する。
+        """
+        conn = self.get_connection()
+        try:
+            # 名前付きカーソル（サーバーサイド）はトランザクション内でのみ有効
+            with conn.cursor(name=f'iter_sql_{id(self)}') as cursor:
+                cursor.itersize = chunksize
+                cursor.execute(query, params)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [desc[0] for desc in cursor.description]
+                    yield self._localize_datetimes(
+                        pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                    )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _localize_datetimes(df: pd.DataFrame) -> pd.DataFrame:
+        for col in df.columns:
+            values = df[col]
+            # timestamptz は pd.read_sql_query と同じくUTCに揃える（DST境界ではオフセット混在のobject列になる）
+            if isinstance(values.dtype, pd.DatetimeTZDtype):
+                df[col] = values.dt.tz_convert('UTC')
+            elif values.dtype == object:
+                first = values.first_valid_index()
+                if first is not None and isinstance(values[first], datetime) and values[first].tzinfo is not None:
+                    df[col] = pd.to_datetime(values, utc=True)
         for col in df.select_dtypes(include=['datetime64']).columns:
             df[col] = df[col].dt.tz_localize('UTC').dt.tz_convert('America/Vancouver')
         return df
@@ -56,6 +100,64 @@ class DatabaseConnector:
         """DataFrameをテーブルに挿入"""
         df.to_sql(table_name, self.engine, if_exists=if_exists, index=False, schema=schema)
 
+    @contextmanager
+    def transaction(self):
+        """
+        1つのトランザクションで実行するカーソルを返す
+
+        正常終了時にコミット、例外時にロールバックし、接続を閉じる
+        """
+        conn = self.get_connection()
+        try:
+            with conn, conn.cursor() as cursor:
+                yield cursor
+        finally:
+            conn.close()
+
+    @staticmethod
+    def copy_to_cursor(
+        cursor,
+        df: pd.DataFrame,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        schema: str = None
+    ) -> int:
+        """
+        DataFrameをCOPY FROM STDIN（CSV）で挿入（コミットは呼び出し側のトランザクションで行う）
+
+        NaN・None・空文字列はNULLとして挿入される。
+
+        Args:
+            cursor: transaction() などのカーソル
+            df: 挿入するDataFrame
+            table_name: テーブル名
+            columns: 挿入するカラム（Noneの場合はDataFrameの全列。指定しないカラムはテーブルのデフォルト値）
+            schema: スキーマ名
+
+        Returns:
+            挿入した行数
+        """
+        if df.empty:
+            return 0
+
+        columns = list(columns) if columns is not None else list(df.columns)
+        frame = df[columns]
+        for col in columns:
+            values = frame[col]
+            # タイムゾーン付き日時のCSV変換は1値ずつで遅いため、UTC（+00）の文字列に一括変換する
+            if isinstance(values.dtype, pd.DatetimeTZDtype):
+                utc_text = values.dt.tz_convert('UTC').dt.tz_localize(None).astype(str) + '+00'
+                frame = frame.assign(**{col: utc_text.where(values.notna())})
+
+        buffer = io.StringIO()
+        frame.to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+
+        qualified_name = f"{schema}.{table_name}" if schema else table_name
+        column_list = ', '.join(columns)
+        cursor.copy_expert(f"COPY {qualified_name} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return len(df)
+
     def get_session(self):
         """新しいORMセッションを取得"""
         return self.SessionLocal()
@@ -165,6 +165,37 @@ class GTFSRealtimeConfig:
     def __init__(self):
         self.cleanup_days = int(os.getenv('GTFS_RT_CLEANUP_DAYS', '7'))
         self.save_to_disk = os.getenv('GTFS_RT_SAVE_TO_DISK', '1') == '1'
+        # 1: COPYによる一括ロード、0: ORMによる行単位ロード
+        self.bulk_load = os.getenv('GTFS_RT_BULK_LOAD', '0') == '1'
+        # trip/vehicle descriptor IDキャッシュの最大件数（0で無効）
+        self.descriptor_cache_size = int(os.getenv('GTFS_RT_DESCRIPTOR_CACHE_SIZE', '50000'))
+        # フィード並列取得のワーカー数（1で逐次取得）とホスト毎の同時リクエスト上限
+        self.fetch_workers = int(os.getenv('GTFS_RT_FETCH_WORKERS', '3'))
+        self.fetch_per_host_limit = int(os.getenv('GTFS_RT_FETCH_PER_HOST_LIMIT', '3'))
+        # フィードごとのETag / Last-Modified・ヘッダー時刻の保存先（未指定時はGTFS Realtime保存ディレクトリ）
+        self.fetch_state_path = os.getenv('GTFS_RT_FETCH_STATE_PATH')
+        # 取得→パース→ロード間のキュー容量（フィード数）
+        self.pipeline_queue_size = int(os.getenv('GTFS_RT_PIPELINE_QUEUE_SIZE', '1'))
+        # 1: 前回ロードから値が変わったstop_time_updatesのみ書き込む
+        self.differential_ingest = os.getenv('GTFS_RT_DIFFERENTIAL_INGEST', '0') == '1'
+        # stop_time_updatesフィンガープリントの保存先（未指定時はGTFS Realtime保存ディレクトリ）
+        self.fingerprint_path = os.getenv('GTFS_RT_FINGERPRINT_PATH')
+        # 常駐モード: ポーリング間隔、ヘッダー時刻からの公開遅延、未更新時の再試行間隔（秒）
+        self.daemon_interval = int(os.getenv('GTFS_RT_DAEMON_INTERVAL', '300'))
+        self.daemon_lag_seconds = int(os.getenv('GTFS_RT_DAEMON_LAG_SECONDS', '15'))
+        self.daemon_retry_seconds = int(os.getenv('GTFS_RT_DAEMON_RETRY_SECONDS', '30'))
+        # 常駐モードのヘルス/メトリクスエンドポイント（ポート0で無効）
+        self.health_host = os.getenv('GTFS_RT_HEALTH_HOST', '0.0.0.0')
+        self.health_port = int(os.getenv('GTFS_RT_HEALTH_PORT', '8081'))
+        # 生フィードの保存形式（pb: 取得ごとの.pbファイル、segment: 1時間ごとの圧縮セグメントへ追記）
+        self.archive_format = os.getenv('GTFS_RT_ARCHIVE_FORMAT', 'pb')
+        # セグメントの圧縮方式（zstd / gzip、未指定時はzstandardがあればzstd）と保存先
+        self.archive_codec = os.getenv('GTFS_RT_ARCHIVE_CODEC')
+        self.archive_dir = os.getenv('GTFS_RT_ARCHIVE_DIR')
+        # 1: stop_time_updates / vehicle_positionsを学習用Parquetデータセットにも出力（pyarrowが必要）
+        self.parquet_export = os.getenv('GTFS_RT_PARQUET_EXPORT', '0') == '1'
+        # Parquetデータセットの保存先（未指定時はGTFS Realtime保存ディレクトリ/parquet）
+        self.parquet_dir = os.getenv('GTFS_RT_PARQUET_DIR')
 
 
 class WeatherScraperConfig:
@@ -188,8 +219,34 @@ class PredictionConfig:
             'PREDICTION_MODEL_PATH',
             str(model_dir / 'best_delay_model.h5')
         )
+        # 学習時の標準化パラメータ（未設定の場合はモデルと同じ場所の <モデル名>_scalers.npz）
+        self.scaler_path = os.getenv('PREDICTION_SCALER_PATH') or None
         self.input_timesteps = int(os.getenv('PREDICTION_INPUT_TIMESTEPS', '8'))
         self.output_timesteps = int(os.getenv('PREDICTION_OUTPUT_TIMESTEPS', '3'))
+        # batched: 全地域のシーケンスをまとめて推論、per-region: 地域ごとに推論
+        self.inference_mode = os.getenv('PREDICTION_INFERENCE_MODE', 'batched')
+        # 1回の推論に渡す最大シーケンス数（最大のバケットサイズ）
+        self.batch_size = int(os.getenv('PREDICTION_BATCH_SIZE', '1024'))
+        # 推論バックエンド（function: tf.functionの具象関数、keras: predict_on_batch、savedmodel、tflite）
+        self.inference_backend = os.getenv('PREDICTION_INFERENCE_BACKEND', 'function')
+        # PREDICTION_BATCH_SIZE 未満のチャンクをパディングするバケットサイズ（カンマ区切り）
+        self.batch_buckets = [
+            int(size) for size in os.getenv('PREDICTION_BATCH_BUCKETS', '64,256').split(',') if size.strip()
+        ]
+        # savedmodel / tflite のエクスポート先（未設定の場合はモデルと同じ場所、存在しない場合は自動作成）
+        self.export_path = os.getenv('PREDICTION_EXPORT_PATH') or None
+        # 初期化時に全バケットサイズで推論し、最初の予測でのトレース・メモリ確保を避ける
+        self.warmup = os.getenv('PREDICTION_WARMUP', 'true').lower() == 'true'
+        # 地域ごとの前処理・デコードを並列実行するプロセス数（1: 親プロセスで実行）
+        self.workers = int(os.getenv('PREDICTION_WORKERS', '1'))
+        # 入力ウィンドウが前回から変わったバス停のみ予測し、他は前回の予測を引き継ぐ
+        self.incremental = os.getenv('PREDICTION_INCREMENTAL', 'false').lower() == 'true'
+        # インクリメンタルモードの状態ファイル（未設定の場合はダウンロードディレクトリの prediction_state.pkl）
+        self.state_path = os.getenv('PREDICTION_STATE_PATH') or None
+        # 予測の保存と同じトランザクションで NOTIFY するチャネル（APIの予測キャッシュが LISTEN、空で無効）
+        self.notify_channel = os.getenv('PREDICTION_NOTIFY_CHANNEL', 'regional_predictions_updated') or None
+        # 予測履歴（日単位のパーティション）の保持日数（0: 削除しない）
+        self.retention_days = int(os.getenv('PREDICTION_RETENTION_DAYS', '30'))
 
     def get_model_path(self, model_name: Optional[str] = None) -> Path:
         """
@@ -218,6 +275,15 @@ class PredictionConfig:
         return model_path
 
 
+class StopDeparturesConfig:
+    """停留所時刻表（gtfs_stop_departures）設定クラス"""
+
+    def __init__(self):
+        # 今日（バンクーバー時刻）の前後に作成する運行日数（前日の運行日は深夜0時以降の便、翌日は日次更新の遅れに備える）
+        self.days_back = int(os.getenv('STOP_DEPARTURES_DAYS_BACK', '1'))
+        self.days_ahead = int(os.getenv('STOP_DEPARTURES_DAYS_AHEAD', '1'))
+
+
 class LoggingConfig:
     """ログ設定クラス"""
 
@@ -248,6 +314,7 @@ class BatchConfig:
         self.gtfs_realtime = GTFSRealtimeConfig()
         self.weather_scraper = WeatherScraperConfig()
         self.prediction = PredictionConfig(self.directories.model_dir)
+        self.stop_departures = StopDeparturesConfig()
         self.logging = LoggingConfig()
 
     def is_production(self) -> bool:
@@ -6,10 +6,15 @@ Fetches GTFS Realtime protobuf data from TransLink API and stores to disk.
 
 import sys
 import os
+import pickle
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 
 # Add paths for imports
 controller_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,17 +28,89 @@ except ImportError:
     print("Error: gtfs_realtime_pb2.py not found. Please generate it from gtfs-realtime.proto")
     sys.exit(1)
 
+from batch.utils.file_utils import read_state_file, write_state_file
+
+# Fetch status per feed, kept in GTFSRealtimeFetcher.last_fetch_status
+FETCHED = 'fetched'
+NOT_MODIFIED = 'not_modified'  # server answered 304 to a conditional request
+UNCHANGED = 'unchanged'        # header timestamp equal to the previous fetch, body not downloaded
+FAILED = 'failed'
+
+# Enough to hold the serialized FeedHeader at the start of a FeedMessage
+HEADER_PEEK_BYTES = 1024
+
+
+def peek_header_timestamp(prefix):
+    """
+    Read FeedHeader.timestamp from the first bytes of a serialized FeedMessage.
+
+    The header is field 1 and is serialized first, so the timestamp is known
+    before the entities are downloaded.
+
+    Args:
+        prefix (bytes): Leading bytes of the message
+
+    Returns:
+        int: Header timestamp, or None if it cannot be read from the prefix
+    """
+    if not prefix or prefix[0] != 0x0A:  # field 1, length-delimited
+        return None
+
+    length, shift, pos = 0, 0, 1
+    while True:
+        if pos >= len(prefix) or shift > 28:
+            return None
+        byte = prefix[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+
+    if pos + length > len(prefix):
+        return None
+
+    header = gtfs_realtime_pb2.FeedHeader()
+    try:
+        header.ParseFromString(prefix[pos:pos + length])
+    except Exception:
+        return None
+    return header.timestamp if header.HasField('timestamp') else None
+
+
 class GTFSRealtimeFetcher:
-    def __init__(self, api_key=None, base_url="https://gtfsapi.translink.ca"):
+    def __init__(self, api_key=None, base_url="https://gtfsapi.translink.ca",
+                 max_workers=3, per_host_limit=3, state_path=None):
         """
         Initialize GTFS Realtime fetcher.
         
         Args:
             api_key (str): TransLink API key (if None, will use environment variable)
             base_url (str): Base URL for TransLink GTFS API
+            max_workers (int): Feeds fetched concurrently by fetch_all_feeds (1 = sequential)
+            per_host_limit (int): Max in-flight requests per host
+            state_path (str or Path): File the per-feed validators and header timestamps
+                are kept in between runs (None = kept in memory only)
         """
         self.api_key = api_key or os.getenv('TRANSLINK_API_KEY')
         self.base_url = base_url
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+
+        # Shared keep-alive session; the pool is sized for the concurrent fetches
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
+
+        # Per-feed state for conditional requests and unchanged-feed detection
+        # (load_state / save_state carry it over to the next cron run)
+        self.validators = {}
+        self.header_timestamps = {}
+        self.state_path = Path(state_path) if state_path else None
+        self.last_fetch_status = {}
         self.feeds = {
             'trip_updates': '/v3/gtfsrealtime',
             'vehicle_positions': '/v3/gtfsposition', 
@@ -52,16 +129,19 @@ class GTFSRealtimeFetcher:
         if not self.api_key:
             print("Warning: No API key provided. Set TRANSLINK_API_KEY environment variable or pass api_key parameter.")
     
-    def fetch_feed(self, feed_type, timeout=30):
+    def fetch_feed(self, feed_type, timeout=30, conditional=False):
         """
         Fetch a specific GTFS Realtime feed.
         
         Args:
             feed_type (str): Type of feed ('trip_updates', 'vehicle_positions', 'alerts')
             timeout (int): Request timeout in seconds
+            conditional (bool): Send ETag/If-Modified-Since validators and skip the body
+                when the feed header timestamp did not change since the last fetch
             
         Returns:
-            bytes: Raw protobuf data or None if failed
+            bytes: Raw protobuf data or None if failed or unchanged
+                (see last_fetch_status[feed_type])
         """
         if feed_type not in self.feeds:
             print(f"Error: Unknown feed type '{feed_type}'. Must be one of: {list(self.feeds.keys())}")
@@ -76,23 +156,20 @@ class GTFSRealtimeFetcher:
         params = {}
         if self.api_key:
             params['apikey'] = self.api_key
-        
+
+        validators = self.validators.get(feed_type, {}) if conditional else {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        self.last_fetch_status[feed_type] = FAILED
         try:
             print(f"Fetching {feed_type} from {url}")
-            response = requests.get(url, params=params, headers=headers, timeout=timeout)
-            
-            if response.status_code == 200:
-                print(f"Successfully fetched {feed_type}: {len(response.content)} bytes")
-                return response.content
-            elif response.status_code == 401:
-                print(f"Error: Unauthorized (401). Check your API key.")
-                return None
-            elif response.status_code == 429:
-                print(f"Error: Rate limited (429). Please wait before retrying.")
-                return None
-            else:
-                print(f"Error: HTTP {response.status_code} - {response.text}")
-                return None
+            with self._host_semaphore(url):
+                with self.session.get(url, params=params, headers=headers, timeout=timeout,
+                                      stream=True) as response:
+                    return self._read_response(feed_type, response, conditional)
                 
         except requests.exceptions.Timeout:
             print(f"Error: Request timeout after {timeout} seconds")
@@ -100,16 +177,90 @@ class GTFSRealtimeFetcher:
         except requests.exceptions.RequestException as e:
             print(f"Error: Request failed - {e}")
             return None
+
+    def _read_response(self, feed_type, response, conditional):
+        """Turn a streamed response into feed bytes, updating the per-feed state."""
+        if response.status_code == 304:
+            print(f"{feed_type} not modified (304)")
+            self.last_fetch_status[feed_type] = NOT_MODIFIED
+            return None
+        elif response.status_code == 401:
+            print(f"Error: Unauthorized (401). Check your API key.")
+            return None
+        elif response.status_code == 429:
+            print(f"Error: Rate limited (429). Please wait before retrying.")
+            return None
+        elif response.status_code != 200:
+            print(f"Error: HTTP {response.status_code} - {response.text}")
+            return None
+
+        chunks = response.iter_content(chunk_size=HEADER_PEEK_BYTES)
+        first_chunk = next(chunks, b'')
+        header_timestamp = peek_header_timestamp(first_chunk)
+
+        if (conditional and header_timestamp is not None
+                and header_timestamp == self.header_timestamps.get(feed_type)):
+            # Closing the streamed response drops the rest of the body
+            print(f"{feed_type} unchanged (header timestamp {header_timestamp}), skipping download")
+            self.last_fetch_status[feed_type] = UNCHANGED
+            return None
+
+        content = first_chunk + b''.join(chunks)
+
+        self.validators[feed_type] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        if header_timestamp is not None:
+            self.header_timestamps[feed_type] = header_timestamp
+        self.last_fetch_status[feed_type] = FETCHED
+
+        print(f"Successfully fetched {feed_type}: {len(content)} bytes")
+        return content
+
+    def forget(self, feed_type):
+        """Drop the conditional-request state of a feed so the next fetch downloads it."""
+        self.validators.pop(feed_type, None)
+        self.header_timestamps.pop(feed_type, None)
+
+    def load_state(self):
+        """
+        Restore the validators and header timestamps saved by a previous run.
+
+        Returns:
+            int: Number of feeds with restored state
+        """
+        state = read_state_file(self.state_path, 'realtime fetch state')
+        if not isinstance(state, dict):
+            return 0
+        self.validators = dict(state.get('validators', {}))
+        self.header_timestamps = dict(state.get('header_timestamps', {}))
+        return len(self.validators.keys() | self.header_timestamps.keys())
+
+    def save_state(self):
+        """Persist the validators and header timestamps to state_path (no-op without a path)."""
+        if self.state_path is None:
+            return
+        state = {'validators': dict(self.validators), 'header_timestamps': dict(self.header_timestamps)}
+        write_state_file(self.state_path, lambda f: pickle.dump(state, f))
+
+    def _host_semaphore(self, url):
+        """Semaphore limiting concurrent requests to the host of url."""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
     
-    def validate_protobuf(self, data):
+    def parse_feed(self, data):
         """
-        Validate that the data is a valid GTFS Realtime protobuf.
+        Parse and validate GTFS Realtime protobuf data.
         
         Args:
             data (bytes): Raw protobuf data
             
         Returns:
-            bool: True if valid, False otherwise
+            FeedMessage: Parsed message, or None if invalid
         """
         try:
             feed_message = gtfs_realtime_pb2.FeedMessage()
@@ -118,7 +269,7 @@ class GTFSRealtimeFetcher:
             # Basic validation
             if not feed_message.HasField('header'):
                 print("Error: Invalid protobuf - missing header")
-                return False
+                return None
             
             if len(feed_message.entity) == 0:
                 print("Warning: No entities in feed")
@@ -127,11 +278,23 @@ class GTFSRealtimeFetcher:
                   f"entities={len(feed_message.entity)}, "
                   f"timestamp={feed_message.header.timestamp}")
             
-            return True
+            return feed_message
             
         except Exception as e:
             print(f"Error: Invalid protobuf data - {e}")
-            return False
+            return None
+
+    def validate_protobuf(self, data):
+        """
+        Validate that the data is a valid GTFS Realtime protobuf.
+        
+        Args:
+            data (bytes): Raw protobuf data
+            
+        Returns:
+            bool: True if valid, False otherwise
+        """
+        return self.parse_feed(data) is not None
     
     def save_to_disk(self, data, feed_type, timestamp=None):
         """
@@ -170,29 +333,38 @@ class GTFSRealtimeFetcher:
             print(f"Error: Failed to save {feed_type} to disk - {e}")
             return None
     
-    def fetch_all_feeds(self, save_to_disk=True, validate=True):
+    def fetch_all_feeds(self, save_to_disk=True, validate=True, conditional=True):
         """
         Fetch all GTFS Realtime feeds.
+
+        Feeds are requested concurrently (up to max_workers) over the shared session.
+        Feeds reported unchanged map to (None, None); check last_fetch_status to tell
+        them apart from failures.
         
         Args:
             save_to_disk (bool): Whether to save feeds to disk
             validate (bool): Whether to validate protobuf data
+            conditional (bool): Skip feeds that did not change since the last call
             
         Returns:
             dict: Dictionary with feed_type -> (data, filepath) mappings
         """
         results = {}
         timestamp = datetime.now()
+        fetched = dict(self.iter_fetch(conditional=conditional))
         
         for feed_type in self.feeds.keys():
             print(f"\n{'='*60}")
-            print(f"Fetching {feed_type.upper()}")
+            print(f"{feed_type.upper()}")
             print(f"{'='*60}")
             
-            data = self.fetch_feed(feed_type)
+            data = fetched[feed_type]
             
             if data is None:
-                print(f"Failed to fetch {feed_type}")
+                if self.last_fetch_status.get(feed_type) in (NOT_MODIFIED, UNCHANGED):
+                    print(f"Skipped {feed_type}: {self.last_fetch_status[feed_type]}")
+                else:
+                    print(f"Failed to fetch {feed_type}")
                 results[feed_type] = (None, None)
                 continue
             
@@ -206,11 +378,36 @@ class GTFSRealtimeFetcher:
                 filepath = self.save_to_disk(data, feed_type, timestamp)
             
             results[feed_type] = (data, filepath)
-            
-            # Small delay between requests to be respectful
-            time.sleep(1)
         
         return results
+
+    def iter_fetch(self, conditional=True):
+        """
+        Fetch all feeds concurrently, yielding each as soon as it arrives.
+        
+        Args:
+            conditional (bool): Skip feeds that did not change since the last call
+            
+        Yields:
+            tuple: (feed_type, data) in completion order; data is None if failed or unchanged
+        """
+        feed_types = list(self.feeds.keys())
+        if self.max_workers == 1 or len(feed_types) <= 1:
+            for feed_type in feed_types:
+                yield feed_type, self.fetch_feed(feed_type, conditional=conditional)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(feed_types))) as executor:
+            futures = {
+                executor.submit(self.fetch_feed, feed_type, conditional=conditional): feed_type
+                for feed_type in feed_types
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def close(self):
+        """Close the shared HTTP session."""
+        self.session.close()
     
     def cleanup_old_files(self, days_to_keep=7):
         """
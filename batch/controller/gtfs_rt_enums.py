@@ -0,0 +1,12 @@
+"""
+GTFS Realtime enum value -> name maps.
+
+Shared by the ORM services (batch.services) and the NumPy feed decoder
+(batch.controller.feed_decoder). Kept free of batch imports so the decoder does
+not load batch.services, whose package __init__ imports the decoder back through
+ParquetFeedExporter.
+"""
+
+TRIP_SCHEDULE_RELATIONSHIPS = {0: 'SCHEDULED', 1: 'ADDED', 2: 'UNSCHEDULED', 3: 'CANCELED', 5: 'REPLACEMENT', 6: 'DUPLICATED', 7: 'DELETED', 8: 'NEW'}
+STOP_SCHEDULE_RELATIONSHIPS = {0: 'SCHEDULED', 1: 'SKIPPED', 2: 'NO_DATA', 3: 'UNSCHEDULED'}
+VEHICLE_STOP_STATUSES = {0: 'INCOMING_AT', 1: 'STOPPED_AT', 2: 'IN_TRANSIT_TO'}
@@ -34,25 +34,58 @@ from batch.services import (
     FeedMessageService,
     VehiclePositionsService,
     TripUpdatesService,
-    AlertsService
+    AlertsService,
+    BulkFeedService,
+    DescriptorIdCache
 )
+from batch.services.trip_updates_service import stop_time_update_values
 
 
 class GTFSRealtimeLoader:
-    def __init__(self):
+    def __init__(self, bulk_load=False, descriptor_cache_size=50000, fingerprint_index=None):
+        """
+        Args:
+            bulk_load (bool): Write each feed with one COPY per table in a single
+                transaction instead of the per-row ORM path.
+            descriptor_cache_size (int): Max entries per descriptor id cache (0 disables it).
+            fingerprint_index (StopTimeFingerprintIndex): When given, only stop_time_updates
+                whose values changed since the previous load are written.
+        """
+        self.bulk_load = bulk_load
+        self.fingerprint_index = fingerprint_index
+        # feed_type -> {'written': n, 'skipped': m} of the last differential load
+        self.stop_time_update_counts = {}
+        # Kept across connect/close so descriptor ids survive between loads
+        self.descriptor_cache = DescriptorIdCache(maxsize=descriptor_cache_size) if descriptor_cache_size > 0 else None
+        self.trip_descriptor_ids = None
+        self.vehicle_descriptor_ids = None
         self.db_connector = None
         self.db_session = None
+        self.db_connection = None
         # Initialize service instances (will be set after DB connection)
         self.feed_message_service = None
         self.vehicle_positions_service = None
         self.trip_updates_service = None
         self.alerts_service = None
+        self.bulk_feed_service = None
 
     def connect_db(self):
-        """Connect to PostgreSQL database using SQLAlchemy ORM."""
+        """
+        Connect to PostgreSQL database using SQLAlchemy ORM.
+
+        The engine is created once per loader and an open session/connection is
+        reused, so long-running callers can call this before every load.
+        """
+        needs_connection = self.bulk_load or self.descriptor_cache is not None
+        if self.db_session is not None and (
+                not needs_connection or (self.db_connection is not None and not self.db_connection.closed)):
+            return
+
         try:
-            self.db_connector = DatabaseConnector()
-            self.db_session = self.db_connector.get_session()
+            if self.db_connector is None:
+                self.db_connector = DatabaseConnector()
+            if self.db_session is None:
+                self.db_session = self.db_connector.get_session()
 
             # Initialize ORM service instances
             self.feed_message_service = FeedMessageService(self.db_session)
@@ -60,15 +93,43 @@ class GTFSRealtimeLoader:
             self.trip_updates_service = TripUpdatesService(self.db_session)
             self.alerts_service = AlertsService(self.db_session)
 
-            print("Connected to database successfully using ORM")
+            if needs_connection:
+                if self.db_connection is not None:
+                    # Dropped by the server since the last load
+                    print("Database connection was closed, reconnecting")
+                self.db_connection = self.db_connector.get_connection()
+
+            if self.descriptor_cache is not None:
+                self.descriptor_cache.connection = self.db_connection
+                if len(self.descriptor_cache) == 0:
+                    loaded = self.descriptor_cache.warm_load()
+                    print(f"Warm-loaded {loaded} descriptor ids")
+
+            if self.bulk_load:
+                self.bulk_feed_service = BulkFeedService(
+                    self.db_connection, self.descriptor_cache, self.fingerprint_index
+                )
+                print("Connected to database successfully (bulk COPY mode)")
+            else:
+                print("Connected to database successfully using ORM")
         except Exception as e:
             print(f"Error connecting to database: {e}")
             sys.exit(1)
 
+    def flush_state(self):
+        """Persist state that outlives a load (stop time fingerprints)."""
+        if self.fingerprint_index is not None:
+            self.fingerprint_index.save()
+
     def close_db(self):
         """Close database session."""
         if self.db_session:
             self.db_session.close()
+            self.db_session = None
+        if self.db_connection:
+            self.db_connection.close()
+            self.db_connection = None
+        self.flush_state()
 
     def load_feed_message(self, pb_file_path, feed_type):
         """Load a protobuf feed file into the database."""
@@ -95,11 +156,43 @@ class GTFSRealtimeLoader:
         try:
             feed_message = gtfs_realtime_pb2.FeedMessage()
             feed_message.ParseFromString(data)
-            
+        except Exception as e:
+            print(f"Error parsing protobuf data: {e}")
+            return None
+
+        return self.load_parsed_feed(feed_message, feed_type, len(data))
+
+    def load_parsed_feed(self, feed_message, feed_type, file_size):
+        """Load an already parsed FeedMessage into the database."""
+        if self.fingerprint_index is None:
+            return self._write_parsed_feed(feed_message, feed_type, file_size)
+
+        self.fingerprint_index.reset_counts()
+        feed_msg_id = self._write_parsed_feed(feed_message, feed_type, file_size)
+        if feed_msg_id:
+            # Only remember fingerprints of rows that actually reached the database
+            self.fingerprint_index.commit()
+            counts = {'written': self.fingerprint_index.written, 'skipped': self.fingerprint_index.skipped}
+            self.stop_time_update_counts[feed_type] = counts
+            if counts['written'] or counts['skipped']:
+                print(f"Stop time updates for {feed_type}: {counts['written']} written, "
+                      f"{counts['skipped']} unchanged and skipped")
+        else:
+            self.fingerprint_index.discard()
+        return feed_msg_id
+
+    def _write_parsed_feed(self, feed_message, feed_type, file_size):
+        try:
             print(f"Loading {feed_type} feed: {len(feed_message.entity)} entities")
-            
+
+            if self.bulk_load:
+                return self.load_feed_message_bulk(feed_message, feed_type, file_size)
+
+            if self.descriptor_cache is not None:
+                self.trip_descriptor_ids, self.vehicle_descriptor_ids = self.descriptor_cache.prefetch_feed(feed_message)
+
             # Insert feed message using ORM service
-            feed_msg_record = self.feed_message_service.create_feed_message(feed_type, len(data))
+            feed_msg_record = self.feed_message_service.create_feed_message(feed_type, file_size)
             
             # Insert header using ORM service
             header_record = self.feed_message_service.create_feed_header(feed_msg_record.id, feed_message.header)
@@ -124,6 +217,17 @@ class GTFSRealtimeLoader:
             traceback.print_exc()
             return None
 
+    def load_feed_message_bulk(self, feed_message, feed_type, file_size):
+        """Flatten a parsed FeedMessage and write it with one COPY per table."""
+        buffers = self.bulk_feed_service.flatten_feed(feed_message)
+        if buffers.duplicate_entities:
+            print(f"Skipped {buffers.duplicate_entities} duplicate entities")
+
+        feed_msg_id = self.bulk_feed_service.write_feed(buffers, feed_type, file_size)
+
+        row_counts = ", ".join(f"{table}={count}" for table, count in buffers.row_counts().items() if count)
+        print(f"Successfully bulk loaded {len(buffers.entities)} entities for {feed_type} ({row_counts})")
+        return feed_msg_id
 
     def insert_feed_entity(self, feed_msg_id, entity):
         """Insert feed entity and its specific data."""
@@ -139,24 +243,46 @@ class GTFSRealtimeLoader:
             self.insert_alert(entity_record.id, entity.alert)
 
 
+    def get_descriptor_ids(self, trip_desc, vehicle_desc):
+        """Resolve descriptor ids from the prefetched cache, or via ORM create-or-get."""
+        if self.trip_descriptor_ids is not None:
+            return (
+                self.trip_descriptor_ids[VehiclePositionsService.get_trip_descriptor_key(trip_desc)],
+                self.vehicle_descriptor_ids[VehiclePositionsService.get_vehicle_descriptor_key(vehicle_desc)]
+            )
+        return (
+            self.vehicle_positions_service.create_or_get_trip_descriptor(trip_desc).trip_descriptor_id,
+            self.vehicle_positions_service.create_or_get_vehicle_descriptor(vehicle_desc).vehicle_descriptor_id
+        )
+
     def insert_trip_update(self, entity_id: int, trip_update):
         """Insert trip update data using ORM."""
         # Create or get descriptors
-        trip_desc = self.vehicle_positions_service.create_or_get_trip_descriptor(trip_update.trip)
-        vehicle_desc = self.vehicle_positions_service.create_or_get_vehicle_descriptor(trip_update.vehicle)
+        trip_desc_id, vehicle_desc_id = self.get_descriptor_ids(trip_update.trip, trip_update.vehicle)
+
+        stop_time_updates = None
+        if self.fingerprint_index is not None:
+            trip_key = VehiclePositionsService.get_trip_descriptor_key(trip_update.trip)
+            stop_time_updates = []
+            for stu in trip_update.stop_time_update:
+                values = stop_time_update_values(stu)
+                key = self.fingerprint_index.make_key(trip_key[0], trip_key[3], values[0], values[1])
+                if self.fingerprint_index.is_changed(key, values[1:]):
+                    stop_time_updates.append(stu)
 
         # Create trip update
-        self.trip_updates_service.create_trip_update(entity_id, trip_update, trip_desc.trip_descriptor_id, vehicle_desc.vehicle_descriptor_id)
+        self.trip_updates_service.create_trip_update(
+            entity_id, trip_update, trip_desc_id, vehicle_desc_id, stop_time_updates
+        )
     
     
     def insert_vehicle_position(self, entity_id: int, vehicle_pos):
         """Insert vehicle position data using ORM."""
         # Create or get descriptors
-        trip_desc = self.vehicle_positions_service.create_or_get_trip_descriptor(vehicle_pos.trip)
-        vehicle_desc = self.vehicle_positions_service.create_or_get_vehicle_descriptor(vehicle_pos.vehicle)
+        trip_desc_id, vehicle_desc_id = self.get_descriptor_ids(vehicle_pos.trip, vehicle_pos.vehicle)
 
         # Create vehicle position
-        self.vehicle_positions_service.create_vehicle_position(entity_id, vehicle_pos, trip_desc.trip_descriptor_id, vehicle_desc.vehicle_descriptor_id)
+        self.vehicle_positions_service.create_vehicle_position(entity_id, vehicle_pos, trip_desc_id, vehicle_desc_id)
 
 
     def insert_alert(self, entity_id: int, alert):
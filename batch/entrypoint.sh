@@ -24,6 +24,7 @@ mkdir -p /app/batch/logs
 touch /app/batch/logs/cron_weather.log
 touch /app/batch/logs/cron_fetch.log
 touch /app/batch/logs/cron_predict.log
+touch /app/batch/logs/cron_departures.log
 chown -R batchuser:batchuser /app/batch/logs
 chmod 666 /app/batch/logs/cron_*.log
 echo "✓ Log files ready"
@@ -161,6 +162,9 @@ cat >> /tmp/gtfs-batch << 'CRONEOF'
 5 */2 * * * batchuser cd /app && python batch/run.py load-realtime --feeds trip_updates >> /app/batch/logs/cron_fetch.log 2>&1
 10 * * * * batchuser cd /app && python batch/run.py load-realtime --feeds alerts >> /app/batch/logs/cron_fetch.log 2>&1
 
+# Stop departures for the stop endpoints (daily at 00:05; the table also holds the next service day)
+5 0 * * * batchuser cd /app && python batch/run.py refresh-departures >> /app/batch/logs/cron_departures.log 2>&1
+
 # Regional Delay Prediction (every hour at minute 10) 
 # 2025/11/17 tmporary disabled
 # 10 * * * * batchuser cd /app && python batch/run.py predict >> /app/batch/logs/cron_predict.log 2>&1
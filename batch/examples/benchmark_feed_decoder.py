@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+GTFS Realtime デコーダーのマイクロベンチマーク
+
+保存済みの .pb（trip_updates / vehicle_positions）について、
+現行のフィールド単位の展開（BulkFeedService.flatten_feed）と
+batch.controller.feed_decoder の列指向デコード（高速パス / HasFieldフォールバック）を比較し、
+出力値が一致することを確認します。データベース接続は不要です。
+
+使用方法:
+    # 保存済みの .pb を使用（translink_<feed>_*.pb）
+    python batch/examples/benchmark_feed_decoder.py --fixtures-dir batch/downloads/gtfs_realtime
+
+    # 合成フィードで実行
+    python batch/examples/benchmark_feed_decoder.py --trips 1500 --stops 30
+"""
+
+import sys
+import argparse
+import random
+import time
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.controller.fetch_gtfs_realtime import gtfs_realtime_pb2
+from batch.controller.feed_decoder import (
+    PROTOBUF_BACKEND, decode_trip_updates, decode_vehicle_positions
+)
+from batch.services import BulkFeedService
+
+
+def build_trip_updates(timestamp, trips, stops):
+    """合成trip_updatesフィード（遅延0・出発なし・stop_id欠損などを含む）"""
+    rng = random.Random(0)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.timestamp = timestamp
+    for t in range(trips):
+        entity = feed.entity.add()
+        entity.id = str(t)
+        trip_update = entity.trip_update
+        trip_update.trip.trip_id = f"trip_{t}"
+        trip_update.trip.route_id = f"route_{t % 200}"
+        trip_update.trip.direction_id = t % 2
+        trip_update.trip.start_date = '20250102'
+        trip_update.vehicle.id = f"veh_{t}"
+        for s in range(stops):
+            stu = trip_update.stop_time_update.add()
+            stu.stop_sequence = s
+            if rng.random() > 0.05:
+                stu.stop_id = f"stop_{s}"
+            delay = rng.choice([0, 0, rng.randint(-120, 900)])
+            stu.arrival.delay = delay
+            stu.arrival.time = timestamp + 90 * s + delay
+            if rng.random() > 0.2:
+                stu.departure.delay = delay
+                stu.departure.time = timestamp + 90 * s + delay + 20
+            if rng.random() < 0.02:
+                stu.schedule_relationship = gtfs_realtime_pb2.TripUpdate.StopTimeUpdate.SKIPPED
+    return feed.SerializeToString()
+
+
+def build_vehicle_positions(timestamp, vehicles):
+    """合成vehicle_positionsフィード"""
+    rng = random.Random(1)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.timestamp = timestamp
+    for v in range(vehicles):
+        entity = feed.entity.add()
+        entity.id = str(v)
+        vehicle = entity.vehicle
+        vehicle.trip.trip_id = f"trip_{v}"
+        vehicle.trip.route_id = f"route_{v % 200}"
+        vehicle.vehicle.id = f"veh_{v}"
+        vehicle.vehicle.label = f"{v:04d}"
+        vehicle.position.latitude = 49.0 + rng.random()
+        vehicle.position.longitude = -123.0 - rng.random()
+        vehicle.current_stop_sequence = rng.randint(0, 40)
+        vehicle.current_status = rng.choice([0, 1, 2])
+        vehicle.timestamp = timestamp - rng.randint(0, 60)
+        vehicle.stop_id = f"stop_{v % 500}"
+    return feed.SerializeToString()
+
+
+def load_fixtures(fixtures_dir, trips, stops):
+    """(名前, フィード種別, バイト列) のリスト"""
+    if fixtures_dir is None:
+        timestamp = int(time.time())
+        return [
+            ('synthetic', 'trip_updates', build_trip_updates(timestamp, trips, stops)),
+            ('synthetic', 'vehicle_positions', build_vehicle_positions(timestamp, trips)),
+        ]
+
+    fixtures = []
+    for feed_type in ('trip_updates', 'vehicle_positions'):
+        for path in sorted(Path(fixtures_dir).rglob(f'translink_{feed_type}_*.pb')):
+            fixtures.append((path.name, feed_type, path.read_bytes()))
+    return fixtures
+
+
+def best_of(func, repeat):
+    """repeat回実行した最短時間（秒）と最後の結果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def per_field_rows(feed_message, feed_type):
+    """現行のフィールド単位の展開"""
+    buffers = BulkFeedService(None).flatten_feed(feed_message)
+    if feed_type == 'trip_updates':
+        return [(row[0], row[1:]) for row in buffers.stop_time_updates]
+    return [(row[0], row[1], row[2], row[3:]) for row in buffers.vehicle_positions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-field vs columnar GTFS-RT decoding')
+    parser.add_argument('--fixtures-dir', help='Directory with translink_<feed>_*.pb files')
+    parser.add_argument('--trips', type=int, default=1500, help='Synthetic trips / vehicles')
+    parser.add_argument('--stops', type=int, default=30, help='Synthetic stop_time_updates per trip')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures_dir, args.trips, args.stops)
+    if not fixtures:
+        print("No trip_updates / vehicle_positions fixtures found")
+        return 1
+
+    decoders = {'trip_updates': decode_trip_updates, 'vehicle_positions': decode_vehicle_positions}
+    totals = {'per_field': 0.0, 'fast_path': 0.0, 'fallback': 0.0}
+    all_identical = True
+
+    print(f"protobuf backend: {PROTOBUF_BACKEND}")
+    print(f"{'fixture':<48} {'rows':>8} {'per-field':>10} {'fast':>10} {'fallback':>10} {'speedup':>8}")
+    for name, feed_type, data in fixtures:
+        feed_message = gtfs_realtime_pb2.FeedMessage.FromString(data)
+        decode = decoders[feed_type]
+
+        per_field_time, expected = best_of(lambda: per_field_rows(feed_message, feed_type), args.repeat)
+        fast_time, fast = best_of(lambda: decode(feed_message, fast_path=True), args.repeat)
+        fallback_time, fallback = best_of(lambda: decode(feed_message, fast_path=False), args.repeat)
+
+        identical = list(fast.rows()) == expected and list(fallback.rows()) == expected
+        all_identical = all_identical and identical
+        totals['per_field'] += per_field_time
+        totals['fast_path'] += fast_time
+        totals['fallback'] += fallback_time
+
+        print(
+            f"{'✓' if identical else '✗'} {name[:46]:<46} {len(expected):>8,} "
+            f"{per_field_time * 1000:>8.1f}ms {fast_time * 1000:>8.1f}ms {fallback_time * 1000:>8.1f}ms "
+            f"{per_field_time / fast_time:>7.1f}x"
+        )
+
+    print("=" * 60)
+    print(
+        f"Total: per-field {totals['per_field']:.3f}s, fast path {totals['fast_path']:.3f}s "
+        f"({totals['per_field'] / totals['fast_path']:.1f}x), fallback {totals['fallback']:.3f}s"
+    )
+    print(f"Output identical to per-field path: {'✓' if all_identical else '✗'}")
+    return 0 if all_identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+インクリメンタル予測モードのベンチマーク
+
+合成した地域の入力データ（iter_predict_status_by_region() と同じ形式）について、
+初回の全件予測の後、一部のバス停の最新の時間帯に観測を追加した状態（オフピークの実行に相当）で
+インクリメンタルモードと全件予測の処理時間・推論シーケンス数を比較します。
+新規の予測と引き継いだ予測を合わせた結果が全件予測と一致すること（予測対象時刻を含む）、
+入力が変わらない場合は推論しないこと、前の時間帯の予測は引き継がないこと、
+dry-runでは状態を更新しないことも確認します。データベース接続は不要です（予測結果は保存しません）。
+
+使用方法:
+    # 小さな代替モデルで実行（23地域 x 400停留所、5%のバス停に観測を追加）
+    python batch/examples/benchmark_incremental_prediction.py
+
+    # 学習済みモデルと変更するバス停の割合を指定
+    python batch/examples/benchmark_incremental_prediction.py --model-path files/model/best_delay_model.h5 --changed-fraction 0.2
+"""
+
+import sys
+import argparse
+import contextlib
+import io
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.examples.benchmark_prediction_workers import SyntheticRepository, build_region_data, build_standin_model
+from batch.examples.test_data_standardizer import create_inputs
+from batch.jobs.regional_delay_prediction import RegionalDelayPredictionJob
+from batch.timeseries_processing import DataStandardizer
+
+# 実行ごとに変わる列（比較から除外。prediction_target_time は同じ時間帯の実行では一致する）
+RUN_COLUMNS = ['prediction_created_at']
+
+
+def run(job, regions, dry_run=False):
+    """ジョブを実行し、(実行時間, 結果, 新規の予測, 引き継いだ予測を含む全予測) を返す"""
+    saved, captured = [], []
+    job.save_predictions = lambda records: saved.append(records)
+    predict_all_regions = RegionalDelayPredictionJob.predict_all_regions.__get__(job)
+    job.predict_all_regions = lambda *a, **kw: captured.append(predict_all_regions(*a, **kw)) or captured[-1]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = job.execute(regions=regions, dry_run=dry_run)
+    elapsed = time.perf_counter() - start
+
+    new = pd.concat(saved, ignore_index=True) if saved else pd.DataFrame()
+    frames = []
+    for result in captured[-1]['results'].values():
+        if result is not None:
+            frames.extend(df for df in (result['predictions'], result['carried_forward']) if not df.empty)
+    return elapsed, results, new, sort_predictions(pd.concat(frames, ignore_index=True))
+
+
+def sort_predictions(df):
+    return df.drop(columns=RUN_COLUMNS).sort_values(
+        ['region_id', 'route_id', 'direction_id', 'stop_id', 'prediction_hour_offset']
+    ).reset_index(drop=True)
+
+
+def add_observations(region_data, fraction, seed):
+    """一部のバス停の最新の時間帯に観測を追加（平均遅延が変わる）"""
+    rng = np.random.default_rng(seed)
+    changed = {}
+    for region_id, data in region_data.items():
+        data = data.copy()
+        stops = data['stop_id'].unique()
+        selected = rng.choice(stops, max(int(len(stops) * fraction), 1), replace=False)
+        latest = (data['time_bucket'] == data['time_bucket'].max()) & data['stop_id'].isin(selected)
+        data.loc[latest, 'arrival_delay'] += rng.normal(0, 30, int(latest.sum()))
+        changed[region_id] = data
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the incremental prediction mode')
+    parser.add_argument('--model-path', help='Trained model (default: a small stand-in ConvLSTM)')
+    parser.add_argument('--regions', type=int, default=23, help='Synthetic regions')
+    parser.add_argument('--stops', type=int, default=400, help='Stops per region')
+    parser.add_argument('--changed-fraction', type=float, default=0.05, help='Stops with new observations')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    regions = [f"region_{i:02d}" for i in range(args.regions)]
+    region_data = {
+        region_id: build_region_data(region_id, args.stops, 9, seed) for seed, region_id in enumerate(regions)
+    }
+    updated_data = add_observations(region_data, args.changed_fraction, seed=99)
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='incremental_benchmark_'))
+    results = {}
+    try:
+        # 学習時の標準化パラメータ（全地域の入力で学習したものとみなす）
+        inputs = np.concatenate(create_inputs(region_data))
+        model_path = str(tmp_dir / 'standin_model.keras')
+        if args.model_path is not None:
+            shutil.copy(args.model_path, tmp_dir / Path(args.model_path).name)
+            model_path = str(tmp_dir / Path(args.model_path).name)
+        else:
+            build_standin_model(model_path, (inputs.shape[1], 1, inputs.shape[2], 1))
+        standardizer = DataStandardizer()
+        standardizer.fit_transform_features(inputs)
+        standardizer.save_scalers(DataStandardizer.scaler_path(model_path))
+
+        state_path = tmp_dir / 'prediction_state.pkl'
+        full_job = RegionalDelayPredictionJob(model_path=model_path)
+        incremental_job = RegionalDelayPredictionJob(model_path=model_path, incremental=True, state_path=str(state_path))
+
+        # 1回目: 状態がないため全件予測
+        full_job.repository = incremental_job.repository = SyntheticRepository(region_data)
+        run(full_job, regions[:1])
+        _, first, _, _ = run(incremental_job, regions)
+        results['first run predicts every stop'] = first['carried_forward_predictions'] == 0 and state_path.exists()
+
+        # dry-runでは状態を更新しない
+        modified = state_path.stat().st_mtime_ns
+        incremental_job.repository = SyntheticRepository(updated_data)
+        run(incremental_job, regions, dry_run=True)
+        results['dry run leaves the state unchanged'] = state_path.stat().st_mtime_ns == modified
+
+        # 2回目: 一部のバス停のみ入力ウィンドウが変わる
+        full_job.repository = SyntheticRepository(updated_data)
+        full_time, full, _, full_predictions = run(full_job, regions)
+        incremental_time, incremental, new, combined = run(incremental_job, regions)
+
+        identical = combined.equals(full_predictions)
+        results['new + carried forward == full run'] = identical
+        expected_new = len(full_predictions) * args.changed_fraction
+        results['only changed stops predicted'] = len(new) <= expected_new * 1.05 + 3 * args.regions
+
+        # 3回目: 入力が変わらない場合は推論しない
+        _, unchanged, unchanged_new, _ = run(incremental_job, regions)
+        results['unchanged inputs skip inference'] = (
+            unchanged['predict_calls'] == 0 and unchanged_new.empty
+            and unchanged['carried_forward_predictions'] == len(full_predictions)
+        )
+
+        # 4回目: 前の時間帯に作成した予測は引き継がない（時間帯が変わった直後の実行に相当）
+        state = incremental_job.input_state
+        for region_id, predictions in state._predictions.items():
+            state._predictions[region_id] = predictions.assign(
+                prediction_target_time=predictions['prediction_target_time'] - pd.Timedelta(hours=1)
+            )
+        _, next_hour, _, next_hour_predictions = run(incremental_job, regions)
+        results['predictions from an earlier hour are recomputed'] = (
+            next_hour['carried_forward_predictions'] == 0 and next_hour_predictions.equals(full_predictions)
+        )
+
+        print(f"{args.regions} regions x {args.stops} stops, {args.changed_fraction:.0%} of stops with new observations")
+        print(f"  {'run':<12} {'wall':>8} {'predict':>8} {'decode':>8} {'save':>8} {'calls':>6} {'new rows':>9} {'carried':>8}")
+        for name, elapsed, summary in [('full', full_time, full), ('incremental', incremental_time, incremental)]:
+            timings = summary['stage_timings']
+            print(
+                f"  {name:<12} {elapsed:>7.2f}s {timings['predict']:>7.3f}s {timings['decode']:>7.3f}s "
+                f"{timings['save']:>7.3f}s {summary['predict_calls']:>6} {summary['total_predictions']:>9,} "
+                f"{summary['carried_forward_predictions']:>8,}"
+            )
+        print(f"  speedup {full_time / incremental_time:.1f}x")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"  {'✓' if passed else '✗'} {name}")
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
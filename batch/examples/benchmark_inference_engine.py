@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+推論エンジン（InferenceEngine）のCPUベンチマーク
+
+バックエンド（function / keras / savedmodel / tflite）とバケットサイズごとに、1回の推論のレイテンシと
+スループットを計測し、予測値が Keras の predict_on_batch と一致することを確認します。
+また、地域ごとに異なるシーケンス数で推論した場合の合計時間を、従来の model.predict と比較します。
+GPUは使用せず、データベース接続は不要です。
+
+使用方法:
+    # 小さな代替モデルで実行
+    python batch/examples/benchmark_inference_engine.py
+
+    # 学習済みモデルとバケットサイズを指定
+    python batch/examples/benchmark_inference_engine.py --model-path files/model/best_delay_model.h5 --buckets 64 256 1024
+"""
+
+import os
+import sys
+
+# CPUでの計測のためGPUを無効化（TensorFlowのインポート前に設定）
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import tensorflow as tf
+
+from batch.examples.benchmark_prediction_workers import build_standin_model
+from batch.jobs.regional_delay_prediction import INFERENCE_BACKENDS, InferenceEngine, export_path_for
+
+
+def measure(run, inputs, repeats):
+    """中央値のレイテンシ（秒）"""
+    run(inputs)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(inputs)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU benchmark of InferenceEngine backends and bucket sizes')
+    parser.add_argument('--model-path', help='Trained model (default: a small stand-in ConvLSTM)')
+    parser.add_argument('--buckets', type=int, nargs='+', default=[1, 16, 64, 256, 1024], help='Bucket sizes')
+    parser.add_argument('--backends', nargs='+', choices=INFERENCE_BACKENDS, default=list(INFERENCE_BACKENDS))
+    parser.add_argument('--repeats', type=int, default=20, help='Timed calls per bucket size')
+    parser.add_argument('--regions', type=int, default=23, help='Regions in the varying-size run')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    tmp_dir = Path(tempfile.mkdtemp(prefix='inference_benchmark_'))
+    results = {}
+    try:
+        model_path = args.model_path
+        if model_path is None:
+            model_path = str(tmp_dir / 'standin_model.keras')
+            build_standin_model(model_path, (8, 1, 15, 1))
+        model = tf.keras.models.load_model(model_path, compile=False)
+        input_shape = tuple(model.input_shape[1:])
+
+        rng = np.random.default_rng(0)
+        buckets = sorted(set(args.buckets))
+        inputs = rng.normal(size=(buckets[-1],) + input_shape).astype(np.float32)
+        reference = np.asarray(model.predict_on_batch(inputs))
+
+        # 地域ごとに異なるシーケンス数（per-regionモードの推論に相当）
+        region_sizes = rng.integers(50, buckets[-1], args.regions)
+        region_inputs = [rng.normal(size=(size,) + input_shape).astype(np.float32) for size in region_sizes]
+
+        print(f"Model input {input_shape}, CPU threads: {tf.config.threading.get_intra_op_parallelism_threads() or 'auto'}")
+        print(f"\n{'backend':<11} {'bucket':>7} {'latency':>10} {'throughput':>14} {'max |diff|':>11}")
+
+        varying = {}
+        for backend in args.backends:
+            export_path = str(tmp_dir / export_path_for(model_path, backend).name) \
+                if backend in ('savedmodel', 'tflite') else None
+            start = time.perf_counter()
+            engine = InferenceEngine(model, buckets, backend, export_path)
+            engine.warm_up()
+            setup_time = time.perf_counter() - start
+
+            max_diff = 0.0
+            for bucket in buckets:
+                latency = measure(engine._runner(bucket), inputs[:bucket], args.repeats)
+                diff = float(np.abs(engine.predict(inputs[:bucket]) - reference[:bucket]).max())
+                max_diff = max(max_diff, diff)
+                print(f"{backend:<11} {bucket:>7} {latency * 1000:>8.2f}ms {bucket / latency:>10,.0f} seq/s {diff:>11.1e}")
+
+            start = time.perf_counter()
+            for region in region_inputs:
+                engine.predict(region)
+            varying[backend] = time.perf_counter() - start
+            traces = engine._function.experimental_get_tracing_count() if backend == 'function' else None
+
+            results[f"{backend}: matches predict_on_batch"] = max_diff < 1e-4
+            if traces is not None:
+                results[f"function: {traces} traces for {len(buckets)} buckets"] = traces <= len(buckets)
+            print(f"{backend:<11} setup (export + warm-up) {setup_time:.2f}s\n")
+
+        start = time.perf_counter()
+        for region in region_inputs:
+            model.predict(region, verbose=0)
+        baseline = time.perf_counter() - start
+
+        print(f"{args.regions} regions of {region_sizes.min()}-{region_sizes.max()} sequences "
+              f"({region_sizes.sum():,} total):")
+        print(f"  {'model.predict':<13} {baseline:>7.3f}s")
+        for backend, elapsed in varying.items():
+            print(f"  {backend:<13} {elapsed:>7.3f}s  ({baseline / elapsed:.1f}x)")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"  {'✓' if passed else '✗'} {name}")
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+地域遅延予測の並列前処理ベンチマーク
+
+合成した23地域分の入力データ（iter_predict_status_by_region() と同じ形式）について、
+RegionalDelayPredictionJob をワーカー数を変えて実行し、実行時間と処理段階ごとの時間を比較します。
+ワーカー数に関わらず予測結果が一致することも確認します。データベース接続は不要です
+（予測結果は保存しません）。
+
+使用方法:
+    # 小さな代替モデルで実行（1地域あたり400停留所）
+    python batch/examples/benchmark_prediction_workers.py
+
+    # 学習済みモデルとワーカー数を指定
+    python batch/examples/benchmark_prediction_workers.py --model-path files/model/best_delay_model.h5 --workers 1 2 4 8
+"""
+
+import sys
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.jobs.regional_delay_prediction import (
+    DEFAULT_FEATURE_GROUPS, RegionalDelayPredictionJob, preprocess_region
+)
+
+
+def build_region_data(region_id, stops, hours, seed):
+    """find_predict_status() 形式の合成データ（1停留所 x hours時間）"""
+    rng = np.random.default_rng(seed)
+    time_buckets = pd.date_range(
+        pd.Timestamp.now(tz='America/Vancouver').floor('h') - pd.Timedelta(hours=hours - 1),
+        periods=hours, freq='h'
+    )
+    rows = stops * hours
+    hour = time_buckets.hour.to_numpy()
+    return pd.DataFrame({
+        'route_id': np.repeat([f"R{s % 40}" for s in range(stops)], hours),
+        'stop_id': np.repeat([f"{region_id}-{s}" for s in range(stops)], hours),
+        'stop_name': np.repeat([f"Stop {s}" for s in range(stops)], hours),
+        'stop_lat': np.repeat(49.2 + rng.random(stops) * 0.1, hours),
+        'stop_lon': np.repeat(-123.1 - rng.random(stops) * 0.1, hours),
+        'time_bucket': np.tile(time_buckets, stops),
+        'direction_id': np.repeat(np.arange(stops) % 2, hours),
+        'hour_sin': np.tile(np.sin(2 * np.pi * hour / 24), stops),
+        'hour_cos': np.tile(np.cos(2 * np.pi * hour / 24), stops),
+        'day_cos': 1.0,
+        'day_sin': 0.0,
+        'is_peak_hour': np.tile(np.isin(hour, [7, 8, 17, 18]), stops),
+        'is_weekend': False,
+        'arrival_delay': rng.normal(60, 90, rows),
+        'line_direction_link_order': np.repeat(np.arange(stops) % 60, hours),
+        'delay_mean_by_route_hour': rng.normal(60, 30, rows),
+        'distance_from_downtown_km': np.repeat(rng.random(stops) * 30, hours),
+        'humidex': rng.normal(10, 5, rows),
+        'wind_speed': rng.random(rows) * 20,
+        'weather_rainy': rng.integers(0, 2, rows),
+    })
+
+
+class SyntheticRepository:
+    """RegionalDelayRepository の代わりに合成データを返す"""
+
+    def __init__(self, region_data):
+        self.region_data = region_data
+
+    def iter_predict_status_by_region(self, region_ids, chunksize=50000):
+        for region_id in sorted(region_ids):
+            if region_id in self.region_data:
+                yield region_id, self.region_data[region_id].copy()
+
+
+def build_standin_model(path, input_shape):
+    """学習済みモデルがない場合の小さなConvLSTMモデル"""
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=input_shape),
+        tf.keras.layers.ConvLSTM2D(8, (1, 3), padding='same'),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(3),
+    ])
+    model.save(path)
+
+
+def run(job, regions, workers):
+    """ワーカー数を指定して実行し、(実行時間, 結果, 予測値) を返す"""
+    saved = []
+    job.workers = workers
+    job.save_predictions = lambda records: saved.append(records)
+
+    start = time.perf_counter()
+    # 親プロセスとワーカーのSequenceCreatorの出力を抑制
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = job.execute(regions=regions, dry_run=False)
+    elapsed = time.perf_counter() - start
+
+    predictions = pd.concat(saved, ignore_index=True) if saved else pd.DataFrame()
+    return elapsed, results, predictions.drop(
+        columns=['prediction_created_at', 'prediction_target_time', 'prediction_execution_time_ms'], errors='ignore'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark RegionalDelayPredictionJob worker counts')
+    parser.add_argument('--model-path', help='Trained model (default: a small stand-in ConvLSTM)')
+    parser.add_argument('--regions', type=int, default=23, help='Synthetic regions')
+    parser.add_argument('--stops', type=int, default=400, help='Stops per region')
+    parser.add_argument('--workers', type=int, nargs='+', help='Worker counts (default: 1 2 4 ... CPU count)')
+    parser.add_argument('--inference-mode', choices=['batched', 'per-region'], default='batched')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    worker_counts = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    regions = [f"region_{i:02d}" for i in range(args.regions)]
+    region_data = {
+        region_id: build_region_data(region_id, args.stops, 9, seed)
+        for seed, region_id in enumerate(regions)
+    }
+    print(f"Synthetic dataset: {len(regions)} regions x {args.stops} stops "
+          f"({sum(len(df) for df in region_data.values()):,} rows)")
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='prediction_benchmark_'))
+    try:
+        model_path = args.model_path
+        if model_path is None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                prepared = preprocess_region(regions[0], region_data[regions[0]], 8, 3, DEFAULT_FEATURE_GROUPS)
+            model_path = str(tmp_dir / 'standin_model.keras')
+            build_standin_model(model_path, prepared['inputs'].shape[1:])
+
+        job = RegionalDelayPredictionJob(model_path=model_path, inference_mode=args.inference_mode)
+        job.repository = SyntheticRepository(region_data)
+
+        # 初回の推論（グラフ構築）を計測から除外
+        run(job, regions[:1], 1)
+
+        print(f"\n{'workers':>8} {'wall':>8} {'sequence':>9} {'standard':>9} {'predict':>8} "
+              f"{'decode':>8} {'speedup':>8}")
+        baseline_time, baseline = None, None
+        all_identical = True
+        for workers in worker_counts:
+            elapsed, results, predictions = run(job, regions, workers)
+            timings = results['stage_timings']
+            if baseline is None:
+                baseline_time, baseline = elapsed, predictions
+            identical = predictions.equals(baseline)
+            all_identical = all_identical and identical
+            print(
+                f"{'✓' if identical else '✗'} {workers:>6} {elapsed:>7.2f}s {timings['sequence']:>8.2f}s "
+                f"{timings['standardize']:>8.2f}s {timings['predict']:>7.2f}s {timings['decode']:>7.2f}s "
+                f"{baseline_time / elapsed:>7.2f}x"
+            )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("sequence / standardize / decode are summed across workers")
+    print(f"Predictions identical across worker counts: {'✓' if all_identical else '✗'}")
+    return 0 if all_identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
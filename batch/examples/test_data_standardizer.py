@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+保存済み標準化パラメータのテスト例
+
+学習時に保存した標準化パラメータ（<モデル名>_scalers.npz）を読み込んだ DataStandardizer について、
+sklearn の StandardScaler と同じ値になること、地域内のバス停構成に依存せず同じ入力に同じ値を返すこと、
+地域ごとにスケーラーを学習する従来の方法との処理時間を確認します。
+データベース接続・学習済みモデルは不要です。
+
+使用方法:
+    python batch/examples/test_data_standardizer.py
+
+    # 地域数・停留所数を指定
+    python batch/examples/test_data_standardizer.py --regions 23 --stops 400
+"""
+
+import sys
+import argparse
+import contextlib
+import io
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.examples.benchmark_prediction_workers import build_region_data
+from batch.jobs.regional_delay_prediction import DEFAULT_FEATURE_GROUPS, preprocess_region
+from batch.timeseries_processing import DataStandardizer, SequenceCreator
+
+
+def prepare(region_id, data, standardizer=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return preprocess_region(region_id, data, 8, 3, DEFAULT_FEATURE_GROUPS, standardizer)
+
+
+def create_inputs(region_data):
+    """地域ごとの予測入力シーケンス"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        creator = SequenceCreator(input_timesteps=8, output_timesteps=3, feature_groups=DEFAULT_FEATURE_GROUPS)
+        return [creator.create_stop_aware_sequences(data, prediction_mode=True)[0] for data in region_data.values()]
+
+
+def test_round_trip(tmp_dir):
+    """保存・読み込み後の変換が StandardScaler.transform と一致するか"""
+    rng = np.random.default_rng(0)
+    X_train = rng.normal(60, 90, (5000, 8, 15))
+    X_train[:, :, 3] = 1.0  # 分散0の列（scale_=1 として扱われる）
+    y_train = rng.normal(60, 90, (5000, 3))
+    X_live = rng.normal(60, 90, (400, 8, 15)).astype(object)  # bool特徴量を含む場合は object 配列
+
+    fitted = DataStandardizer()
+    fitted.fit_scalers(X_train, y_train)
+    path = fitted.save_scalers(DataStandardizer.scaler_path(tmp_dir / 'model.h5'))
+    loaded = DataStandardizer.load_scalers(path)
+
+    expected = fitted.feature_scaler.transform(X_live.reshape(-1, 15).astype(float)).reshape(X_live.shape)
+    actual = loaded.transform_features(X_live)
+    feature_error = np.abs(actual - expected).max()
+
+    y_scaled = loaded.transform_targets(y_train)
+    target_error = np.abs(loaded.inverse_transform_targets(y_scaled) - y_train).max()
+    sklearn_error = np.abs(y_scaled.reshape(-1, 1) - fitted.target_scaler.transform(y_train.reshape(-1, 1))).max()
+
+    ok = (path.name == 'model_scalers.npz' and actual.shape == X_live.shape and actual.dtype == np.float64
+          and feature_error < 1e-12 and target_error < 1e-9 and sklearn_error < 1e-12 and loaded.has_target_params)
+    print(f"{'✓' if ok else '✗'} Round trip: features max |diff| vs sklearn {feature_error:.1e}, "
+          f"targets {sklearn_error:.1e}, inverse {target_error:.1e}")
+
+    # 特徴量のみ学習した場合は目標値のパラメータを保存しない
+    features_only = DataStandardizer()
+    features_only.fit_transform_features(X_train)
+    features_only.save_scalers(tmp_dir / 'features_only.npz')
+    ok_features_only = not DataStandardizer.load_scalers(tmp_dir / 'features_only.npz').has_target_params
+    print(f"{'✓' if ok_features_only else '✗'} Feature-only scalers carry no target parameters")
+
+    try:
+        loaded.transform_features(X_live[:, :, :14])
+        ok_mismatch = False
+    except ValueError:
+        ok_mismatch = True
+    print(f"{'✓' if ok_mismatch else '✗'} Feature count mismatch raises ValueError")
+    return ok and ok_features_only and ok_mismatch
+
+
+def test_stability(region_data, standardizer):
+    """同じバス停の入力が、同時に処理するバス停の構成によらず同じ値になるか"""
+    subset = region_data[region_data['stop_id'].isin(region_data['stop_id'].unique()[::2])]
+
+    # 先頭のバス停は両方に含まれ、シーケンスの先頭になる
+    fixed = np.array_equal(
+        prepare('r', region_data, standardizer)['inputs'][0], prepare('r', subset, standardizer)['inputs'][0]
+    )
+    refit = np.array_equal(prepare('r', region_data)['inputs'][0], prepare('r', subset)['inputs'][0])
+    print(f"{'✓' if fixed else '✗'} Saved scalers: same stop standardized identically with half the stops removed")
+    print(f"  (per-region fit: {'identical' if refit else 'values change with the stops in the batch'})")
+    return fixed
+
+
+def test_speed(region_data, standardizer):
+    """地域ごとの学習と保存済みパラメータの変換の処理時間"""
+    inputs = create_inputs(region_data)
+
+    start = time.perf_counter()
+    for X in inputs:
+        DataStandardizer().fit_transform_features(X)
+    refit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for X in inputs:
+        standardizer.transform_features(X)
+    fixed_time = time.perf_counter() - start
+
+    print(f"✓ {len(inputs)} regions, {sum(len(X) for X in inputs):,} sequences: "
+          f"per-region fit {refit_time * 1000:.1f}ms, saved scalers {fixed_time * 1000:.1f}ms "
+          f"({refit_time / fixed_time:.1f}x)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test persisted DataStandardizer scalers')
+    parser.add_argument('--regions', type=int, default=23, help='Synthetic regions')
+    parser.add_argument('--stops', type=int, default=400, help='Stops per region')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    region_data = {
+        f"region_{i:02d}": build_region_data(f"region_{i:02d}", args.stops, 9, i) for i in range(args.regions)
+    }
+
+    # 全地域の入力で学習したパラメータを「学習時に保存したもの」とみなす
+    standardizer = DataStandardizer()
+    standardizer.fit_transform_features(np.concatenate(create_inputs(region_data)))
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='scaler_test_'))
+    try:
+        results = {
+            'round trip': test_round_trip(tmp_dir),
+            'stability': test_stability(region_data['region_00'], standardizer),
+            'speed': test_speed(region_data, standardizer),
+        }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"  {'✓' if passed else '✗'} {name}")
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
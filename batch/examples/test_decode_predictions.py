@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+予測結果デコード（decode_predictions / build_stop_cache）の回帰テスト例
+
+記録した入力（find_predict_status() 形式の入力データと予測値）について、ベクトル化したデコードの結果が
+従来のループ実装（バス停キャッシュの前方一致検索と iterrows）と列・dtype・値まで一致することを確認し、
+処理時間を比較します。データベース接続・学習済みモデルは不要です。
+
+使用方法:
+    # 合成データを記録して比較（1地域あたり2000停留所）
+    python batch/examples/test_decode_predictions.py
+
+    # 記録済みの入力で比較（pd.to_pickle({'region_id': ..., 'data': DataFrame, 'y_pred': ndarray}, path)）
+    python batch/examples/test_decode_predictions.py --inputs files/decode_inputs.pkl
+"""
+
+import sys
+import argparse
+import contextlib
+import io
+import logging
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.examples.benchmark_prediction_workers import build_region_data
+from batch.jobs.regional_delay_prediction import (
+    DEFAULT_FEATURE_GROUPS, build_stop_cache, decode_predictions, round_half_even
+)
+from batch.timeseries_processing import SequenceCreator
+
+OUTPUT_TIMESTEPS = 3
+
+
+def legacy_decode_predictions(y_pred, metadata, stop_cache, region_id, output_timesteps, now):
+    """従来の実装（比較用。予測基準時刻を引数で受け取る以外は同一）"""
+    if y_pred.ndim == 3:
+        y_pred_2d = y_pred[:, :output_timesteps, 0]
+    else:
+        y_pred_2d = y_pred[:, :output_timesteps]
+
+    prediction_created_at = now
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+
+    results = []
+    for idx, rds_key in enumerate(metadata):
+        parts = rds_key.split('_')
+        if len(parts) < 3:
+            continue
+
+        route_id = parts[0]
+        direction_id = int(parts[1])
+
+        matching_stops = {k: v for k, v in stop_cache.items() if k.startswith(rds_key + '_')}
+        if not matching_stops:
+            continue
+
+        cache_key = list(matching_stops.keys())[0]
+        stop_info = matching_stops[cache_key]
+
+        for hour_offset in range(1, output_timesteps + 1):
+            try:
+                delay_seconds = float(y_pred_2d[idx, hour_offset - 1])
+                if not np.isfinite(delay_seconds):
+                    continue
+
+                delay_minutes = delay_seconds / 60.0
+                prediction_target_time = current_hour + timedelta(hours=hour_offset - 1)
+
+                results.append({
+                    'region_id': region_id,
+                    'route_id': route_id,
+                    'direction_id': direction_id,
+                    'stop_id': stop_info['stop_id'],
+                    'stop_name': stop_info.get('stop_name'),
+                    'stop_lat': stop_info.get('stop_lat'),
+                    'stop_lon': stop_info.get('stop_lon'),
+                    'stop_sequence': stop_info.get('stop_sequence'),
+                    'prediction_created_at': prediction_created_at,
+                    'prediction_target_time': prediction_target_time,
+                    'prediction_hour_offset': hour_offset,
+                    'predicted_delay_seconds': round(delay_seconds, 2),
+                    'predicted_delay_minutes': round(delay_minutes, 2),
+                })
+            except (ValueError, IndexError, TypeError):
+                continue
+
+    return pd.DataFrame(results)
+
+
+def legacy_build_stop_cache(data):
+    """従来の実装（比較用）"""
+    cache = {}
+    grouped = data.sort_values('time_bucket', ascending=False).groupby(
+        ['route_id', 'direction_id', 'stop_id', 'line_direction_link_order'], as_index=False
+    ).first()
+
+    for _, row in grouped.iterrows():
+        cache_key = f"{row['route_id']}_{row['direction_id']}_{row['stop_id']}_{row['line_direction_link_order']}"
+        cache[cache_key] = {
+            'stop_id': str(row.get('stop_id', 'unknown')),
+            'stop_name': row.get('stop_name'),
+            'stop_sequence': row.get('line_direction_link_order'),
+            'stop_lat': float(row['stop_lat']) if pd.notna(row.get('stop_lat')) else None,
+            'stop_lon': float(row['stop_lon']) if pd.notna(row.get('stop_lon')) else None
+        }
+
+    return cache
+
+
+def record_inputs(path, stops, seed=0):
+    """合成した入力データと予測値を記録（実運用の入力と同じ形式）"""
+    rng = np.random.default_rng(seed)
+    data = build_region_data('region_00', stops, 9, seed)
+    data['stop_id'] = data['stop_id'].str.replace('region_00-', '5', regex=False)  # TransLink形式の数字ID
+    data['route_id'] = data['route_id'].str.lstrip('R')
+
+    # 同じバス停が複数の line_direction_link_order を持つ（ループ路線）
+    loop = data[data['stop_id'].isin(data['stop_id'].unique()[::7])].copy()
+    loop['line_direction_link_order'] += 60
+    # 最新の時刻のみ座標が欠損（欠損でない最新の値を使う）・座標が全て欠損のバス停
+    latest = data['time_bucket'] == data['time_bucket'].max()
+    data.loc[latest & (data.index % 5 == 0), ['stop_lat', 'stop_name']] = [np.nan, None]
+    data.loc[data['stop_id'].isin(data['stop_id'].unique()[1::50]), 'stop_lon'] = np.nan
+    data = pd.concat([data, loop], ignore_index=True).sample(frac=1.0, random_state=seed)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        creator = SequenceCreator(input_timesteps=8, output_timesteps=OUTPUT_TIMESTEPS,
+                                  feature_groups=DEFAULT_FEATURE_GROUPS)
+        X, _, metadata, _, _ = creator.create_stop_aware_sequences(data, prediction_mode=True)
+
+    # 予測値（float32、NaN・無限大・端数がちょうど .xx5 の値を含む）
+    y_pred = rng.normal(60, 90, (len(X), OUTPUT_TIMESTEPS, 1)).astype(np.float32)
+    y_pred.flat[rng.choice(y_pred.size, 20, replace=False)] = np.nan
+    y_pred.flat[rng.choice(y_pred.size, 5, replace=False)] = np.inf
+    y_pred.flat[:4] = [0.125, 2.375, -1.625, 90.0]
+
+    pd.to_pickle({'region_id': 'region_00', 'data': data, 'y_pred': y_pred, 'metadata': metadata}, path)
+    return path
+
+
+def load_inputs(path):
+    inputs = pd.read_pickle(path)
+    if 'metadata' not in inputs:
+        with contextlib.redirect_stdout(io.StringIO()):
+            creator = SequenceCreator(input_timesteps=8, output_timesteps=OUTPUT_TIMESTEPS,
+                                      feature_groups=DEFAULT_FEATURE_GROUPS)
+            inputs['metadata'] = creator.create_stop_aware_sequences(inputs['data'], prediction_mode=True)[2]
+    return inputs
+
+
+def test_regression(inputs, now):
+    """記録した入力で従来の実装と同じDataFrameになるか"""
+    region_id, data, y_pred, metadata = inputs['region_id'], inputs['data'], inputs['y_pred'], inputs['metadata']
+
+    start = time.perf_counter()
+    expected = legacy_decode_predictions(y_pred, metadata, legacy_build_stop_cache(data), region_id,
+                                         OUTPUT_TIMESTEPS, now)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = decode_predictions(y_pred, metadata, build_stop_cache(data), region_id, OUTPUT_TIMESTEPS, now)
+    vectorised_time = time.perf_counter() - start
+
+    try:
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+        ok = True
+    except AssertionError as e:
+        print(e)
+        ok = False
+    print(f"{'✓' if ok else '✗'} {len(metadata):,} sequences -> {len(actual):,} rows identical "
+          f"(columns, dtypes, values); loop {legacy_time:.2f}s, vectorised {vectorised_time * 1000:.1f}ms "
+          f"({legacy_time / vectorised_time:.0f}x)")
+    return ok
+
+
+def test_rounding():
+    """round_half_even が Python の round() と一致するか（端数が .5 付近の値を含む）"""
+    rng = np.random.default_rng(1)
+    values = np.concatenate([
+        rng.normal(0, 500, 200_000),
+        np.round(rng.normal(0, 500, 200_000), 3),
+        rng.normal(0, 500, 200_000).astype(np.float32).astype(np.float64),
+    ])
+    expected = np.array([round(float(v), 2) for v in values])
+    ok = np.array_equal(round_half_even(values, 2), expected)
+    print(f"{'✓' if ok else '✗'} round_half_even matches round() on {len(values):,} values "
+          f"(np.round differs on {int((np.round(values, 2) != expected).sum())})")
+    return ok
+
+
+def test_missing_stops(inputs, now):
+    """バス停情報がないシーケンス・空の入力"""
+    metadata = list(inputs['metadata'])
+    metadata[0] = 'unknown_0_0'
+    decoded = decode_predictions(inputs['y_pred'], metadata, build_stop_cache(inputs['data']), 'r',
+                                 OUTPUT_TIMESTEPS, now)
+    empty = decode_predictions(np.zeros((0, OUTPUT_TIMESTEPS)), [], build_stop_cache(inputs['data']), 'r',
+                               OUTPUT_TIMESTEPS, now)
+    ok = ('unknown' not in set(decoded['route_id'])) and empty.empty
+    print(f"{'✓' if ok else '✗'} Sequences without stop info are skipped; no sequences -> empty DataFrame")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regression test of the vectorised prediction decoder')
+    parser.add_argument('--inputs', help='Recorded inputs (pickle with region_id, data, y_pred)')
+    parser.add_argument('--stops', type=int, default=2000, help='Stops in the synthetic region')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    # 夏時間の終了直前（current_hour + オフセットが切り替えをまたぐ）
+    now = pytz.timezone('America/Vancouver').localize(datetime(2025, 11, 2, 0, 47, 12))
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='decode_test_'))
+    try:
+        path = args.inputs or record_inputs(tmp_dir / 'decode_inputs.pkl', args.stops)
+        inputs = load_inputs(path)
+        results = {
+            'regression': test_regression(inputs, now),
+            'rounding': test_rounding(),
+            'missing stops': test_missing_stops(inputs, now),
+        }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"  {'✓' if passed else '✗'} {name}")
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
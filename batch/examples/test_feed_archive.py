@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+GTFS Realtime フィードアーカイブのテスト例
+
+合成フィード（または保存済みの .pb）をセグメントアーカイブに追記し、
+.pbファイルとのサイズ比較、時刻指定の読み出し、書き込み中断からの復旧、
+空のセグメント（作成直後に停止）の読み出しを確認します。
+データベース接続は不要です。
+
+使用方法:
+    # 合成フィードで実行（1日分 = 5分間隔 x 288件）
+    python batch/examples/test_feed_archive.py
+
+    # 保存済みの translink_<feed>_<timestamp>.pb を使用
+    python batch/examples/test_feed_archive.py --source-dir batch/downloads/gtfs_realtime
+"""
+
+import sys
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.examples.test_realtime_fetch_stub import build_feed
+from batch.jobs.gtfs_realtime_replay import ARCHIVE_FILE_PATTERN, read_header_timestamp
+from batch.utils.feed_archive import (
+    FeedArchiveReader, FeedArchiveWriter, archive_stats, default_codec, iter_archive, list_segments
+)
+
+
+def load_feeds(source_dir, count):
+    """(feed_type, header_timestamp, data) のリストを作成"""
+    if source_dir is None:
+        start = int(time.time()) - count * 300
+        return [('vehicle_positions', start + i * 300, build_feed(start + i * 300, 1500)) for i in range(count)]
+
+    feeds = []
+    for path in sorted(Path(source_dir).rglob('translink_*.pb')):
+        match = ARCHIVE_FILE_PATTERN.match(path.name)
+        timestamp = read_header_timestamp(path) if match else None
+        if timestamp is not None:
+            feeds.append((match.group(1), timestamp, path.read_bytes()))
+    return sorted(feeds, key=lambda item: item[1])
+
+
+def test_size_and_read(archive_dir, feeds):
+    """圧縮率と時刻範囲の読み出し"""
+    print("=" * 60)
+    print(f"TEST 1: 追記と読み出し（codec={default_codec()}）")
+    print("=" * 60)
+
+    writer = FeedArchiveWriter(archive_dir)
+    start = time.perf_counter()
+    for feed_type, timestamp, data in feeds:
+        writer.append(feed_type, timestamp, data)
+    elapsed = time.perf_counter() - start
+
+    raw_bytes = sum(len(data) for _, _, data in feeds)
+    stats = archive_stats(archive_dir)
+    print(f"✓ {len(feeds)} feeds appended in {elapsed:.2f}s")
+    print(f"  .pb files: {raw_bytes:,} bytes / {len(feeds)} files")
+    print(f"  segments:  {stats['bytes']:,} bytes / {stats['segments']} segments "
+          f"({raw_bytes / max(stats['bytes'], 1):.1f}x smaller)")
+
+    # 中間の1/3の時刻範囲だけ読み出す
+    feed_type = feeds[0][0]
+    timestamps = [t for f, t, _ in feeds if f == feed_type]
+    since, until = timestamps[len(timestamps) // 3], timestamps[2 * len(timestamps) // 3]
+    start = time.perf_counter()
+    records = list(iter_archive(archive_dir, feed_type, since, until))
+    elapsed = time.perf_counter() - start
+
+    expected = [(t, d) for f, t, d in feeds if f == feed_type and since <= t <= until]
+    ok = records == expected
+    print(f"{'✓' if ok else '✗'} Range read: {len(records)} records in {elapsed * 1000:.1f}ms")
+    return ok
+
+
+def test_torn_write(archive_dir, feeds):
+    """書き込み途中で停止したセグメントへの追記"""
+    print("=" * 60)
+    print("TEST 2: 書き込み中断からの復旧")
+    print("=" * 60)
+
+    feed_type, timestamp, data = feeds[-1]
+    segment = list_segments(archive_dir, feed_type)[-1]
+    with FeedArchiveReader(segment) as reader:
+        before = len(reader)
+
+    # 不完全なレコードとインデックスエントリを残す
+    with open(segment, 'ab') as f:
+        f.write(b'\x00' * 7)
+    with open(segment.with_suffix('.idx'), 'ab') as f:
+        f.write(b'\x00' * 5)
+
+    FeedArchiveWriter(archive_dir).append(feed_type, timestamp + 1, data)
+    with FeedArchiveReader(segment) as reader:
+        ok = len(reader) == before + 1 and reader.read(len(reader) - 1) == (timestamp + 1, data)
+    print(f"{'✓' if ok else '✗'} Torn tail truncated, {before} -> {before + 1} records")
+    return ok
+
+
+def test_empty_segment(archive_dir, feeds):
+    """作成直後（最初の追記前）に停止した空のセグメント"""
+    print("=" * 60)
+    print("TEST 3: 空のセグメント")
+    print("=" * 60)
+
+    feed_type, timestamp, data = feeds[-1]
+    expected = list(iter_archive(archive_dir, feed_type))
+    # 既存のセグメントより後の時間帯に、レコードのないセグメントを残す
+    empty_timestamp = timestamp + 7200
+    empty = FeedArchiveWriter(archive_dir).append(feed_type, empty_timestamp, data)
+    empty.write_bytes(b'')
+    empty.with_suffix('.idx').unlink()
+
+    with FeedArchiveReader(empty) as reader:
+        empty_ok = len(reader) == 0 and list(reader.iter_records()) == []
+    replay_ok = list(iter_archive(archive_dir, feed_type)) == expected
+    print(f"{'✓' if empty_ok and replay_ok else '✗'} Empty segment read as 0 records, "
+          f"replay of {len(expected)} records unaffected")
+
+    # 空のセグメントへの追記はヘッダーから書き直す
+    FeedArchiveWriter(archive_dir).append(feed_type, empty_timestamp, data)
+    with FeedArchiveReader(empty) as reader:
+        append_ok = len(reader) == 1 and reader.read(0) == (empty_timestamp, data)
+    print(f"{'✓' if append_ok else '✗'} Append to the empty segment")
+    return empty_ok and replay_ok and append_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GTFS Realtime feed archive round-trip test')
+    parser.add_argument('--source-dir', help='Directory with translink_<feed>_<timestamp>.pb files')
+    parser.add_argument('--count', type=int, default=288, help='Number of synthetic feeds')
+    args = parser.parse_args()
+
+    feeds = load_feeds(args.source_dir, args.count)
+    if not feeds:
+        print("No feeds found")
+        return 1
+
+    archive_dir = Path(tempfile.mkdtemp(prefix='gtfs_rt_archive_'))
+    try:
+        results = {
+            'size_and_read': test_size_and_read(archive_dir, feeds),
+            'torn_write': test_torn_write(archive_dir, feeds),
+            'empty_segment': test_empty_segment(archive_dir, feeds),
+        }
+    finally:
+        shutil.rmtree(archive_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"  {'✓' if passed else '✗'} {name}")
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
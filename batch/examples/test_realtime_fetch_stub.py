@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+GTFS Realtime 並列取得のテスト例
+
+ローカルのHTTPスタブサーバーから .pb フィクスチャを配信し、
+GTFSRealtimeFetcher の並列取得・条件付きリクエスト・未更新フィードのスキップと、
+実行間（cronの別プロセス）での条件付きリクエスト状態の引き継ぎを確認します。
+APIキーやネットワーク接続は不要です。
+
+使用方法:
+    # 合成フィードで実行
+    python batch/examples/test_realtime_fetch_stub.py
+
+    # 保存済みの .pb を配信（translink_<feed>_latest.pb を使用）
+    python batch/examples/test_realtime_fetch_stub.py --fixtures-dir batch/downloads/gtfs_realtime
+"""
+
+import sys
+import argparse
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.controller.fetch_gtfs_realtime import (
+    GTFSRealtimeFetcher, gtfs_realtime_pb2, FETCHED, NOT_MODIFIED, UNCHANGED
+)
+
+FEED_PATHS = {
+    '/v3/gtfsrealtime': 'trip_updates',
+    '/v3/gtfsposition': 'vehicle_positions',
+    '/v3/gtfsalerts': 'alerts',
+}
+
+
+class StubFeedServer:
+    """フィクスチャを配信するスタブサーバー"""
+
+    def __init__(self, feeds, delay=0.0):
+        """
+        Args:
+            feeds (dict): フィード名 -> protobufバイト列
+            delay (float): 1リクエストあたりの応答遅延（秒）
+        """
+        self.feeds = dict(feeds)
+        self.delay = delay
+        self.send_validators = True
+        self.request_count = 0
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.request_count += 1
+                time.sleep(server.delay)
+
+                feed_type = FEED_PATHS.get(self.path.split('?')[0])
+                if feed_type is None:
+                    self.send_error(404)
+                    return
+
+                data = server.feeds[feed_type]
+                etag = '"' + hashlib.md5(data).hexdigest() + '"'
+                if server.send_validators and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-protobuf')
+                self.send_header('Content-Length', str(len(data)))
+                if server.send_validators:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', formatdate(usegmt=True))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def build_feed(timestamp, entity_count=500):
+    """合成FeedMessageを作成"""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.timestamp = timestamp
+    for i in range(entity_count):
+        entity = feed.entity.add()
+        entity.id = str(i)
+        entity.vehicle.trip.trip_id = f"trip_{i}"
+        entity.vehicle.vehicle.id = f"veh_{i}"
+        entity.vehicle.position.latitude = 49.2
+        entity.vehicle.position.longitude = -123.1
+        entity.vehicle.timestamp = timestamp
+    return feed.SerializeToString()
+
+
+def load_fixtures(fixtures_dir):
+    """フィクスチャを読み込む（指定がなければ合成データ）"""
+    if fixtures_dir is None:
+        timestamp = int(time.time())
+        return {feed_type: build_feed(timestamp) for feed_type in FEED_PATHS.values()}
+
+    feeds = {}
+    for feed_type in FEED_PATHS.values():
+        path = Path(fixtures_dir) / f"translink_{feed_type}_latest.pb"
+        feeds[feed_type] = path.read_bytes()
+    return feeds
+
+
+def make_fetcher(server, max_workers, state_path=None):
+    fetcher = GTFSRealtimeFetcher(
+        api_key='stub', base_url=server.base_url, max_workers=max_workers, state_path=state_path
+    )
+    fetcher.storage_dir = Path(tempfile.mkdtemp(prefix='gtfs_rt_stub_'))
+    return fetcher
+
+
+def test_parallel_fetch(server):
+    """並列取得と逐次取得の比較"""
+    print("=" * 60)
+    print("TEST 1: 並列取得")
+    print("=" * 60)
+
+    timings = {}
+    for max_workers in (1, 3):
+        fetcher = make_fetcher(server, max_workers)
+        start = time.perf_counter()
+        results = fetcher.fetch_all_feeds(save_to_disk=False, validate=True)
+        timings[max_workers] = time.perf_counter() - start
+        fetcher.close()
+
+        ok = all(data is not None for data, _ in results.values())
+        print(f"{'✓' if ok else '✗'} max_workers={max_workers}: {timings[max_workers]:.2f}s")
+        if not ok:
+            return False
+
+    return timings[3] < timings[1]
+
+
+def test_conditional_fetch(server):
+    """ETag (304) とヘッダータイムスタンプによるスキップ"""
+    print("=" * 60)
+    print("TEST 2: 条件付き取得")
+    print("=" * 60)
+
+    fetcher = make_fetcher(server, 3)
+    try:
+        fetcher.fetch_all_feeds(save_to_disk=False)
+        if set(fetcher.last_fetch_status.values()) != {FETCHED}:
+            print(f"✗ 初回取得に失敗: {fetcher.last_fetch_status}")
+            return False
+
+        # 2回目: ETagが一致するため304
+        fetcher.fetch_all_feeds(save_to_disk=False)
+        if set(fetcher.last_fetch_status.values()) != {NOT_MODIFIED}:
+            print(f"✗ 304が返されませんでした: {fetcher.last_fetch_status}")
+            return False
+        print("✓ ETag一致で304")
+
+        # 3回目: バリデータなしのサーバーでもヘッダータイムスタンプでスキップ
+        server.send_validators = False
+        fetcher.fetch_all_feeds(save_to_disk=False)
+        if set(fetcher.last_fetch_status.values()) != {UNCHANGED}:
+            print(f"✗ タイムスタンプでスキップされませんでした: {fetcher.last_fetch_status}")
+            return False
+        print("✓ ヘッダータイムスタンプ一致でスキップ")
+
+        # 4回目: 1フィードだけ更新
+        server.feeds['alerts'] = build_feed(int(time.time()) + 60)
+        results = fetcher.fetch_all_feeds(save_to_disk=False)
+        if fetcher.last_fetch_status['alerts'] != FETCHED or results['alerts'][0] is None:
+            print(f"✗ 更新フィードが取得されませんでした: {fetcher.last_fetch_status}")
+            return False
+        print("✓ 更新されたフィードのみ取得")
+        return True
+    finally:
+        server.send_validators = True
+        fetcher.close()
+
+
+def test_persisted_state(server):
+    """状態ファイル経由で次の実行（新しいFetcher）に条件付きリクエストの状態を引き継ぐ"""
+    print("=" * 60)
+    print("TEST 3: 実行間の状態引き継ぎ")
+    print("=" * 60)
+
+    state_dir = Path(tempfile.mkdtemp(prefix='gtfs_rt_state_'))
+    state_path = state_dir / 'fetch_state.pkl'
+
+    def run(expected, forget=()):
+        """1回のcron実行に相当: 状態を読み込み、取得し、保存する"""
+        fetcher = make_fetcher(server, 3, state_path)
+        try:
+            restored = fetcher.load_state()
+            fetcher.fetch_all_feeds(save_to_disk=False)
+            for feed_type in forget:
+                fetcher.forget(feed_type)
+            fetcher.save_state()
+        finally:
+            fetcher.close()
+        ok = fetcher.last_fetch_status == expected
+        print(f"{'✓' if ok else '✗'} restored {restored} feeds: {fetcher.last_fetch_status}")
+        return ok
+
+    feed_types = list(FEED_PATHS.values())
+    try:
+        # 1回目は全フィード取得、alerts はロード失敗とみなして状態を破棄
+        if not run({feed_type: FETCHED for feed_type in feed_types}, forget=['alerts']):
+            return False
+        # 2回目: 引き継いだETagで304、破棄した alerts のみ取得
+        expected = {feed_type: NOT_MODIFIED for feed_type in feed_types}
+        expected['alerts'] = FETCHED
+        if not run(expected):
+            return False
+        # 壊れた状態ファイルは無視して全フィード取得
+        state_path.write_bytes(b'not a pickle')
+        return run({feed_type: FETCHED for feed_type in feed_types})
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GTFS Realtime fetch test against a local stub server')
+    parser.add_argument('--fixtures-dir', help='Directory with translink_<feed>_latest.pb files')
+    parser.add_argument('--delay', type=float, default=0.3, help='Stub response delay in seconds')
+    args = parser.parse_args()
+
+    server = StubFeedServer(load_fixtures(args.fixtures_dir), delay=args.delay).start()
+    print(f"Stub server: {server.base_url}")
+
+    try:
+        results = {
+            'parallel_fetch': test_parallel_fetch(server),
+            'conditional_fetch': test_conditional_fetch(server),
+            'persisted_state': test_persisted_state(server),
+        }
+    finally:
+        server.stop()
+
+    print("=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"  {'✓' if passed else '✗'} {name}")
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
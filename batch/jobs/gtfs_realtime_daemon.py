@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+GTFS Realtime Daemon
+
+GTFSRealtimeFetchJobを常駐プロセスとして繰り返し実行します。
+DBエンジン・接続・descriptorキャッシュ・HTTPセッションを実行間で維持し、
+フィードヘッダーのタイムスタンプに合わせてポーリングします。
+"""
+
+import json
+import logging
+import signal
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from batch.config.settings import config
+from batch.jobs.gtfs_realtime_load import GTFSRealtimeFetchJob
+
+logger = logging.getLogger(__name__)
+
+
+class GTFSRealtimeDaemon:
+    """GTFS Realtime常駐ローダー"""
+
+    def __init__(
+        self,
+        job: GTFSRealtimeFetchJob,
+        interval: Optional[int] = None,
+        health_port: Optional[int] = None
+    ):
+        """
+        初期化
+
+        Args:
+            job: 繰り返し実行するジョブ（接続・キャッシュは実行間で維持される）
+            interval: ポーリング間隔（秒、Noneの場合は設定から取得）
+            health_port: ヘルス/メトリクスエンドポイントのポート（0で無効、Noneの場合は設定から取得）
+        """
+        self.job = job
+        self.interval = interval if interval is not None else config.gtfs_realtime.daemon_interval
+        self.lag_seconds = config.gtfs_realtime.daemon_lag_seconds
+        self.retry_seconds = config.gtfs_realtime.daemon_retry_seconds
+        self.health_port = health_port if health_port is not None else config.gtfs_realtime.health_port
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.stop_event = threading.Event()
+        self.job.stop_event = self.stop_event
+        self.job.keep_connection = True
+
+        self._metrics_lock = threading.Lock()
+        self.metrics: Dict[str, Any] = {
+            'started_at': time.time(),
+            'cycles_total': 0,
+            'cycle_failures_total': 0,
+            'consecutive_failures': 0,
+            'feeds_loaded_total': 0,
+            'feeds_unchanged_total': 0,
+            'feeds_failed_total': 0,
+            'last_cycle_at': None,
+            'last_success_at': None,
+            'last_cycle_duration_seconds': None,
+            'last_stage_timings': {},
+            'next_poll_at': None,
+        }
+        self._health_server: Optional[ThreadingHTTPServer] = None
+
+    def run(self, feeds: Optional[List[str]] = None):
+        """
+        停止要求まで取得→ロードを繰り返す
+
+        SIGTERM/SIGINTを受けると、書き込み中のフィードを完了させてから終了する。
+
+        Args:
+            feeds: 処理するフィードのリスト（Noneの場合は全フィード）
+        """
+        self._install_signal_handlers()
+        self._start_health_server()
+        self.logger.info(
+            f"Daemon started (interval={self.interval}s, lag={self.lag_seconds}s, "
+            f"health port={self.health_port or 'disabled'})"
+        )
+
+        try:
+            while not self.stop_event.is_set():
+                self.run_cycle(feeds)
+                if self.stop_event.is_set():
+                    break
+
+                next_poll = self.next_poll_time()
+                with self._metrics_lock:
+                    self.metrics['next_poll_at'] = next_poll
+                wait_seconds = max(0.0, next_poll - time.time())
+                self.logger.info(
+                    f"Next poll at {datetime.fromtimestamp(next_poll).strftime('%H:%M:%S')} "
+                    f"(in {wait_seconds:.0f}s)"
+                )
+                self.stop_event.wait(wait_seconds)
+        finally:
+            self.shutdown()
+
+    def run_cycle(self, feeds: Optional[List[str]] = None):
+        """1回分の取得→ロードを実行し、メトリクスを更新"""
+        cycle_start = time.time()
+        success = False
+        summary: Dict[str, Any] = {}
+        try:
+            results = self.job.run(feeds=feeds)
+            summary = results.get('summary', {})
+            success = results.get('success', False) and summary.get('failed_loads', 0) == 0
+        except (Exception, SystemExit) as e:
+            # connect_db()は接続エラー時にSystemExitを送出するため、常駐プロセスでは捕捉して継続
+            self.logger.error(f"Cycle failed: {e}", exc_info=True)
+
+        with self._metrics_lock:
+            self.metrics['cycles_total'] += 1
+            self.metrics['last_cycle_at'] = cycle_start
+            self.metrics['last_cycle_duration_seconds'] = time.time() - cycle_start
+            self.metrics['feeds_loaded_total'] += summary.get('successful_loads', 0)
+            self.metrics['feeds_unchanged_total'] += summary.get('unchanged_feeds', 0)
+            self.metrics['feeds_failed_total'] += summary.get('failed_fetches', 0) + summary.get('failed_loads', 0)
+            self.metrics['last_stage_timings'] = summary.get('stage_timings', {})
+            if success:
+                self.metrics['last_success_at'] = cycle_start
+                self.metrics['consecutive_failures'] = 0
+            else:
+                self.metrics['cycle_failures_total'] += 1
+                self.metrics['consecutive_failures'] += 1
+
+    def next_poll_time(self) -> float:
+        """
+        次回ポーリング時刻を計算
+
+        最新のフィードヘッダー時刻 + 間隔 + 公開遅延を目安にし、
+        その時刻を過ぎている場合（フィード未更新など）は短い間隔で再試行する。
+
+        Returns:
+            次回ポーリング時刻（UNIX時刻）
+        """
+        now = time.time()
+        header_timestamps = self.job.fetcher.header_timestamps.values()
+        if not header_timestamps:
+            return now + self.interval
+
+        next_poll = max(header_timestamps) + self.interval + self.lag_seconds
+        if next_poll <= now:
+            return now + self.retry_seconds
+        return min(next_poll, now + self.interval + self.lag_seconds)
+
+    def request_stop(self, signum=None, frame=None):
+        """停止要求（シグナルハンドラ）"""
+        if not self.stop_event.is_set():
+            self.logger.info(f"Stop requested (signal {signum}), finishing current feed...")
+        self.stop_event.set()
+
+    def shutdown(self):
+        """接続・HTTPセッション・ヘルスサーバーを閉じる"""
+        self.job.loader.close_db()
+        self.job.fetcher.close()
+        if self._health_server is not None:
+            self._health_server.shutdown()
+            self._health_server.server_close()
+            self._health_server = None
+        self.logger.info("Daemon stopped")
+
+    def health(self) -> Dict[str, Any]:
+        """
+        ヘルス状態を取得
+
+        Returns:
+            status（ok / starting / stale）と直近の実行状況
+        """
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+
+        if metrics['last_success_at'] is None:
+            # 初回成功までは起動猶予を与える
+            started_ago = time.time() - metrics['started_at']
+            status = 'starting' if started_ago < self.interval * 3 else 'stale'
+        elif time.time() - metrics['last_success_at'] > self.interval * 3:
+            status = 'stale'
+        else:
+            status = 'ok'
+
+        return {
+            'status': status,
+            'last_success_at': metrics['last_success_at'],
+            'last_cycle_at': metrics['last_cycle_at'],
+            'consecutive_failures': metrics['consecutive_failures'],
+            'next_poll_at': metrics['next_poll_at'],
+        }
+
+    def metrics_text(self) -> str:
+        """Prometheusテキスト形式のメトリクスを生成"""
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+
+        lines = []
+        declared = set()
+
+        def add(name: str, value, metric_type: str = 'gauge', labels: str = ''):
+            if value is None:
+                return
+            if name not in declared:
+                lines.append(f"# TYPE gtfs_rt_{name} {metric_type}")
+                declared.add(name)
+            lines.append(f"gtfs_rt_{name}{labels} {value}")
+
+        add('cycles_total', metrics['cycles_total'], 'counter')
+        add('cycle_failures_total', metrics['cycle_failures_total'], 'counter')
+        add('feeds_loaded_total', metrics['feeds_loaded_total'], 'counter')
+        add('feeds_unchanged_total', metrics['feeds_unchanged_total'], 'counter')
+        add('feeds_failed_total', metrics['feeds_failed_total'], 'counter')
+        add('consecutive_failures', metrics['consecutive_failures'])
+        add('last_cycle_duration_seconds', metrics['last_cycle_duration_seconds'])
+        add('last_success_timestamp_seconds', metrics['last_success_at'])
+        for stage, seconds in metrics['last_stage_timings'].items():
+            add('last_stage_seconds', f"{seconds:.6f}", labels=f'{{stage="{stage}"}}')
+
+        cache = self.job.loader.descriptor_cache
+        if cache is not None:
+            stats = cache.stats()
+            add('descriptor_cache_hits_total', stats['hits'], 'counter')
+            add('descriptor_cache_misses_total', stats['misses'], 'counter')
+            add('descriptor_cache_size', stats['size'])
+
+        return "\n".join(lines) + "\n"
+
+    def _install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+    def _start_health_server(self):
+        if not self.health_port:
+            return
+
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    health = daemon.health()
+                    body = json.dumps(health).encode('utf-8')
+                    self.send_response(503 if health['status'] == 'stale' else 200)
+                    self.send_header('Content-Type', 'application/json')
+                elif self.path == '/metrics':
+                    body = daemon.metrics_text().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                else:
+                    self.send_error(404)
+                    return
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._health_server = ThreadingHTTPServer((config.gtfs_realtime.health_host, self.health_port), HealthHandler)
+        threading.Thread(target=self._health_server.serve_forever, name='gtfs-rt-health', daemon=True).start()
+        self.logger.info(f"Health endpoint: http://{config.gtfs_realtime.health_host}:{self.health_port}/health")
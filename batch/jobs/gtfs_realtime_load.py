@@ -8,24 +8,33 @@ TransLink APIからGTFS Realtimeデータを取得し、
 
 import sys
 import logging
+import queue
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Any
 
 # プロジェクトルートをパスに追加
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from batch.controller.fetch_gtfs_realtime import GTFSRealtimeFetcher
+from batch.controller.fetch_gtfs_realtime import GTFSRealtimeFetcher, NOT_MODIFIED, UNCHANGED
 from batch.controller.load_gtfs_realtime import GTFSRealtimeLoader
+from batch.services import StopTimeFingerprintIndex, ParquetFeedExporter
 
 from batch.config.settings import config
 from batch.jobs.base_job import DatabaseJob
 from batch.utils.file_utils import cleanup_old_files
+from batch.utils.feed_archive import FeedArchiveWriter, cleanup_old_segments
 from batch.utils.error_handler import APIError, DatabaseError
 from batch.utils.mv_utils import refresh_materialized_views, log_refresh_statistics, refresh_alert_feature_views
 
 logger = logging.getLogger(__name__)
 
+# パイプラインのステージ終了マーカー
+_END_OF_STAGE = object()
+
 
 class GTFSRealtimeFetchJob(DatabaseJob):
     """GTFS Realtimeデータ取得ジョブ"""
@@ -39,7 +48,10 @@ class GTFSRealtimeFetchJob(DatabaseJob):
         save_to_disk: bool = True,
         cleanup_old_files_flag: bool = True,
         days_to_keep: Optional[int] = None,
-        refresh_mv: bool = True
+        refresh_mv: bool = True,
+        bulk_load: Optional[bool] = None,
+        differential: Optional[bool] = None,
+        export_parquet: Optional[bool] = None
     ):
         """
         初期化
@@ -50,6 +62,9 @@ class GTFSRealtimeFetchJob(DatabaseJob):
             cleanup_old_files_flag: 古いファイルをクリーンアップするか
             days_to_keep: ファイル保持日数（Noneの場合は設定から取得）
             refresh_mv: マテリアライズドビューをリフレッシュするか
+            bulk_load: COPYによる一括ロードを使うか（Noneの場合は設定から取得）
+            differential: 変更のあったstop_time_updatesのみ書き込むか（Noneの場合は設定から取得）
+            export_parquet: 学習用Parquetデータセットにも出力するか（Noneの場合は設定から取得）
         """
         # 基底クラスの初期化
         super().__init__(job_name="GTFSRealtimeFetchJob")
@@ -67,103 +82,263 @@ class GTFSRealtimeFetchJob(DatabaseJob):
         self.cleanup_old_files_flag = cleanup_old_files_flag
         self.days_to_keep = days_to_keep if days_to_keep is not None else config.gtfs_realtime.cleanup_days
         self.refresh_mv = refresh_mv
-
-        # Fetcherとloader初期化
-        self.fetcher = GTFSRealtimeFetcher(api_key=self.api_key)
+        self.bulk_load = bulk_load if bulk_load is not None else config.gtfs_realtime.bulk_load
+        self.queue_size = config.gtfs_realtime.pipeline_queue_size
+        # 常駐モード用: 実行間でDB接続を維持するか、停止要求イベント
+        self.keep_connection = False
+        self.stop_event: Optional[threading.Event] = None
+        self.differential = differential if differential is not None else config.gtfs_realtime.differential_ingest
+
+        # 差分ロード用フィンガープリント（前回実行分をディスクから復元）
+        fingerprint_index = None
+        if self.differential:
+            fingerprint_index = StopTimeFingerprintIndex(
+                config.gtfs_realtime.fingerprint_path
+                or config.directories.gtfs_rt_storage_dir / 'stop_time_fingerprints.npz'
+            )
+            loaded = fingerprint_index.load()
+            self.logger.info(f"  - Stop time fingerprints loaded: {loaded} ({fingerprint_index.path})")
+
+        # Fetcherとloader初期化（条件付きリクエストの状態は前回実行分をディスクから復元）
+        self.fetcher = GTFSRealtimeFetcher(
+            api_key=self.api_key,
+            base_url=config.translink_api.base_url,
+            max_workers=config.gtfs_realtime.fetch_workers,
+            per_host_limit=config.gtfs_realtime.fetch_per_host_limit,
+            state_path=config.gtfs_realtime.fetch_state_path
+            or config.directories.gtfs_rt_storage_dir / 'fetch_state.pkl'
+        )
         self.fetcher.storage_dir = config.directories.gtfs_rt_storage_dir
-        self.loader = GTFSRealtimeLoader()
+        restored = self.fetcher.load_state()
+        self.logger.info(f"  - Fetch state restored for {restored} feeds ({self.fetcher.state_path})")
+
+        # 圧縮セグメントアーカイブ（archive_format=segment の場合、.pbファイルの代わりに追記）
+        self.archive_dir = Path(config.gtfs_realtime.archive_dir or config.directories.gtfs_rt_storage_dir / 'archive')
+        self.archive_writer = None
+        if config.gtfs_realtime.archive_format == 'segment':
+            self.archive_writer = FeedArchiveWriter(self.archive_dir, codec=config.gtfs_realtime.archive_codec)
+        elif config.gtfs_realtime.archive_format != 'pb':
+            raise ValueError(
+                f"Unknown GTFS_RT_ARCHIVE_FORMAT '{config.gtfs_realtime.archive_format}'. Must be 'pb' or 'segment'"
+            )
+
+        # 学習用Parquetデータセット
+        if export_parquet is None:
+            export_parquet = config.gtfs_realtime.parquet_export
+        self.parquet_exporter = None
+        if export_parquet:
+            self.parquet_exporter = ParquetFeedExporter(
+                config.gtfs_realtime.parquet_dir or config.directories.gtfs_rt_storage_dir / 'parquet'
+            )
+        self.loader = GTFSRealtimeLoader(
+            bulk_load=self.bulk_load,
+            descriptor_cache_size=config.gtfs_realtime.descriptor_cache_size,
+            fingerprint_index=fingerprint_index
+        )
 
         self.logger.info("GTFSRealtimeFetchJob initialized")
         self.logger.info(f"  - API key: {self.api_key[:8]}..." if len(self.api_key) > 8 else "  - API key configured")
         self.logger.info(f"  - Storage dir: {config.directories.gtfs_rt_storage_dir}")
         self.logger.info(f"  - Save to disk: {self.save_to_disk}")
+        if self.archive_writer is not None:
+            self.logger.info(f"  - Archive: segment ({self.archive_dir})")
         self.logger.info(f"  - Refresh MV: {self.refresh_mv}")
+        self.logger.info(f"  - Load mode: {'bulk (COPY)' if self.bulk_load else 'ORM'}")
+        self.logger.info(f"  - Differential stop time ingest: {self.differential}")
+        if self.parquet_exporter is not None:
+            self.logger.info(f"  - Parquet export: {self.parquet_exporter.root_dir}")
+
+    def is_unchanged(self, feed_type: str) -> bool:
+        """前回取得時からフィードが更新されていないか"""
+        return self.fetcher.last_fetch_status.get(feed_type) in (NOT_MODIFIED, UNCHANGED)
 
-    def fetch_feeds(
+    def run_pipeline(
         self,
         feeds: Optional[List[str]] = None,
-        validate: bool = True
-    ) -> Dict[str, Tuple[Optional[bytes], Optional[Path]]]:
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
         """
-        フィードを取得
+        取得→パース→ロードをパイプラインで実行
+
+        取得スレッドとパーススレッドを容量制限付きキューで繋ぎ、ロードは呼び出しスレッドで行う。
+        先に届いたフィードのロードは残りのフィードの取得・パースと並行して進む。
+        各フィードのパースは1回のみで、検証済みFeedMessageをそのままローダーに渡す。
 
         Args:
-            feeds: 取得するフィードのリスト（Noneの場合は全フィード）
-            validate: Protobufバリデーションを実行するか
+            feeds: 処理するフィードのリスト（Noneの場合は全フィード）
+            dry_run: Trueの場合、DBに保存せずパースまで実行
 
         Returns:
-            フィード名 -> (データ, ファイルパス)のマッピング
+            fetch_status（フィード名 -> success/unchanged/invalid/failed）、file_paths、
+            load_results（フィード名 -> feed_message_id）、stage_timings（秒）を含む辞書
         """
         if feeds is None:
             feeds = self.AVAILABLE_FEEDS
 
-        self.logger.info(f"Fetching {len(feeds)} feeds: {', '.join(feeds)}")
+        fetch_queue = queue.Queue(maxsize=self.queue_size)
+        load_queue = queue.Queue(maxsize=self.queue_size)
+        fetch_status: Dict[str, str] = {}
+        file_paths: Dict[str, Optional[Path]] = {}
+        load_results: Dict[str, Optional[int]] = {}
+        # fetch/totalは経過時間、parse/loadは各ステージの処理時間の合計
+        stage_timings = {'fetch': 0.0, 'parse': 0.0, 'load': 0.0, 'total': 0.0}
+        errors: List[Exception] = []
+        fetch_timestamp = datetime.now()
 
-        # 一時的にフィードを制限
         original_feeds = self.fetcher.feeds.copy()
-        if set(feeds) != set(self.AVAILABLE_FEEDS):
-            self.fetcher.feeds = {k: v for k, v in original_feeds.items() if k in feeds}
+        self.fetcher.feeds = {k: v for k, v in original_feeds.items() if k in feeds}
+
+        def fetch_stage():
+            start = time.perf_counter()
+            try:
+                for feed_type, data in self.fetcher.iter_fetch():
+                    if data is None:
+                        fetch_status[feed_type] = 'unchanged' if self.is_unchanged(feed_type) else 'failed'
+                        continue
+                    fetch_queue.put((feed_type, data))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                stage_timings['fetch'] = time.perf_counter() - start
+                fetch_queue.put(_END_OF_STAGE)
+
+        def parse_stage():
+            while True:
+                item = fetch_queue.get()
+                if item is _END_OF_STAGE:
+                    break
+                feed_type, data = item
+                start = time.perf_counter()
+                feed_message = None
+                try:
+                    feed_message = self.fetcher.parse_feed(data)
+                    fetch_status[feed_type] = 'success' if feed_message is not None else 'invalid'
+                    if feed_message is not None and self.save_to_disk:
+                        file_paths[feed_type] = self._archive_feed(feed_type, feed_message, data, fetch_timestamp)
+                    if feed_message is not None and self.parquet_exporter is not None:
+                        self._export_parquet(feed_type, feed_message)
+                except Exception as e:
+                    self.logger.error(f"✗ Error parsing {feed_type}: {e}", exc_info=True)
+                    fetch_status[feed_type] = 'failed'
+                if feed_message is None:
+                    self.fetcher.forget(feed_type)
+                stage_timings['parse'] += time.perf_counter() - start
+
+                if feed_message is not None:
+                    # 生データはここで手放し、ロード側にはパース済みメッセージのみ渡す
+                    load_queue.put((feed_type, feed_message, len(data)))
+            load_queue.put(_END_OF_STAGE)
+
+        pipeline_start = time.perf_counter()
+        workers = [
+            threading.Thread(target=fetch_stage, name='gtfs-rt-fetch', daemon=True),
+            threading.Thread(target=parse_stage, name='gtfs-rt-parse', daemon=True)
+        ]
+        for worker in workers:
+            worker.start()
 
         try:
-            results = self.fetcher.fetch_all_feeds(
-                save_to_disk=self.save_to_disk,
-                validate=validate
-            )
-            return results
+            if not dry_run:
+                # 接続（descriptorキャッシュのウォームロードを含む）も取得と並行させる
+                start = time.perf_counter()
+                self.logger.info("Connecting to database...")
+                self.loader.connect_db()
+                stage_timings['load'] += time.perf_counter() - start
+
+            try:
+                while True:
+                    item = load_queue.get()
+                    if item is _END_OF_STAGE:
+                        break
+                    feed_type, feed_message, file_size = item
+                    if dry_run:
+                        continue
+                    if self.stop_event is not None and self.stop_event.is_set():
+                        # 停止要求後は新しいフィードの書き込みを始めない（書き込み中のフィードは完了させる）
+                        self.logger.warning(f"Shutdown requested, not loading {feed_type}")
+                        self.fetcher.forget(feed_type)
+                        continue
+
+                    self.logger.info(f"Loading {feed_type} to database...")
+                    start = time.perf_counter()
+                    feed_msg_id = self.loader.load_parsed_feed(feed_message, feed_type, file_size)
+                    stage_timings['load'] += time.perf_counter() - start
+
+                    if feed_msg_id:
+                        self.logger.info(
+                            f"✓ Successfully loaded {feed_type} "
+                            f"(feed_msg_id: {feed_msg_id})"
+                        )
+                    else:
+                        self.logger.error(f"✗ Failed to load {feed_type}")
+                        # 次回の取得で未更新扱いにならないよう条件付きリクエストの状態を破棄
+                        self.fetcher.forget(feed_type)
+                    load_results[feed_type] = feed_msg_id
+            finally:
+                if dry_run:
+                    pass
+                elif self.keep_connection:
+                    self.loader.flush_state()
+                else:
+                    self.loader.close_db()
+                    self.logger.info("Database connection closed")
+
+            for worker in workers:
+                worker.join()
         finally:
-            # フィード設定を復元
             self.fetcher.feeds = original_feeds
 
-    def load_to_database(
-        self,
-        fetch_results: Dict[str, Tuple[Optional[bytes], Optional[Path]]]
-    ) -> Dict[str, Optional[int]]:
-        """
-        取得したデータをデータベースに保存
-
-        Args:
-            fetch_results: fetch_feeds()の結果
+        stage_timings['total'] = time.perf_counter() - pipeline_start
 
-        Returns:
-            フィード名 -> feed_message_idのマッピング
-        """
-        load_results = {}
+        if errors:
+            raise errors[0]
 
-        self.logger.info("Connecting to database...")
-        self.loader.connect_db()
+        if not dry_run:
+            # ロードに失敗したフィードは forget 済みのため、次回実行では本体を取得し直す
+            self.fetcher.save_state()
 
-        try:
-            for feed_type, (data, filepath) in fetch_results.items():
-                if data is None:
-                    self.logger.warning(f"Skipping {feed_type} - no data fetched")
-                    load_results[feed_type] = None
-                    continue
+        return {
+            'fetch_status': fetch_status,
+            'file_paths': file_paths,
+            'load_results': load_results,
+            'stage_timings': stage_timings
+        }
 
-                self.logger.info(f"Loading {feed_type} to database...")
+    def _archive_feed(self, feed_type: str, feed_message, data: bytes, fetch_timestamp: datetime) -> Path:
+        """
+        生フィードを保存（.pbファイルまたは圧縮セグメントへの追記）
 
-                try:
-                    # データから直接ロード
-                    feed_msg_id = self.loader.load_feed_data(data, feed_type)
+        Args:
+            feed_type: フィード種別
+            feed_message: パース済みFeedMessage
+            data: 生のprotobufデータ
+            fetch_timestamp: 取得時刻（.pbファイル名用）
 
-                    if feed_msg_id:
-                        self.logger.info(
-                            f"✓ Successfully loaded {feed_type} "
-                            f"(feed_msg_id: {feed_msg_id})"
-                        )
-                        load_results[feed_type] = feed_msg_id
-                    else:
-                        self.logger.error(f"✗ Failed to load {feed_type}")
-                        load_results[feed_type] = None
+        Returns:
+            保存先のパス
+        """
+        if self.archive_writer is None:
+            return self.fetcher.save_to_disk(data, feed_type, fetch_timestamp)
 
-                except Exception as e:
-                    self.logger.error(f"✗ Error loading {feed_type}: {e}", exc_info=True)
-                    load_results[feed_type] = None
+        header_timestamp = feed_message.header.timestamp or int(time.time())
+        path = self.archive_writer.append(feed_type, header_timestamp, data)
+        self.logger.info(f"Archived {feed_type} ({len(data):,} bytes) to {path.name}")
+        return path
 
-        finally:
-            self.loader.close_db()
-            self.logger.info("Database connection closed")
+    def _export_parquet(self, feed_type: str, feed_message):
+        """
+        Parquetデータセットへ出力（失敗してもDBへのロードは継続）
 
-        return load_results
+        Args:
+            feed_type: フィード種別
+            feed_message: パース済みFeedMessage
+        """
+        try:
+            paths = self.parquet_exporter.export_feed(feed_message, feed_type)
+            if paths:
+                self.logger.info(f"Exported {feed_type} to {len(paths)} Parquet partition(s)")
+        except Exception as e:
+            self.logger.warning(f"Parquet export failed for {feed_type}: {e}", exc_info=True)
 
     def cleanup_old_data(self):
         """古いファイルをクリーンアップ"""
@@ -180,6 +355,7 @@ class GTFSRealtimeFetchJob(DatabaseJob):
                 days_to_keep=self.days_to_keep,
                 recursive=True
             )
+            cleanup_old_segments(self.archive_dir, days_to_keep=self.days_to_keep)
             self.logger.info("Cleanup completed")
         except Exception as e:
             self.logger.error(f"Cleanup failed: {e}", exc_info=True)
@@ -216,6 +392,7 @@ class GTFSRealtimeFetchJob(DatabaseJob):
                 'successful_fetches': 0,
                 'successful_loads': 0,
                 'failed_fetches': 0,
+                'unchanged_feeds': 0,
                 'failed_loads': 0,
                 'inserted_records': 0,
                 'updated_records': 0,
@@ -223,39 +400,50 @@ class GTFSRealtimeFetchJob(DatabaseJob):
             }
         }
 
-        # ステップ1: フィード取得
+        # ステップ1-2: 取得→パース→ロード（パイプライン実行）
         self.logger.info("=" * 60)
-        self.logger.info("STEP 1: FETCHING REALTIME DATA")
+        self.logger.info("STEP 1-2: FETCH → PARSE → LOAD PIPELINE")
         self.logger.info("=" * 60)
+        if dry_run:
+            self.logger.info("\n[DRY RUN] Skipping database load")
 
-        fetch_results = self.fetch_feeds(feeds=feeds, validate=True)
-        results['fetch_results'] = fetch_results
+        pipeline_results = self.run_pipeline(feeds=feeds, dry_run=dry_run)
+        fetch_status = pipeline_results['fetch_status']
+        results['fetch_results'] = pipeline_results['file_paths']
+        results['summary']['stage_timings'] = pipeline_results['stage_timings']
 
         # 成功・失敗カウント
-        for feed_type, (data, filepath) in fetch_results.items():
-            if data is not None:
+        for feed_type in feeds:
+            status = fetch_status.get(feed_type, 'failed')
+            if status == 'success':
                 results['summary']['successful_fetches'] += 1
+            elif status == 'unchanged':
+                results['summary']['unchanged_feeds'] += 1
             else:
                 results['summary']['failed_fetches'] += 1
 
-        # ステップ2: データベース保存（dry_runでない場合）
-        if not dry_run and results['summary']['successful_fetches'] > 0:
-            self.logger.info("=" * 60)
-            self.logger.info("STEP 2: LOADING TO DATABASE")
-            self.logger.info("=" * 60)
-
-            load_results = self.load_to_database(fetch_results)
+        if not dry_run:
+            load_results = {
+                feed_type: pipeline_results['load_results'].get(feed_type)
+                for feed_type in feeds
+                if fetch_status.get(feed_type) != 'unchanged'
+            }
             results['load_results'] = load_results
 
-            # 成功・失敗カウント
             for feed_type, feed_msg_id in load_results.items():
                 if feed_msg_id is not None:
                     results['summary']['successful_loads'] += 1
                 else:
                     results['summary']['failed_loads'] += 1
+
+            if self.loader.descriptor_cache is not None:
+                results['summary']['descriptor_cache'] = self.loader.descriptor_cache.stats()
+
+            if self.differential:
+                counts = self.loader.stop_time_update_counts
+                results['summary']['stop_time_updates_written'] = sum(c['written'] for c in counts.values())
+                results['summary']['stop_time_updates_skipped'] = sum(c['skipped'] for c in counts.values())
         else:
-            if dry_run:
-                self.logger.info("\n[DRY RUN] Skipping database load")
             results['load_results'] = {feed: None for feed in feeds}
 
         # ステップ3: マテリアライズドビューのリフレッシュ
@@ -312,18 +500,17 @@ class GTFSRealtimeFetchJob(DatabaseJob):
         # 詳細結果をログに追加
         results['detailed_results'] = []
         for feed_type in feeds:
-            fetch_data, fetch_path = fetch_results.get(feed_type, (None, None))
-            fetch_status = "success" if fetch_data is not None else "failed"
-
             detail = {
                 'feed_type': feed_type,
-                'fetch_status': fetch_status
+                'fetch_status': fetch_status.get(feed_type, 'failed')
             }
 
-            if not dry_run:
+            if not dry_run and detail['fetch_status'] != "unchanged":
                 load_id = results['load_results'].get(feed_type)
                 detail['load_status'] = "success" if load_id is not None else "failed"
                 detail['feed_message_id'] = load_id
+                if load_id is not None and feed_type in self.loader.stop_time_update_counts:
+                    detail['stop_time_updates'] = self.loader.stop_time_update_counts[feed_type]
 
             results['detailed_results'].append(detail)
 
@@ -336,9 +523,37 @@ class GTFSRealtimeFetchJob(DatabaseJob):
         self.logger.info(f"Feeds processed: {summary.get('total_feeds', 0)}")
         self.logger.info(f"Successful fetches: {summary.get('successful_fetches', 0)}")
         self.logger.info(f"Failed fetches: {summary.get('failed_fetches', 0)}")
+        self.logger.info(f"Unchanged feeds (skipped): {summary.get('unchanged_feeds', 0)}")
         self.logger.info(f"Successful loads: {summary.get('successful_loads', 0)}")
         self.logger.info(f"Failed loads: {summary.get('failed_loads', 0)}")
 
+        # 差分ロード結果
+        if 'stop_time_updates_written' in summary:
+            self.logger.info(
+                f"Stop time updates: {summary['stop_time_updates_written']} written, "
+                f"{summary['stop_time_updates_skipped']} skipped (unchanged)"
+            )
+
+        # ステージ別処理時間
+        timings = summary.get('stage_timings')
+        if timings:
+            self.logger.info(
+                f"Stage timings: fetch={timings['fetch']:.2f}s (wall), "
+                f"parse={timings['parse']:.2f}s, load={timings['load']:.2f}s, "
+                f"pipeline total={timings['total']:.2f}s"
+            )
+
+        # descriptorキャッシュ統計
+        cache_stats = summary.get('descriptor_cache')
+        if cache_stats:
+            lookups = cache_stats['hits'] + cache_stats['misses']
+            hit_rate = cache_stats['hits'] / lookups * 100 if lookups else 0.0
+            self.logger.info(
+                f"Descriptor cache: hits={cache_stats['hits']}, misses={cache_stats['misses']} "
+                f"({hit_rate:.1f}% hit rate), warm-loaded={cache_stats['warm_loaded']}, "
+                f"size={cache_stats['size']}"
+            )
+
         # MVリフレッシュ結果
         mv_refreshed = summary.get('mv_refreshed', False)
         mv_status = "✓ Yes" if mv_refreshed else "✗ No"
@@ -349,14 +564,18 @@ class GTFSRealtimeFetchJob(DatabaseJob):
             self.logger.info("\nDetailed Results:")
             for detail in results['detailed_results']:
                 feed_type = detail['feed_type']
-                fetch_status = "✓" if detail['fetch_status'] == 'success' else "✗"
+                fetch_status = {'success': "✓", 'unchanged': "-"}.get(detail['fetch_status'], "✗")
 
                 if 'load_status' in detail:
                     load_status = "✓" if detail['load_status'] == 'success' else "✗"
                     feed_id = detail.get('feed_message_id', 'N/A')
+                    stop_time_info = ""
+                    if 'stop_time_updates' in detail:
+                        counts = detail['stop_time_updates']
+                        stop_time_info = f", stop_time_updates written={counts['written']} skipped={counts['skipped']}"
                     self.logger.info(
                         f"  {feed_type}: Fetch={fetch_status}, "
-                        f"Load={load_status} (ID: {feed_id})"
+                        f"Load={load_status} (ID: {feed_id}){stop_time_info}"
                     )
                 else:
                     self.logger.info(f"  {feed_type}: Fetch={fetch_status}")
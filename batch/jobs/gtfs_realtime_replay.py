@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+GTFS Realtime Replay Job
+
+保存済みの translink_<feed>_<timestamp>.pb ファイルおよび圧縮セグメントアーカイブ（*.seg）を
+ヘッダー時刻順にデータベースへ再ロードします。
+パースと行バッファへの展開はプロセスプールで行い、書き込みは単一のライターがCOPYで一括実行します。
+同じフィード種別・ヘッダー時刻のメッセージが既にロード済みの場合はスキップするため、
+何度実行しても重複しません。
+"""
+
+import os
+import re
+import sys
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pytz
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.controller.fetch_gtfs_realtime import gtfs_realtime_pb2, peek_header_timestamp, HEADER_PEEK_BYTES
+from batch.config.database_connector import DatabaseConnector
+from batch.config.settings import config
+from batch.jobs.base_job import DatabaseJob
+from batch.services import BulkFeedService, DescriptorIdCache, ParquetFeedExporter
+from batch.utils.feed_archive import FeedArchiveReader
+
+logger = logging.getLogger(__name__)
+
+# GTFSRealtimeFetcher.save_to_disk のファイル名（*_latest.pb は対象外）
+ARCHIVE_FILE_PATTERN = re.compile(r'^translink_(trip_updates|vehicle_positions|alerts)_\d{8}_\d{6}\.pb$')
+# batch.utils.feed_archive のセグメントファイル名
+SEGMENT_FILE_PATTERN = re.compile(r'^(trip_updates|vehicle_positions|alerts)_\d{8}_\d{2}\.seg$')
+
+# (header_timestamp, feed_type, path, record_position) - .pbファイルの場合 record_position は None
+ArchivedFeed = Tuple[int, str, Path, Optional[int]]
+
+
+def parse_time_argument(value: str, timezone: str = 'America/Vancouver') -> int:
+    """
+    --since/--until の値をUNIX時刻に変換
+
+    Args:
+        value: ISO形式の日時（例: 2025-01-31, 2025-01-31T08:00, 2025-01-31 08:00:00+00:00）
+        timezone: タイムゾーン指定がない場合に使用するタイムゾーン
+
+    Returns:
+        UNIX時刻（秒）
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = pytz.timezone(timezone).localize(parsed)
+    return int(parsed.timestamp())
+
+
+def read_header_timestamp(path: Path) -> Optional[int]:
+    """
+    .pbファイルのヘッダー時刻を取得（先頭のみ読み込み、読めない場合は全体をパース）
+
+    Args:
+        path: .pbファイルのパス
+
+    Returns:
+        ヘッダー時刻、取得できない場合はNone
+    """
+    with open(path, 'rb') as f:
+        timestamp = peek_header_timestamp(f.read(HEADER_PEEK_BYTES))
+        if timestamp is not None:
+            return timestamp
+        f.seek(0)
+        feed_message = gtfs_realtime_pb2.FeedMessage()
+        try:
+            feed_message.ParseFromString(f.read())
+        except Exception:
+            return None
+    return feed_message.header.timestamp if feed_message.header.HasField('timestamp') else None
+
+
+def flatten_archived_feed(
+    path: str,
+    position: Optional[int] = None,
+    feed_type: Optional[str] = None,
+    parquet_dir: Optional[str] = None
+):
+    """
+    プロセスプールのワーカー: .pbファイルまたはセグメントのレコードをパースして行バッファに展開
+
+    Args:
+        path: .pbファイルまたはセグメントファイルのパス
+        position: セグメント内のレコード番号（.pbファイルの場合はNone）
+        feed_type: フィード種別（Parquet出力時のみ使用）
+        parquet_dir: Parquetデータセットの保存先（Noneの場合は出力しない）
+
+    Returns:
+        (FeedBuffers, 生データのサイズ)
+    """
+    if position is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    else:
+        with FeedArchiveReader(path) as reader:
+            _, data = reader.read(position)
+    feed_message = gtfs_realtime_pb2.FeedMessage()
+    feed_message.ParseFromString(data)
+    if parquet_dir is not None:
+        # Parquetの書き込みもワーカー側で並列に行う
+        ParquetFeedExporter(parquet_dir).export_feed(feed_message, feed_type)
+    return BulkFeedService(None).flatten_feed(feed_message), len(data)
+
+
+class GTFSRealtimeReplayJob(DatabaseJob):
+    """保存済みGTFS Realtimeファイルの再ロードジョブ"""
+
+    AVAILABLE_FEEDS = ['trip_updates', 'vehicle_positions', 'alerts']
+
+    def __init__(
+        self,
+        source_dir: Path,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        feeds: Optional[List[str]] = None,
+        workers: Optional[int] = None,
+        parquet_dir: Optional[Path] = None
+    ):
+        """
+        初期化
+
+        Args:
+            source_dir: .pb/.segファイルを探索するディレクトリ（サブディレクトリを含む）
+            since: この時刻以降のヘッダー時刻のみ対象（UNIX時刻、Noneの場合は制限なし）
+            until: この時刻以前のヘッダー時刻のみ対象（UNIX時刻、Noneの場合は制限なし）
+            feeds: 対象フィードのリスト（Noneの場合は全フィード）
+            workers: パース用プロセス数（Noneの場合はCPU数-1）
+            parquet_dir: 学習用Parquetデータセットにも出力する場合の保存先
+        """
+        super().__init__(job_name="GTFSRealtimeReplayJob")
+
+        self.source_dir = Path(source_dir)
+        self.since = since
+        self.until = until
+        self.feeds = feeds or self.AVAILABLE_FEEDS
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.parquet_dir = Path(parquet_dir) if parquet_dir is not None else None
+        if self.parquet_dir is not None:
+            # pyarrowが無い場合はワーカー起動前に失敗させる
+            ParquetFeedExporter(self.parquet_dir)
+
+        self.logger.info("GTFSRealtimeReplayJob initialized")
+        self.logger.info(f"  - Source dir: {self.source_dir}")
+        self.logger.info(f"  - Since: {self._format_time(self.since)}")
+        self.logger.info(f"  - Until: {self._format_time(self.until)}")
+        self.logger.info(f"  - Feeds: {', '.join(self.feeds)}")
+        self.logger.info(f"  - Parse workers: {self.workers}")
+        if self.parquet_dir is not None:
+            self.logger.info(f"  - Parquet export: {self.parquet_dir}")
+
+    @staticmethod
+    def _format_time(timestamp: Optional[int]) -> str:
+        if timestamp is None:
+            return "-"
+        return datetime.fromtimestamp(timestamp, pytz.timezone('America/Vancouver')).strftime('%Y-%m-%d %H:%M:%S %Z')
+
+    def discover_files(self) -> Tuple[List[ArchivedFeed], int]:
+        """
+        対象ファイルを探索し、ヘッダー時刻順に並べる
+
+        同じフィード種別・ヘッダー時刻のファイル・レコード（未更新時の重複取得）は最初の1件のみ残す。
+
+        Returns:
+            (ヘッダー時刻順のファイルリスト, 重複として除外した件数)
+        """
+        candidates = [
+            path for path in self.source_dir.rglob('translink_*.pb')
+            if ARCHIVE_FILE_PATTERN.match(path.name)
+        ]
+        segments = [
+            path for path in self.source_dir.rglob('*.seg')
+            if SEGMENT_FILE_PATTERN.match(path.name)
+        ]
+        self.logger.info(f"Found {len(candidates)} archived files, {len(segments)} archive segments")
+
+        archived: Dict[Tuple[str, int], ArchivedFeed] = {}
+        duplicates = 0
+
+        def add(timestamp: int, feed_type: str, path: Path, position: Optional[int]):
+            nonlocal duplicates
+            if (self.since is not None and timestamp < self.since) or \
+                    (self.until is not None and timestamp > self.until):
+                return
+            key = (feed_type, timestamp)
+            if key in archived:
+                duplicates += 1
+                return
+            archived[key] = (timestamp, feed_type, path, position)
+
+        for path in sorted(candidates):
+            feed_type = ARCHIVE_FILE_PATTERN.match(path.name).group(1)
+            if feed_type not in self.feeds:
+                continue
+
+            timestamp = read_header_timestamp(path)
+            if timestamp is None:
+                self.logger.warning(f"Skipping {path.name}: header timestamp not readable")
+                continue
+            add(timestamp, feed_type, path, None)
+
+        for path in sorted(segments):
+            feed_type = SEGMENT_FILE_PATTERN.match(path.name).group(1)
+            if feed_type not in self.feeds:
+                continue
+            # セグメントはインデックスから時刻を取得（レコード本体は展開しない）
+            with FeedArchiveReader(path) as reader:
+                for position, timestamp in enumerate(reader.timestamps()):
+                    add(timestamp, feed_type, path, position)
+
+        return sorted(archived.values(), key=lambda item: (item[0], item[1])), duplicates
+
+    def _submit(self, executor: ProcessPoolExecutor, archived: ArchivedFeed):
+        _, feed_type, path, position = archived
+        parquet_dir = str(self.parquet_dir) if self.parquet_dir is not None else None
+        return executor.submit(flatten_archived_feed, str(path), position, feed_type, parquet_dir)
+
+    def _iter_flattened(self, executor: ProcessPoolExecutor, files: List[ArchivedFeed]) -> Iterator:
+        """
+        ファイル順を保ったままワーカーの展開結果を返す
+
+        投入済みタスクをワーカー数の2倍までに制限し、メモリ使用量を一定に保つ。
+        """
+        window = self.workers * 2
+        pending = deque()
+        remaining = iter(files)
+
+        for archived in remaining:
+            pending.append((archived, self._submit(executor, archived)))
+            if len(pending) >= window:
+                break
+
+        while pending:
+            archived, future = pending.popleft()
+            next_archived = next(remaining, None)
+            if next_archived is not None:
+                pending.append((next_archived, self._submit(executor, next_archived)))
+            yield archived, future
+
+    def execute(self, dry_run: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        ジョブの実際の処理を実装
+
+        Args:
+            dry_run: Trueの場合、DBに保存せずパース・展開のみ実行
+            **kwargs: その他のパラメータ
+
+        Returns:
+            実行結果のサマリ
+        """
+        summary = {
+            'files_found': 0,
+            'duplicate_files': 0,
+            'already_loaded': 0,
+            'loaded_feeds': 0,
+            'failed_feeds': 0,
+            'rows_written': 0,
+            'inserted_records': 0,
+            'updated_records': 0,
+            'deleted_records': 0,
+        }
+
+        files, summary['duplicate_files'] = self.discover_files()
+        summary['files_found'] = len(files)
+        if not files:
+            self.logger.info("No archived files to replay")
+            return {'summary': summary}
+
+        self.logger.info(
+            f"Replaying {len(files)} feeds from {self._format_time(files[0][0])} "
+            f"to {self._format_time(files[-1][0])}"
+        )
+
+        connection = None
+        bulk_feed_service = None
+        if not dry_run:
+            connection = DatabaseConnector().get_connection()
+            descriptor_cache = None
+            if config.gtfs_realtime.descriptor_cache_size > 0:
+                descriptor_cache = DescriptorIdCache(connection, maxsize=config.gtfs_realtime.descriptor_cache_size)
+            bulk_feed_service = BulkFeedService(connection, descriptor_cache)
+
+            # ロード済みのスナップショットはワーカーに渡す前に除外
+            loaded = {
+                feed_type: bulk_feed_service.find_loaded_timestamps(feed_type, files[0][0], files[-1][0])
+                for feed_type in self.feeds
+            }
+            remaining_files = [item for item in files if item[0] not in loaded[item[1]]]
+            summary['already_loaded'] = len(files) - len(remaining_files)
+            files = remaining_files
+            self.logger.info(f"Already loaded: {summary['already_loaded']}, to load: {len(files)}")
+
+        start = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for index, (archived, future) in enumerate(self._iter_flattened(executor, files), start=1):
+                    timestamp, feed_type, path, position = archived
+                    try:
+                        buffers, file_size = future.result()
+                        if dry_run:
+                            written = True
+                        else:
+                            _, written = bulk_feed_service.write_feed_once(buffers, feed_type, file_size)
+
+                        if written:
+                            summary['loaded_feeds'] += 1
+                            summary['rows_written'] += sum(buffers.row_counts().values())
+                        else:
+                            summary['already_loaded'] += 1
+                    except Exception as e:
+                        source = path.name if position is None else f"{path.name}#{position}"
+                        self.logger.error(f"✗ Failed to replay {source}: {e}", exc_info=True)
+                        summary['failed_feeds'] += 1
+
+                    if index % 100 == 0 or index == len(files):
+                        elapsed = time.perf_counter() - start
+                        self.logger.info(
+                            f"Progress: {index}/{len(files)} feeds "
+                            f"({index / elapsed:.1f} feeds/s, at {self._format_time(timestamp)})"
+                        )
+        finally:
+            if connection is not None:
+                connection.close()
+
+        summary['elapsed_seconds'] = time.perf_counter() - start
+        summary['inserted_records'] = summary['rows_written']
+        self.inserted_records = summary['rows_written']
+
+        if bulk_feed_service is not None and bulk_feed_service.descriptor_cache is not None:
+            summary['descriptor_cache'] = bulk_feed_service.descriptor_cache.stats()
+
+        return {'summary': summary}
+
+    def _print_job_specific_summary(self, results: Dict[str, Any]):
+        """ジョブ固有のサマリ表示"""
+        summary = results.get('summary', {})
+
+        self.logger.info(f"Files in range: {summary.get('files_found', 0)}")
+        self.logger.info(f"Duplicate snapshots skipped: {summary.get('duplicate_files', 0)}")
+        self.logger.info(f"Already loaded (skipped): {summary.get('already_loaded', 0)}")
+        self.logger.info(f"Loaded feeds: {summary.get('loaded_feeds', 0)}")
+        self.logger.info(f"Failed feeds: {summary.get('failed_feeds', 0)}")
+        self.logger.info(f"Rows written: {summary.get('rows_written', 0)}")
+
+        elapsed = summary.get('elapsed_seconds')
+        if elapsed:
+            self.logger.info(
+                f"Replay time: {elapsed:.2f}s "
+                f"({summary.get('loaded_feeds', 0) / elapsed:.1f} feeds/s)"
+            )
+
+        cache_stats = summary.get('descriptor_cache')
+        if cache_stats:
+            self.logger.info(
+                f"Descriptor cache: hits={cache_stats['hits']}, misses={cache_stats['misses']}, "
+                f"size={cache_stats['size']}"
+            )
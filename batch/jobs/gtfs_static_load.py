@@ -306,6 +306,29 @@ class GTFSStaticLoadJob(DatabaseJob):
 
         return summary
 
+    def refresh_stop_departures(self) -> str:
+        """
+        gtfs_active_service_dates_mv と gtfs_stop_departures を読み込んだ時刻表で更新
+
+        Returns:
+            'success' または 'failed'（失敗しても読み込み済みのデータは残るため、ジョブは失敗としない）
+        """
+        from batch.jobs.stop_departures_refresh import StopDeparturesRefreshJob
+
+        self.logger.info("=" * 60)
+        self.logger.info("STEP 4: REFRESHING STOP DEPARTURES")
+        self.logger.info("=" * 60)
+        try:
+            with self.db_connector.transaction() as cursor:
+                cursor.execute(f"SELECT * FROM {self.schema}.refresh_active_service_dates_mv()")
+            StopDeparturesRefreshJob(db_connector=self.db_connector).execute()
+            return 'success'
+        except Exception as e:
+            self.logger.error(
+                f"Failed to refresh stop departures (run 'python batch/run.py refresh-departures'): {e}"
+            )
+            return 'failed'
+
     def execute(self, download: bool = True, dry_run: bool = False, **kwargs) -> Dict[str, Any]:
         """
         ジョブの実際の処理を実装
@@ -384,6 +407,10 @@ class GTFSStaticLoadJob(DatabaseJob):
                 status = results['loaded_tables'].get(table_name, 'N/A')
                 self.logger.info(f"{table_name}: {count} rows (status: {status})")
 
+            # ステップ4: 運行日と停留所時刻表（API用）を新しい時刻表で作り直す
+            if results['summary']['failed_loads'] == 0:
+                results['stop_departures'] = self.refresh_stop_departures()
+
         # サマリを設定
         results['summary']['inserted_records'] = self.inserted_records
 
@@ -8,13 +8,14 @@ Metro Vancouver地域内の全地域についてバス遅延予測を実行し
 
 import sys
 import logging
+import tempfile
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Iterable, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
 import time
 import numpy as np
 import pandas as pd
-import tensorflow as tf
 import pytz
 
 # プロジェクトルートをパスに追加
@@ -28,6 +29,606 @@ from batch.config.settings import config
 from batch.jobs.base_job import DataProcessingJob
 from batch.utils.error_handler import DataProcessingError
 
+logger = logging.getLogger(__name__)
+
+# TensorFlowは推論エンジンの作成時にインポートする（import_tensorflow()）
+tf = None
+_tensorflow_import_seconds = 0.0
+
+INFERENCE_MODES = ('batched', 'per-region')
+INFERENCE_BACKENDS = ('function', 'keras', 'savedmodel', 'tflite')
+
+# 特徴量グループのデフォルト設定
+DEFAULT_FEATURE_GROUPS = {
+    'temporal': [
+        'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
+        'is_peak_hour', 'is_weekend', 'arrival_delay'
+    ],
+    'region': [
+        'direction_id', 'line_direction_link_order',
+        'delay_mean_by_route_hour', 'distance_from_downtown_km'
+    ],
+    'weather': ['humidex', 'wind_speed', 'weather_rainy'],
+    'target': ['arrival_delay']
+}
+
+# 予測結果DataFrameの列（decode_predictions）
+PREDICTION_COLUMNS = [
+    'region_id', 'route_id', 'direction_id', 'stop_id', 'stop_name', 'stop_lat', 'stop_lon',
+    'stop_sequence', 'prediction_created_at', 'prediction_target_time', 'prediction_hour_offset',
+    'predicted_delay_seconds', 'predicted_delay_minutes'
+]
+
+# 予測結果の保存先（テーブル名, スキーマ）と COPY で挿入するカラム（confidence_score はデフォルトのNULL）
+PREDICTION_TABLE = ('regional_delay_predictions', 'gtfs_realtime')
+PREDICTION_TABLE_COLUMNS = PREDICTION_COLUMNS + [
+    'model_version', 'model_path', 'prediction_execution_time_ms',
+    'input_data_start', 'input_data_end', 'sequence_count'
+]
+# API用の最新予測テーブル（regional_predictions_current）のステージングテーブルと COPY するカラム
+CURRENT_STAGING_TABLE = 'regional_predictions_current_staging'
+CURRENT_TABLE_COLUMNS = PREDICTION_COLUMNS + ['model_version']
+
+# バス停情報ルックアップの列（build_stop_cache、time_bucket が最新の値）
+STOP_INFO_COLUMNS = ('stop_name', 'stop_lat', 'stop_lon')
+
+# サマリに表示する処理段階（表示順）
+PREDICTION_STAGES = ('fetch', 'sequence', 'standardize', 'predict', 'decode', 'save')
+
+
+def preprocess_region(
+    region_id: str,
+    data: pd.DataFrame,
+    input_timesteps: int,
+    output_timesteps: int,
+    feature_groups: Dict,
+    standardizer: Optional[DataStandardizer] = None,
+    previous_windows: Optional[pd.DataFrame] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    地域の入力データからモデル入力とバス停情報キャッシュを作成（プロセスプールのワーカーからも実行）
+
+    Args:
+        region_id: 地域ID
+        data: find_predict_status() 形式の入力データ
+        input_timesteps: 入力時系列長
+        output_timesteps: 出力時系列長
+        feature_groups: 特徴量グループ定義
+        standardizer: 学習時の標準化パラメータ（Noneの場合は地域の入力データで学習）
+        previous_windows: 前回の予測を引き継げる入力ウィンドウ（インクリメンタルモード、input_windows() の形式）。
+            入力ウィンドウが変わっていないシーケンスはモデル入力に含めず 'unchanged' に返す
+
+    Returns:
+        {'inputs': ndarray, 'metadata': List[str], 'stop_cache': DataFrame, 'windows': DataFrame,
+         'unchanged': List[str], 'input_data_start', 'input_data_end', 'elapsed', 'timings'}
+        （データがない場合はNone）
+    """
+    start_time = time.perf_counter()
+    timings = {'sequence': 0.0, 'standardize': 0.0, 'decode': 0.0}
+
+    if data is None or data.empty:
+        logger.warning(f"  No data found for region: {region_id}")
+        return None
+
+    logger.info(f"  Retrieved {len(data)} records for {region_id}")
+
+    # 入力データの時間範囲を記録
+    if 'time_bucket' in data.columns:
+        input_data_start = data['time_bucket'].min()
+        input_data_end = data['time_bucket'].max()
+    else:
+        input_data_start = None
+        input_data_end = None
+
+    # 2. シーケンス作成（バス停ごと）
+    logger.info(f"  [2/6] Creating sequences (per stop) for {region_id}...")
+    stage_start = time.perf_counter()
+    sequence_creator = SequenceCreator(
+        input_timesteps=input_timesteps,
+        output_timesteps=output_timesteps,
+        feature_groups=feature_groups
+    )
+    X_delay, _, metadata, _, _ = sequence_creator.create_stop_aware_sequences(
+        data, spatial_organization=True, prediction_mode=True
+    )
+
+    if X_delay is None or len(X_delay) == 0:
+        logger.warning(f"  No sequences created for region: {region_id}")
+        return None
+
+    logger.info(f"  Created {len(X_delay)} sequences for {region_id}")
+
+    # 前回から入力ウィンドウが変わったシーケンスのみ予測（インクリメンタルモード）
+    keys = sequence_keys(data)
+    windows = input_windows(data, X_delay, metadata, keys)
+    timings['sequence'] += time.perf_counter() - stage_start
+    unchanged = []
+    changed = None
+    if previous_windows is not None:
+        previous = previous_windows.reindex(windows.index)
+        same = (
+            (windows['time_bucket'] == previous['time_bucket'])
+            & (windows['fingerprint'] == previous['fingerprint'])
+        ).to_numpy()
+        changed = ~same
+        unchanged = windows.index[same].tolist()
+        metadata = windows.index[changed].tolist()
+        logger.info(f"  {len(metadata)} changed input windows, {len(unchanged)} unchanged for {region_id}")
+
+    # 3. データ標準化（学習時のパラメータがない場合は地域ごとに学習）
+    logger.info(f"  [3/6] Standardizing features for {region_id}...")
+    stage_start = time.perf_counter()
+    if standardizer is not None:
+        X_scaled = standardizer.transform_features(X_delay if changed is None else X_delay[changed])
+    else:
+        # 地域の全シーケンスで学習（変わっていないシーケンスを含めないと結果が変わる）
+        X_scaled = DataStandardizer().fit_transform_features(X_delay)
+        if changed is not None:
+            X_scaled = X_scaled[changed]
+
+    # 4. ConvLSTM用Reshape
+    actual_feature_count = X_scaled.shape[2]
+    X_reshaped = DataSplitter().reshape_for_convlstm(
+        X_scaled, target_height=1, target_width=actual_feature_count
+    )
+    timings['standardize'] += time.perf_counter() - stage_start
+
+    # デコード用のバス停情報（入力データは親プロセスに戻さない）
+    stage_start = time.perf_counter()
+    stop_cache = build_stop_cache(data if changed is None else data[keys.isin(metadata).to_numpy()])
+    timings['decode'] += time.perf_counter() - stage_start
+
+    return {
+        'inputs': X_reshaped,
+        'metadata': metadata,
+        'stop_cache': stop_cache,
+        'windows': windows,
+        'unchanged': unchanged,
+        'input_data_start': input_data_start,
+        'input_data_end': input_data_end,
+        'elapsed': time.perf_counter() - start_time,
+        'timings': timings
+    }
+
+
+def postprocess_region(
+    region_id: str,
+    y_pred: np.ndarray,
+    metadata: List[str],
+    stop_cache: pd.DataFrame,
+    output_timesteps: int,
+    standardizer: Optional[DataStandardizer] = None
+):
+    """
+    地域の予測値を行に展開（プロセスプールのワーカーからも実行）
+
+    standardizer が目標値の標準化パラメータを持つ場合は、予測値を元のスケール（秒）に戻す
+
+    Returns:
+        (予測結果DataFrame, 処理時間（秒）)
+    """
+    start_time = time.perf_counter()
+    if standardizer is not None and standardizer.has_target_params:
+        y_pred = standardizer.inverse_transform_targets(y_pred)
+    predictions_df = decode_predictions(y_pred, metadata, stop_cache, region_id, output_timesteps)
+    return predictions_df, time.perf_counter() - start_time
+
+
+def decode_predictions(
+    y_pred: np.ndarray,
+    metadata: List[str],
+    stop_cache: pd.DataFrame,
+    region_id: str,
+    output_timesteps: int,
+    prediction_created_at: Optional[datetime] = None
+) -> pd.DataFrame:
+    """
+    予測結果をDataFrameにデコード（バス停ごと）
+
+    シーケンスのメタデータ（route_id_direction_id_stop_id）をバス停情報ルックアップに結合し、
+    時間オフセットをNumPyで展開する（1行 = 1シーケンス x 1時間オフセット、NaN・無限大の予測値は除外）
+
+    Args:
+        y_pred: 予測値（シーケンス数, 時間オフセット[, 1]）
+        metadata: シーケンスごとのキー（route_id_direction_id_stop_id）
+        stop_cache: build_stop_cache() で作成したバス停情報ルックアップ
+        region_id: 地域ID
+        output_timesteps: 出力時系列長
+        prediction_created_at: 予測基準時刻（Noneの場合は現在時刻）
+
+    Returns:
+        予測結果DataFrame（PREDICTION_COLUMNS の列）
+    """
+    # 予測値の次元を統一
+    if y_pred.ndim == 3:
+        y_pred_2d = y_pred[:, :output_timesteps, 0]
+    else:
+        y_pred_2d = y_pred[:, :output_timesteps]
+
+    # 予測基準時刻（現在時刻 - タイムゾーン aware）
+    if prediction_created_at is None:
+        prediction_created_at = datetime.now(pytz.timezone('America/Vancouver'))
+
+    # 今の0分時点を計算（例: 14:23 -> 14:00）
+    current_hour = prediction_created_at.replace(minute=0, second=0, microsecond=0)
+
+    # シーケンスごとのバス停情報（route_id + direction_id + stop_id で結合）
+    positions = stop_cache.index.get_indexer(pd.Index(metadata, dtype=object))
+    matched = np.flatnonzero(positions >= 0)
+    if len(matched) < len(metadata):
+        missing = [metadata[i] for i in np.flatnonzero(positions < 0)[:5]]
+        logger.warning(
+            f"Stop info not found for {len(metadata) - len(matched)} of {len(metadata)} sequences "
+            f"(e.g. {', '.join(missing)})"
+        )
+    stops = stop_cache.iloc[positions[matched]]
+
+    # 各時間オフセットの予測（今の0分時点から開始）。行の順序はシーケンス -> オフセット
+    values = np.asarray(y_pred_2d[matched], dtype=np.float64)
+    finite = np.isfinite(values)
+    if not finite.all():
+        logger.warning(f"Skipped {int((~finite).sum())} invalid (NaN/inf) prediction values for {region_id}")
+    sequence_idx, offset_idx = np.nonzero(finite)
+    delay_seconds = values[sequence_idx, offset_idx]
+    hour_offsets = offset_idx + 1
+
+    def stop_column(column):
+        return stops[column].to_numpy()[sequence_idx]
+
+    return pd.DataFrame({
+        'region_id': region_id,
+        'route_id': stop_column('route_id'),
+        'direction_id': stop_column('direction_id'),
+        'stop_id': stop_column('stop_id'),
+        'stop_name': stop_column('stop_name'),
+        'stop_lat': stop_column('stop_lat'),
+        'stop_lon': stop_column('stop_lon'),
+        'stop_sequence': stop_column('stop_sequence'),
+        # datetime のままだと pandas 2.x ではマイクロ秒単位（datetime64[us]）になるためナノ秒に揃える
+        'prediction_created_at': pd.Timestamp(prediction_created_at).as_unit('ns'),
+        # 0分時点での予測時刻（例: 14:00, 15:00, 16:00...）
+        'prediction_target_time': pd.Timestamp(current_hour) + pd.to_timedelta(hour_offsets - 1, unit='h'),
+        'prediction_hour_offset': hour_offsets,
+        'predicted_delay_seconds': round_half_even(delay_seconds, 2),
+        'predicted_delay_minutes': round_half_even(delay_seconds / 60.0, 2),
+    }, columns=PREDICTION_COLUMNS)
+
+
+def round_half_even(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Pythonの round() と同じ丸め（ベクトル化）
+
+    np.round は 10**decimals 倍した値を丸めるため、倍率を掛けた誤差で端数がちょうど .5 付近の値だけ
+    round() と結果が異なることがある。その場合のみ round() で丸め直す
+
+    Args:
+        values: 丸める値（float64）
+        decimals: 小数点以下の桁数
+
+    Returns:
+        丸めた値
+    """
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    near_half = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in near_half:
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+
+def sequence_keys(frame: pd.DataFrame) -> pd.Series:
+    """シーケンスのメタデータと同じ route_id_direction_id_stop_id のキー"""
+    return (
+        frame['route_id'].astype(str) + '_' + frame['direction_id'].astype(str)
+        + '_' + frame['stop_id'].astype(str)
+    )
+
+
+def input_windows(
+    data: pd.DataFrame,
+    X: np.ndarray,
+    metadata: List[str],
+    keys: Optional[pd.Series] = None
+) -> pd.DataFrame:
+    """
+    シーケンスごとの入力ウィンドウ（インクリメンタルモードの変更検出用）
+
+    最新の time_bucket に加え、標準化前の入力特徴量のフィンガープリントを記録する
+    （最新の時間帯は time_bucket が同じでも観測が追加されると値が変わるため）
+
+    Args:
+        data: find_predict_status() 形式の入力データ
+        X: 標準化前の入力シーケンス（シーケンス数, 時系列長, 特徴量数）
+        metadata: シーケンスごとのキー
+        keys: data の各行のキー（Noneの場合は sequence_keys(data)）
+
+    Returns:
+        インデックスがシーケンスのキー、列 time_bucket, fingerprint のDataFrame
+    """
+    if keys is None:
+        keys = sequence_keys(data)
+    latest = data['time_bucket'].groupby(keys.to_numpy()).max()
+    values = np.asarray(X, dtype=np.float64).reshape(len(X), -1)
+    fingerprints = pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+    return pd.DataFrame(
+        {'time_bucket': latest.reindex(metadata).to_numpy(), 'fingerprint': fingerprints},
+        index=pd.Index(metadata, dtype=object)
+    )
+
+
+def build_stop_cache(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    バス停情報のルックアップ構築（route_id + direction_id + stop_id ごとに1行）
+
+    インデックスはシーケンスのメタデータと同じ route_id_direction_id_stop_id のキー。
+    1つのバス停に複数の line_direction_link_order がある場合は最小のものを使用し、
+    各列は最新の time_bucket の値（欠損の場合は欠損でない最新の値）を使用する
+
+    Args:
+        data: find_predict_status() 形式の入力データ
+
+    Returns:
+        列 route_id（str）, direction_id（int）, stop_id（str）, stop_name, stop_lat, stop_lon, stop_sequence
+    """
+    columns = [column for column in STOP_INFO_COLUMNS if column in data.columns]
+    grouped = data.sort_values('time_bucket', ascending=False).groupby(
+        ['route_id', 'direction_id', 'stop_id', 'line_direction_link_order'], as_index=False
+    )[columns].first()
+
+    # グループはキー順に並ぶため、バス停ごとの先頭行が最小の line_direction_link_order
+    keys = sequence_keys(grouped)
+    first = ~keys.duplicated()
+    grouped = grouped[first.to_numpy()]
+
+    lookup = pd.DataFrame({
+        'route_id': grouped['route_id'].astype(str).to_numpy(),
+        'direction_id': grouped['direction_id'].astype(np.int64).to_numpy(),
+        'stop_id': grouped['stop_id'].astype(str).to_numpy(),
+        'stop_sequence': grouped['line_direction_link_order'].to_numpy(),
+    }, index=pd.Index(keys[first].to_numpy(), dtype=object))
+    for column in STOP_INFO_COLUMNS:
+        if column in grouped.columns:
+            lookup[column] = grouped[column].astype(float).to_numpy() if column != 'stop_name' \
+                else grouped[column].to_numpy()
+        else:
+            lookup[column] = np.nan if column != 'stop_name' else None
+    return lookup
+
+
+def import_tensorflow():
+    """
+    TensorFlowをインポート（初回のみ）
+
+    batch パッケージ経由で他のコマンドからもこのモジュールが読み込まれるため、
+    TensorFlowのインポートは推論に必要になるまで遅らせる
+
+    Returns:
+        tensorflow モジュール
+    """
+    global tf, _tensorflow_import_seconds
+    if tf is None:
+        start_time = time.perf_counter()
+        import tensorflow
+        tf = tensorflow
+        _tensorflow_import_seconds = time.perf_counter() - start_time
+    return tf
+
+
+def tensorflow_import_seconds() -> float:
+    """このプロセスでのTensorFlowのインポート時間（秒、未インポートの場合は0）"""
+    return _tensorflow_import_seconds
+
+
+def _tflite_interpreter_class():
+    """TFLiteのInterpreter（LiteRT / tflite_runtime があればTensorFlowをインポートせずに使用）"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            Interpreter = import_tensorflow().lite.Interpreter
+    return Interpreter
+
+
+def export_path_for(model_path: str, backend: str) -> Path:
+    """
+    エクスポート済みモデルのデフォルトパス（モデルと同じ場所）
+
+    Args:
+        model_path: Kerasモデルのパス（例: best_delay_model.h5）
+        backend: 'savedmodel' または 'tflite'
+
+    Returns:
+        <モデル名>_savedmodel/ または <モデル名>.tflite
+    """
+    model_path = Path(model_path)
+    if backend == 'savedmodel':
+        return model_path.with_name(f"{model_path.stem}_savedmodel")
+    return model_path.with_name(f"{model_path.stem}.tflite")
+
+
+def export_saved_model(model: 'tf.keras.Model', path: str):
+    """
+    KerasモデルをSavedModelとしてエクスポート（'serve' エンドポイント、バッチ次元は可変）
+    """
+    model.export(str(path), verbose=False)
+
+
+def export_tflite(model: 'tf.keras.Model', path: str):
+    """
+    KerasモデルをTFLiteとしてエクスポート
+
+    ConvLSTMの時間方向ループ（while）は変数を固定できずTFLiteで実行できないため、
+    同じ重みのまま時間方向を展開（unroll=True）したモデルを変換する
+    from_keras_model はConvLSTMの変換中にプロセスごと異常終了（LLVM ERROR, SIGABRT）するため、
+    一時ディレクトリにSavedModelとしてエクスポートしてから from_saved_model で変換する
+    """
+    def unroll(layer):
+        layer_config = layer.get_config()
+        if 'unroll' in layer_config:
+            layer_config['unroll'] = True
+        return layer.__class__.from_config(layer_config)
+
+    tf = import_tensorflow()
+    unrolled = tf.keras.models.clone_model(model, clone_function=unroll)
+    unrolled.set_weights(model.get_weights())
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        unrolled.export(saved_model_dir, verbose=False)
+        tflite_model = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir).convert()
+    Path(path).write_bytes(tflite_model)
+
+
+class InferenceEngine:
+    """
+    ConvLSTMの推論ラッパー
+
+    入力を最大バケットサイズ単位に分割し、各チャンクを収まる最小のバケットサイズまでゼロパディングして
+    推論する。入力形状がバケットサイズの数に限られるため、バックエンドごとに:
+      - function: バケットごとに1回だけトレースした tf.function の具象関数（Kerasのpredictを経由しない）
+      - keras: model.predict_on_batch（従来の推論）
+      - savedmodel: エクスポートしたSavedModelの 'serve' エンドポイント
+      - tflite: エクスポートしたTFLiteモデル（バケットごとに入力形状を固定したInterpreter）
+    savedmodel / tflite はエクスポート先が存在しない場合、Kerasモデルから作成する
+    （存在する場合はKerasモデル不要。TFLiteはLiteRTがあればTensorFlowもインポートしない）
+    """
+
+    def __init__(
+        self,
+        model: Optional['tf.keras.Model'],
+        buckets: List[int],
+        backend: str = 'function',
+        export_path: Optional[str] = None
+    ):
+        """
+        初期化
+
+        Args:
+            model: 学習済みKerasモデル（needs_model() が False の場合は None でよい）
+            buckets: バッチサイズのバケット（最大値が1回の推論の最大シーケンス数）
+            backend: INFERENCE_BACKENDS のいずれか
+            export_path: savedmodel / tflite のエクスポート先（必須）
+        """
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(
+                f"Unknown inference backend: {backend} (expected one of {', '.join(INFERENCE_BACKENDS)})"
+            )
+        if not buckets or min(buckets) < 1:
+            raise ValueError(f"Bucket sizes must be positive: {buckets}")
+
+        if model is None and self.needs_model(backend, export_path):
+            raise ValueError(f"A Keras model is required for the {backend} backend")
+
+        self.model = model
+        self.buckets = sorted(set(buckets))
+        self.backend = backend
+        self.export_path = export_path
+        self.calls = 0
+        self._runners = {}
+
+        if backend in ('function', 'keras'):
+            tf = import_tensorflow()
+            self.input_shape = tuple(model.input_shape[1:])
+            if backend == 'function':
+                self._function = tf.function(lambda inputs: self.model(inputs, training=False))
+        elif backend == 'savedmodel':
+            self._ensure_exported(export_saved_model)
+            # 読み込んだオブジェクトが解放されると変数も削除されるため保持する
+            self._saved_model = import_tensorflow().saved_model.load(str(export_path))
+            self._serve = self._saved_model.serve
+            self.input_shape = tuple(self._serve.input_signature[0].shape[1:])
+        else:
+            self._ensure_exported(export_tflite)
+            self._tflite_model = Path(export_path).read_bytes()
+            self._interpreter_class = _tflite_interpreter_class()
+            input_details = self._interpreter_class(model_content=self._tflite_model).get_input_details()[0]
+            self.input_shape = tuple(int(size) for size in input_details['shape_signature'][1:])
+
+    @staticmethod
+    def needs_model(backend: str, export_path: Optional[str] = None) -> bool:
+        """Kerasモデルの読み込みが必要か（function / keras、または未エクスポートの場合）"""
+        if backend in ('function', 'keras'):
+            return True
+        return export_path is None or not Path(export_path).exists()
+
+    def _ensure_exported(self, export):
+        if self.export_path is None:
+            raise ValueError(f"export_path is required for the {self.backend} backend")
+        if not Path(self.export_path).exists():
+            logger.info(f"Exporting model for the {self.backend} backend to: {self.export_path}")
+            export(self.model, self.export_path)
+
+    def bucket_for(self, count: int) -> int:
+        """count 件を収まる最小のバケットサイズ"""
+        for bucket in self.buckets:
+            if count <= bucket:
+                return bucket
+        return self.buckets[-1]
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        推論を実行
+
+        Args:
+            inputs: (シーケンス数, timesteps, height, width, channels)
+
+        Returns:
+            予測値（シーケンス数, ...）
+        """
+        inputs = np.asarray(inputs, dtype=np.float32)
+        max_bucket = self.buckets[-1]
+
+        outputs = []
+        for start in range(0, len(inputs), max_bucket):
+            chunk = inputs[start:start + max_bucket]
+            count = len(chunk)
+            bucket = self.bucket_for(count)
+            if count < bucket:
+                padding = np.zeros((bucket - count,) + chunk.shape[1:], dtype=chunk.dtype)
+                chunk = np.concatenate([chunk, padding])
+            outputs.append(self._runner(bucket)(chunk)[:count])
+            self.calls += 1
+        return np.concatenate(outputs)
+
+    def warm_up(self):
+        """全バケットサイズで1回ずつ推論し、トレース・メモリ確保を済ませる"""
+        for bucket in self.buckets:
+            self._runner(bucket)(np.zeros((bucket,) + self.input_shape, dtype=np.float32))
+
+    def _runner(self, bucket: int):
+        """バケットサイズ用の推論関数（ndarray -> ndarray）"""
+        runner = self._runners.get(bucket)
+        if runner is None:
+            runner = self._build_runner(bucket)
+            self._runners[bucket] = runner
+        return runner
+
+    def _build_runner(self, bucket: int):
+        if self.backend == 'keras':
+            return lambda chunk: np.asarray(self.model.predict_on_batch(chunk))
+
+        if self.backend == 'function':
+            concrete = self._function.get_concrete_function(
+                tf.TensorSpec((bucket,) + self.input_shape, tf.float32)
+            )
+            return lambda chunk: concrete(tf.constant(chunk)).numpy()
+
+        if self.backend == 'savedmodel':
+            return lambda chunk: self._serve(tf.constant(chunk)).numpy()
+
+        interpreter = self._interpreter_class(model_content=self._tflite_model)
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+        interpreter.resize_tensor_input(input_index, (bucket,) + self.input_shape)
+        interpreter.allocate_tensors()
+
+        def run(chunk):
+            interpreter.set_tensor(input_index, chunk)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index).copy()
+
+        return run
+
 
 class RegionalDelayPredictionJob(DataProcessingJob):
     """地域遅延予測ジョブ"""
@@ -37,7 +638,17 @@ class RegionalDelayPredictionJob(DataProcessingJob):
         model_path: Optional[str] = None,
         input_timesteps: Optional[int] = None,
         output_timesteps: Optional[int] = None,
-        feature_groups: Optional[Dict] = None
+        feature_groups: Optional[Dict] = None,
+        inference_mode: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        scaler_path: Optional[str] = None,
+        inference_backend: Optional[str] = None,
+        batch_buckets: Optional[List[int]] = None,
+        export_path: Optional[str] = None,
+        warmup: Optional[bool] = None,
+        incremental: Optional[bool] = None,
+        state_path: Optional[str] = None
     ):
         """
         初期化
@@ -47,73 +658,172 @@ class RegionalDelayPredictionJob(DataProcessingJob):
             input_timesteps: 入力時系列長（Noneの場合は設定から取得）
             output_timesteps: 出力時系列長（Noneの場合は設定から取得）
             feature_groups: 特徴量グループ定義
+            inference_mode: 'batched'（全地域を一括推論）または 'per-region'（Noneの場合は設定から取得）
+            batch_size: 1回あたりの最大推論シーケンス数（最大のバケットサイズ、Noneの場合は設定から取得）
+            workers: 前処理・デコードのプロセス数（1の場合は親プロセスで実行、Noneの場合は設定から取得）
+            scaler_path: 学習時の標準化パラメータのパス（Noneの場合は設定、未設定ならモデルと同じ場所）
+            inference_backend: 推論バックエンド（INFERENCE_BACKENDS、Noneの場合は設定から取得）
+            batch_buckets: batch_size 未満のバケットサイズ（Noneの場合は設定から取得）
+            export_path: savedmodel / tflite のエクスポート先（Noneの場合は設定、未設定ならモデルと同じ場所）
+            warmup: 初期化時に全バケットサイズで推論してトレースを済ませるか（Noneの場合は設定から取得）
+            incremental: 入力ウィンドウが前回から変わったバス停のみ予測し、他は前回の予測を引き継ぐか
+                （Noneの場合は設定から取得）
+            state_path: インクリメンタルモードの状態ファイル（Noneの場合は設定、未設定ならダウンロードディレクトリ）
         """
         super().__init__(job_name="RegionalDelayPredictionJob")
 
+        self.inference_mode = inference_mode or config.prediction.inference_mode
+        if self.inference_mode not in INFERENCE_MODES:
+            raise ValueError(
+                f"Unknown inference mode: {self.inference_mode} (expected one of {', '.join(INFERENCE_MODES)})"
+            )
+        self.batch_size = batch_size if batch_size is not None else config.prediction.batch_size
+        if self.batch_size < 1:
+            raise ValueError(f"batch_size must be positive: {self.batch_size}")
+        self.workers = workers if workers is not None else config.prediction.workers
+        if self.workers < 1:
+            raise ValueError(f"workers must be positive: {self.workers}")
+        self.inference_backend = inference_backend or config.prediction.inference_backend
+        if self.inference_backend not in INFERENCE_BACKENDS:
+            raise ValueError(
+                f"Unknown inference backend: {self.inference_backend} "
+                f"(expected one of {', '.join(INFERENCE_BACKENDS)})"
+            )
+        batch_buckets = batch_buckets if batch_buckets is not None else config.prediction.batch_buckets
+        self.batch_buckets = sorted({b for b in batch_buckets if 0 < b < self.batch_size} | {self.batch_size})
+
         self.model_path = model_path or str(config.prediction.get_model_path())
+        self.scaler_path = scaler_path or config.prediction.scaler_path
+        self.export_path = None
+        if self.inference_backend in ('savedmodel', 'tflite'):
+            self.export_path = (
+                export_path or config.prediction.export_path
+                or str(export_path_for(self.model_path, self.inference_backend))
+            )
+        self.warmup = warmup if warmup is not None else config.prediction.warmup
         self.input_timesteps = input_timesteps if input_timesteps is not None else config.prediction.input_timesteps
         self.output_timesteps = output_timesteps if output_timesteps is not None else config.prediction.output_timesteps
 
         # 特徴量グループのデフォルト設定
-        if feature_groups is None:
-            self.feature_groups = {
-                'temporal': [
-                    'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
-                    'is_peak_hour', 'is_weekend', 'arrival_delay'
-                ],
-                'region': [
-                    'direction_id', 'line_direction_link_order',
-                    'delay_mean_by_route_hour', 'distance_from_downtown_km'
-                ],
-                'weather': ['humidex', 'wind_speed', 'weather_rainy'],
-                'target': ['arrival_delay']
-            }
-        else:
-            self.feature_groups = feature_groups
+        self.feature_groups = feature_groups if feature_groups is not None else DEFAULT_FEATURE_GROUPS
 
         # データベース接続
         self.db_connector = DatabaseConnector()
         self.repository = RegionalDelayRepository(self.db_connector)
 
-        # コンポーネント初期化
-        self.sequence_creator = SequenceCreator(
-            input_timesteps=self.input_timesteps,
-            output_timesteps=self.output_timesteps,
-            feature_groups=self.feature_groups
-        )
-        self.splitter = DataSplitter()
-        self.standardizer = DataStandardizer()
-
-        # モデル読み込み
+        # モデルと標準化パラメータの読み込み（TensorFlowのインポート・読み込み・ウォームアップの時間を記録）
+        import_seconds = tensorflow_import_seconds()
+        stage_start = time.perf_counter()
         self.model = self._load_model()
+        self.engine = self._create_engine()
+        self.standardizer = self._load_standardizer()
+        load_seconds = time.perf_counter() - stage_start
+        import_seconds = tensorflow_import_seconds() - import_seconds
+
+        stage_start = time.perf_counter()
+        if self.warmup:
+            self.engine.warm_up()
+        self.startup_timings = {
+            'import': import_seconds,
+            'load': load_seconds - import_seconds,
+            'warmup': time.perf_counter() - stage_start
+        }
+        self.predict_calls = 0
+
+        # インクリメンタルモードの前回の入力ウィンドウと予測
+        self.incremental = incremental if incremental is not None else config.prediction.incremental
+        self.state_path = None
+        self.input_state = None
+        if self.incremental:
+            self.state_path = (
+                state_path or config.prediction.state_path
+                or str(config.directories.download_dir / 'prediction_state.pkl')
+            )
+            self.input_state = self._load_input_state()
 
         self.logger.info("RegionalDelayPredictionJob initialized successfully")
 
-    def _load_model(self) -> tf.keras.Model:
-        """モデルをロード"""
+    def _load_model(self) -> Optional['tf.keras.Model']:
+        """
+        推論用にモデルをロード（推論のみのためコンパイルしない）
+
+        savedmodel / tflite でエクスポート済みのモデルがある場合はKerasモデルを読み込まず None を返す
+        """
+        if not InferenceEngine.needs_model(self.inference_backend, self.export_path):
+            self.logger.info(f"Using exported model, skipping Keras model load: {self.export_path}")
+            return None
+
         try:
             self.logger.info(f"Loading model from: {self.model_path}")
+            model = import_tensorflow().keras.models.load_model(self.model_path, compile=False)
+            self.logger.info("Model loaded successfully")
+            return model
 
-            custom_objects = {
-                'mse': tf.keras.metrics.MeanSquaredError(),
-                'keras.metrics.mse': tf.keras.metrics.MeanSquaredError()
-            }
+        except Exception as e:
+            self.logger.error(f"Failed to load model: {e}")
+            raise DataProcessingError(f"Failed to load model from {self.model_path}") from e
 
-            model = tf.keras.models.load_model(
-                self.model_path,
-                custom_objects=custom_objects,
-                compile=False
-            )
+    def _create_engine(self) -> InferenceEngine:
+        """推論エンジンを作成（savedmodel / tflite は未エクスポートの場合ここでエクスポート）"""
+        try:
+            engine = InferenceEngine(self.model, self.batch_buckets, self.inference_backend, self.export_path)
+        except Exception as e:
+            self.logger.error(f"Failed to create {self.inference_backend} inference engine: {e}")
+            raise DataProcessingError(f"Failed to create {self.inference_backend} inference engine") from e
 
-            # モデルを手動でコンパイル
-            model.compile(optimizer='adam', loss='mse', metrics=['mse'])
+        self.logger.info(
+            f"Inference backend: {self.inference_backend} (buckets: {self.batch_buckets}"
+            f"{', ' + self.export_path if self.export_path else ''})"
+        )
+        return engine
 
-            self.logger.info("Model loaded and compiled successfully")
-            return model
+    def _load_standardizer(self) -> Optional[DataStandardizer]:
+        """
+        学習時の標準化パラメータをロード
+
+        パスを指定していない場合、モデルと同じ場所にファイルがなければ None を返す
+        （地域ごとの入力データで標準化パラメータを学習する従来の動作）
+        """
+        scaler_path = self.scaler_path or str(DataStandardizer.scaler_path(self.model_path))
+        if not Path(scaler_path).exists():
+            if self.scaler_path:
+                raise DataProcessingError(f"Scaler file not found: {scaler_path}")
+            self.logger.warning(
+                f"Scaler file not found: {scaler_path}. "
+                f"Falling back to fitting the feature scaler on each region's input data"
+            )
+            return None
 
+        try:
+            standardizer = DataStandardizer.load_scalers(scaler_path)
         except Exception as e:
-            self.logger.error(f"Failed to load model: {e}")
-            raise DataProcessingError(f"Failed to load model from {self.model_path}") from e
+            self.logger.error(f"Failed to load scalers: {e}")
+            raise DataProcessingError(f"Failed to load scalers from {scaler_path}") from e
+
+        self.scaler_path = scaler_path
+        self.logger.info(
+            f"Loaded scalers from: {scaler_path} ({len(standardizer.feature_mean)} features"
+            f"{', target' if standardizer.has_target_params else ''})"
+        )
+        return standardizer
+
+    def _load_input_state(self):
+        """インクリメンタルモードの状態を読み込む（モデル・標準化パラメータ・時系列長が変わった場合は破棄）"""
+        # batch.services はORMモデルを読み込むため、インクリメンタルモードの場合のみインポートする
+        from batch.services.prediction_input_state import PredictionInputState
+
+        if self.standardizer is None:
+            self.logger.warning(
+                "Incremental mode without saved scalers: carried-forward predictions can differ from a full run "
+                "because the per-region scaler is refitted on every run"
+            )
+        input_state = PredictionInputState(
+            self.state_path,
+            signature=(self.model_path, self.scaler_path, self.input_timesteps, self.output_timesteps)
+        )
+        loaded = input_state.load()
+        self.logger.info(f"Incremental mode: {loaded} input windows loaded ({self.state_path})")
+        return input_state
 
     def get_all_regions(self) -> List[str]:
         """全地域IDを取得"""
@@ -123,209 +833,360 @@ class RegionalDelayPredictionJob(DataProcessingJob):
         self.logger.info(f"Found {len(regions)} regions: {regions}")
         return regions
 
-    def predict_region(self, region_id: str) -> Optional[Dict[str, Any]]:
+    def prepare_region(
+        self,
+        region_id: str,
+        timings: Dict[str, float],
+        data: Optional[pd.DataFrame] = None,
+        previous_windows: Optional[pd.DataFrame] = None
+    ) -> Optional[Dict[str, Any]]:
         """
-        特定地域の遅延予測を実行
+        特定地域のデータ取得からConvLSTM用Reshapeまでを実行
 
         Args:
             region_id: 地域ID
+            timings: 処理段階ごとの累積時間（秒）。この関数で加算される
+            data: 取得済みの入力データ（Noneの場合はこの地域のみ取得）
+            previous_windows: 前回の予測を引き継げる入力ウィンドウ（インクリメンタルモード）
 
         Returns:
-            予測結果を含む辞書 {'predictions': DataFrame, 'metadata': Dict}
+            preprocess_region() の結果（データがない場合はNone）
         """
-        start_time = time.time()
-        self.logger.info(f"Starting prediction for region: {region_id}")
-
-        try:
-            # 1. データ取得（過去8時間）
+        # 1. データ取得（過去8時間）
+        if data is None:
             self.logger.info(f"  [1/6] Fetching data for {region_id}...")
+            stage_start = time.perf_counter()
             data = self.repository.find_predict_status(region_id)
+            timings['fetch'] += time.perf_counter() - stage_start
 
-            if data is None or data.empty:
-                self.logger.warning(f"  No data found for region: {region_id}")
-                return None
-
-            self.logger.info(f"  Retrieved {len(data)} records")
+        prepared = preprocess_region(
+            region_id, data, self.input_timesteps, self.output_timesteps, self.feature_groups,
+            self.standardizer, previous_windows
+        )
+        if prepared is not None:
+            self._add_timings(timings, prepared['timings'])
+        return prepared
 
-            # 入力データの時間範囲を記録
-            if 'time_bucket' in data.columns:
-                input_data_start = data['time_bucket'].min()
-                input_data_end = data['time_bucket'].max()
-            else:
-                input_data_start = None
-                input_data_end = None
-
-            # 2. シーケンス作成（バス停ごと）
-            self.logger.info(f"  [2/6] Creating sequences (per stop)...")
-            X_delay, _, metadata, _, _ = \
-                self.sequence_creator.create_stop_aware_sequences(
-                    data, spatial_organization=True, prediction_mode=True
-                )
+    def predict_region(
+        self,
+        region_id: str,
+        timings: Optional[Dict[str, float]] = None,
+        data: Optional[pd.DataFrame] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        特定地域の遅延予測を実行
 
-            if X_delay is None or len(X_delay) == 0:
-                self.logger.warning(f"  No sequences created for region: {region_id}")
-                return None
+        Args:
+            region_id: 地域ID
+            timings: 処理段階ごとの累積時間（秒）。指定した場合は加算される
+            data: 取得済みの入力データ（Noneの場合はこの地域のみ取得）
 
-            sequence_count = len(X_delay)
-            self.logger.info(f"  Created {sequence_count} sequences")
+        Returns:
+            予測結果を含む辞書 {'predictions': DataFrame, 'metadata': Dict}
+        """
+        if timings is None:
+            timings = dict.fromkeys(PREDICTION_STAGES, 0.0)
 
-            # 3. データ標準化
-            self.logger.info(f"  [3/6] Standardizing features...")
-            X_scaled = self.standardizer.fit_transform_features(X_delay)
+        self.logger.info(f"Starting prediction for region: {region_id}")
 
-            # 4. ConvLSTM用Reshape
-            self.logger.info(f"  [4/6] Reshaping for ConvLSTM...")
-            actual_feature_count = X_scaled.shape[2]
-            X_reshaped = self.splitter.reshape_for_convlstm(
-                X_scaled, target_height=1, target_width=actual_feature_count
-            )
+        try:
+            prepared = self.prepare_region(region_id, timings, data)
+            if prepared is None:
+                return None
 
             # 5. モデル予測
             self.logger.info(f"  [5/6] Running model prediction...")
-            y_pred = self.model.predict(X_reshaped, verbose=0)
+            stage_start = time.perf_counter()
+            y_pred = self._predict_batched(prepared['inputs'])
+            timings['predict'] += time.perf_counter() - stage_start
 
             # 6. 結果のデコード
             self.logger.info(f"  [6/6] Decoding predictions...")
-            predictions_df = self._decode_predictions(
-                y_pred, metadata, data, region_id
+            predictions_df, elapsed = postprocess_region(
+                region_id, y_pred, prepared['metadata'], prepared['stop_cache'], self.output_timesteps,
+                self.standardizer
             )
+            timings['decode'] += elapsed
+            return self._region_result(region_id, prepared, predictions_df)
 
-            # 予測結果が空の場合は早期リターン
-            if predictions_df.empty:
-                self.logger.warning(f"  No valid predictions decoded for {region_id}")
-                return None
+        except Exception as e:
+            self.logger.error(f"  Failed to predict region {region_id}: {e}", exc_info=True)
+            return None
 
-            elapsed_time = time.time() - start_time
-            self.logger.info(
-                f"  Prediction completed for {region_id} in {elapsed_time:.2f}s "
-                f"({len(predictions_df)} predictions)"
-            )
+    def _region_result(
+        self,
+        region_id: str,
+        prepared: Dict[str, Any],
+        predictions_df: pd.DataFrame,
+        carried_df: Optional[pd.DataFrame] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        デコード済みの予測を predict_region() の結果形式にまとめる
 
-            return {
-                'predictions': predictions_df,
-                'metadata': {
-                    'input_data_start': input_data_start,
-                    'input_data_end': input_data_end,
-                    'sequence_count': sequence_count
-                }
-            }
+        'carried_forward' はインクリメンタルモードで前回から引き継いだ予測（保存済みのため再保存しない）
+        """
+        if carried_df is None:
+            carried_df = pd.DataFrame()
 
-        except Exception as e:
-            self.logger.error(f"  Failed to predict region {region_id}: {e}", exc_info=True)
+        # 予測結果が空の場合は早期リターン
+        if predictions_df.empty and carried_df.empty:
+            self.logger.warning(f"  No valid predictions decoded for {region_id}")
             return None
 
-    def _decode_predictions(
+        self.logger.info(
+            f"  Prediction completed for {region_id} ({len(predictions_df)} predictions"
+            f"{f', {len(carried_df)} carried forward' if not carried_df.empty else ''})"
+        )
+
+        return {
+            'predictions': predictions_df,
+            'carried_forward': carried_df,
+            'metadata': {
+                'input_data_start': prepared['input_data_start'],
+                'input_data_end': prepared['input_data_end'],
+                'sequence_count': len(prepared['inputs'])
+            }
+        }
+
+    def predict_all_regions(
         self,
-        y_pred: np.ndarray,
-        metadata: List[str],
-        original_data: pd.DataFrame,
-        region_id: str
-    ) -> pd.DataFrame:
-        """予測結果をDataFrameにデコード（バス停ごと）"""
-        # バス停情報キャッシュ構築
-        stop_cache = self._build_stop_cache(original_data)
+        regions: List[str],
+        timings: Dict[str, float],
+        region_data: Iterable[Tuple[str, pd.DataFrame]],
+        executor: Optional[ProcessPoolExecutor] = None
+    ) -> Dict[str, Any]:
+        """
+        全地域の前処理 -> 推論 -> デコードを段階ごとに実行
 
-        # 予測値の次元を統一
-        if y_pred.ndim == 3:
-            y_pred_2d = y_pred[:, :self.output_timesteps, 0]
-        else:
-            y_pred_2d = y_pred[:, :self.output_timesteps]
+        前処理は地域の入力データが届いた順に開始し（取得中の地域と並行）、取得済みの行は前処理後に解放する。
+        前処理とデコードは executor が指定された場合はプロセスプールで並列に実行し、
+        推論は常に親プロセスのモデルで行う（batched: 全地域を結合、per-region: 地域ごと）
 
-        # Vancouver タイムゾーンを設定
-        vancouver_tz = pytz.timezone('America/Vancouver')
+        Args:
+            regions: 地域IDのリスト
+            timings: 処理段階ごとの累積時間（秒）。この関数で加算される（fetch はデータの待ち時間）
+            region_data: iter_predict_status_by_region() の (地域ID, 入力データ)
+            executor: 前処理・デコード用のプロセスプール（Noneの場合は親プロセスで実行）
 
-        # 予測基準時刻（現在時刻 - タイムゾーン aware）
-        prediction_created_at = datetime.now(vancouver_tz)
+        Returns:
+            {'results': {region_id: predict_region() と同じ形式の結果 or None},
+             'elapsed_ms': {region_id: 地域の処理時間（batchedの推論はシーケンス数で按分）},
+             'windows': {region_id: シーケンスごとの入力ウィンドウ（input_windows()）}}
+        """
+        # インクリメンタルモード: 前回の予測を同じ時間帯に作成した入力ウィンドウ
+        previous_windows = dict.fromkeys(regions)
+        if self.input_state is not None:
+            current_hour = datetime.now(pytz.timezone('America/Vancouver')).replace(
+                minute=0, second=0, microsecond=0
+            )
+            previous_windows = {
+                region_id: self.input_state.reusable_windows(region_id, current_hour) for region_id in regions
+            }
 
-        # 今の0分時点を計算（例: 14:23 -> 14:00）
-        current_time = datetime.now(vancouver_tz)
-        current_hour = current_time.replace(minute=0, second=0, microsecond=0)
+        # 1-4. 前処理（データのない地域は空のDataFrameで前処理し、スキップのログを残す）
+        if executor is not None:
+            self.logger.info(f"\nPreprocessing {len(regions)} regions with {self.workers} workers...")
 
-        results = []
-        for idx, rds_key in enumerate(metadata):
-            # route_id, direction_id, stop_idをパース (format: route_id_direction_id_stop_id)
-            parts = rds_key.split('_')
-            if len(parts) < 3:
-                self.logger.warning(f"Invalid metadata key format: {rds_key}")
+        received_rows = 0
+        pending = {}
+        for region_id, data in self._timed_stream(region_data, timings):
+            received_rows += len(data)
+            pending[region_id] = self._start_preparing(
+                region_id, data, timings, previous_windows[region_id], executor, len(pending) + 1, len(regions)
+            )
+        self.logger.info(f"Retrieved {received_rows} records for {len(pending)} regions")
+        for region_id in regions:
+            if region_id not in pending:
+                pending[region_id] = self._start_preparing(
+                    region_id, pd.DataFrame(), timings, previous_windows[region_id], executor,
+                    len(pending) + 1, len(regions)
+                )
+
+        prepared_regions = {}
+        for region_id, prepared in pending.items():
+            if isinstance(prepared, Future):
+                try:
+                    prepared = prepared.result()
+                except Exception as e:
+                    self.logger.error(f"  Failed to prepare region {region_id}: {e}", exc_info=True)
+                    prepared = None
+                if prepared is not None:
+                    self._add_timings(timings, prepared['timings'])
+
+            if prepared is None:
                 continue
 
-            route_id = parts[0]
-            direction_id = int(parts[1])
-            stop_id = parts[2]
+            # 形状の異なる地域は結合できないため除外
+            first = next(iter(prepared_regions.values()), None)
+            if (self.inference_mode == 'batched' and first is not None
+                    and prepared['inputs'].shape[1:] != first['inputs'].shape[1:]):
+                self.logger.warning(
+                    f"  Skipping {region_id}: input shape {prepared['inputs'].shape[1:]} "
+                    f"does not match {first['inputs'].shape[1:]}"
+                )
+                continue
+            prepared_regions[region_id] = prepared
+
+        results = dict.fromkeys(regions)
+        elapsed_ms = dict.fromkeys(regions, 0)
+        windows = {region_id: prepared['windows'] for region_id, prepared in prepared_regions.items()}
+        if not prepared_regions:
+            return {'results': results, 'elapsed_ms': elapsed_ms, 'windows': windows}
+
+        # 5. モデル予測
+        predictions, predict_seconds = self._predict_prepared(prepared_regions)
+        timings['predict'] += sum(predict_seconds.values())
+        prepared_regions = {r: p for r, p in prepared_regions.items() if r in predictions}
+
+        # 6. 地域ごとにデコード
+        if executor is not None:
+            decoded = {
+                region_id: executor.submit(
+                    postprocess_region, region_id, predictions[region_id],
+                    prepared['metadata'], prepared['stop_cache'], self.output_timesteps, self.standardizer
+                )
+                for region_id, prepared in prepared_regions.items()
+            }
+        else:
+            decoded = dict.fromkeys(prepared_regions)
 
-            # 該当するバス停情報を検索（キャッシュから全候補を探す）
-            # キャッシュキーは route_id_direction_id_stop_id_stop_sequence の4パート形式
-            matching_stops = {k: v for k, v in stop_cache.items() if k.startswith(rds_key + '_')}
+        for region_id, prepared in prepared_regions.items():
+            decode_seconds = 0.0
+            try:
+                if decoded[region_id] is not None:
+                    predictions_df, decode_seconds = decoded[region_id].result()
+                else:
+                    predictions_df, decode_seconds = postprocess_region(
+                        region_id, predictions[region_id], prepared['metadata'],
+                        prepared['stop_cache'], self.output_timesteps, self.standardizer
+                    )
+                timings['decode'] += decode_seconds
+                carried_df = None
+                if self.input_state is not None:
+                    carried_df = self.input_state.carry_forward(region_id, prepared['unchanged'])
+                results[region_id] = self._region_result(region_id, prepared, predictions_df, carried_df)
+            except Exception as e:
+                self.logger.error(f"  Failed to decode region {region_id}: {e}", exc_info=True)
+
+            region_elapsed = prepared['elapsed'] + predict_seconds[region_id] + decode_seconds
+            elapsed_ms[region_id] = int(region_elapsed * 1000)
+
+        return {'results': results, 'elapsed_ms': elapsed_ms, 'windows': windows}
+
+    @staticmethod
+    def _timed_stream(region_data: Iterable[Tuple[str, pd.DataFrame]], timings: Dict[str, float]):
+        """地域の入力データを順に返し、次の地域を待つ時間を timings['fetch'] に加算"""
+        iterator = iter(region_data)
+        while True:
+            stage_start = time.perf_counter()
+            item = next(iterator, None)
+            timings['fetch'] += time.perf_counter() - stage_start
+            if item is None:
+                return
+            yield item
+
+    def _start_preparing(
+        self,
+        region_id: str,
+        data: pd.DataFrame,
+        timings: Dict[str, float],
+        previous_windows: Optional[pd.DataFrame],
+        executor: Optional[ProcessPoolExecutor],
+        idx: int,
+        total: int
+    ):
+        """
+        地域の前処理を開始
 
-            if not matching_stops:
-                self.logger.warning(f"Stop info not found for key: {rds_key}")
-                continue
+        Returns:
+            executor使用時は preprocess_region() の Future、それ以外は prepare_region() の結果（失敗時はNone）
+        """
+        if executor is not None:
+            return executor.submit(
+                preprocess_region, region_id, data, self.input_timesteps, self.output_timesteps,
+                self.feature_groups, self.standardizer, previous_windows
+            )
+        self.logger.info(f"\n[{idx}/{total}] Preparing region: {region_id}")
+        try:
+            return self.prepare_region(region_id, timings, data, previous_windows)
+        except Exception as e:
+            self.logger.error(f"  Failed to prepare region {region_id}: {e}", exc_info=True)
+            return None
 
-            # 複数のstop_sequenceが存在する可能性があるので、最初のものを使用
-            # (通常は1つのはず)
-            cache_key = list(matching_stops.keys())[0]
-            stop_info = matching_stops[cache_key]
+    def _predict_prepared(self, prepared_regions: Dict[str, Dict[str, Any]]):
+        """
+        前処理済みの地域をモデルで推論
 
-            # 各時間オフセットの予測（今の0分時点から開始）
-            for hour_offset in range(1, self.output_timesteps + 1):
+        Returns:
+            ({region_id: 予測値}, {region_id: 推論時間（秒）})
+        """
+        # 入力ウィンドウが全て前回から変わっていない地域は推論しない（インクリメンタルモード）
+        empty = {
+            region_id: np.zeros((0, self.output_timesteps), dtype=np.float32)
+            for region_id, prepared in prepared_regions.items() if len(prepared['inputs']) == 0
+        }
+        prepared_regions = {r: p for r, p in prepared_regions.items() if r not in empty}
+        if not prepared_regions:
+            return empty, dict.fromkeys(empty, 0.0)
+
+        if self.inference_mode == 'per-region':
+            predictions, predict_seconds = dict(empty), dict.fromkeys(empty, 0.0)
+            for region_id, prepared in prepared_regions.items():
+                stage_start = time.perf_counter()
                 try:
-                    delay_seconds = float(y_pred_2d[idx, hour_offset - 1])
-
-                    # NaNや無限大のチェック
-                    if not np.isfinite(delay_seconds):
-                        self.logger.warning(
-                            f"Invalid prediction value for {rds_key} at offset {hour_offset}: {delay_seconds}"
-                        )
-                        continue
-
-                    delay_minutes = delay_seconds / 60.0
-
-                    # 0分時点での予測時刻（例: 14:00, 15:00, 16:00...）
-                    prediction_target_time = current_hour + timedelta(hours=hour_offset - 1)
-
-                    results.append({
-                        'region_id': region_id,
-                        'route_id': route_id,
-                        'direction_id': direction_id,
-                        'stop_id': stop_info['stop_id'],
-                        'stop_name': stop_info.get('stop_name'),
-                        'stop_lat': stop_info.get('stop_lat'),
-                        'stop_lon': stop_info.get('stop_lon'),
-                        'stop_sequence': stop_info.get('stop_sequence'),
-                        'prediction_created_at': prediction_created_at,
-                        'prediction_target_time': prediction_target_time,
-                        'prediction_hour_offset': hour_offset,
-                        'predicted_delay_seconds': round(delay_seconds, 2),
-                        'predicted_delay_minutes': round(delay_minutes, 2),
-                    })
-                except (ValueError, IndexError, TypeError) as e:
-                    self.logger.warning(
-                        f"Failed to decode prediction for {rds_key} at offset {hour_offset}: {e}"
-                    )
+                    predictions[region_id] = self._predict_batched(prepared['inputs'])
+                except Exception as e:
+                    self.logger.error(f"  Failed to predict region {region_id}: {e}", exc_info=True)
                     continue
+                predict_seconds[region_id] = time.perf_counter() - stage_start
+            return predictions, predict_seconds
 
-        return pd.DataFrame(results)
-
-    def _build_stop_cache(self, data: pd.DataFrame) -> Dict:
-        """バス停情報のキャッシュ構築（バス停ごと）"""
-        cache = {}
-        grouped = data.sort_values('time_bucket', ascending=False).groupby(
-            ['route_id', 'direction_id', 'stop_id', 'line_direction_link_order'], as_index=False
-        ).first()
-
-        for _, row in grouped.iterrows():
-            cache_key = f"{row['route_id']}_{row['direction_id']}_{row['stop_id']}_{row['line_direction_link_order']}"
-            cache[cache_key] = {
-                'stop_id': str(row.get('stop_id', 'unknown')),
-                'stop_name': row.get('stop_name'),
-                'stop_sequence': row.get('line_direction_link_order'),
-                'stop_lat': float(row['stop_lat']) if pd.notna(row.get('stop_lat')) else None,
-                'stop_lon': float(row['stop_lon']) if pd.notna(row.get('stop_lon')) else None
-            }
+        # 全地域を結合
+        stacked = np.concatenate([p['inputs'] for p in prepared_regions.values()])
+        self.logger.info(
+            f"\nRunning model prediction on {len(stacked)} sequences from "
+            f"{len(prepared_regions)} regions ({self.inference_backend}, buckets {self.batch_buckets})..."
+        )
+        stage_start = time.perf_counter()
+        try:
+            y_pred = self._predict_batched(stacked)
+        except Exception as e:
+            self.logger.error(f"Batched model prediction failed: {e}")
+            raise DataProcessingError(f"Batched prediction failed for {len(prepared_regions)} regions") from e
+        predict_elapsed = time.perf_counter() - stage_start
+
+        # 地域ごとに予測値を分配
+        predictions, predict_seconds = dict(empty), dict.fromkeys(empty, 0.0)
+        offset = 0
+        for region_id, prepared in prepared_regions.items():
+            count = len(prepared['inputs'])
+            predictions[region_id] = y_pred[offset:offset + count]
+            predict_seconds[region_id] = predict_elapsed * count / len(stacked)
+            offset += count
+        return predictions, predict_seconds
+
+    def _predict_batched(self, inputs: np.ndarray):
+        """
+        推論エンジンでモデル推論を実行
+
+        batch_size 単位に分割し、各チャンクをバケットサイズまでゼロパディングして入力形状を固定する
+        （バケットごとに1回だけトレースされ、呼び出しごとの再トレースを防ぐ）
+
+        Returns:
+            予測値
+        """
+        calls = self.engine.calls
+        try:
+            return self.engine.predict(inputs)
+        finally:
+            self.predict_calls += self.engine.calls - calls
 
-        return cache
+    @staticmethod
+    def _add_timings(timings: Dict[str, float], stage_timings: Dict[str, float]):
+        for stage, seconds in stage_timings.items():
+            timings[stage] += seconds
 
-    def save_predictions(
+    def prediction_records(
         self,
         predictions_df: pd.DataFrame,
         model_version: Optional[str] = None,
@@ -333,44 +1194,87 @@ class RegionalDelayPredictionJob(DataProcessingJob):
         input_data_start: Optional[datetime] = None,
         input_data_end: Optional[datetime] = None,
         sequence_count: Optional[int] = None
-    ):
-        """予測結果をデータベースに保存"""
-        if predictions_df is None or predictions_df.empty:
+    ) -> pd.DataFrame:
+        """地域の予測結果に保存用のモデル情報・データ品質情報を追加（元のDataFrameは変更しない）"""
+        return predictions_df.assign(
+            # モデル情報
+            model_version=model_version or Path(self.model_path).stem,
+            model_path=self.model_path,
+            prediction_execution_time_ms=execution_time_ms,
+            # データ品質情報
+            input_data_start=input_data_start,
+            input_data_end=input_data_end,
+            sequence_count=sequence_count,
+        )
+
+    def save_predictions(self, records: pd.DataFrame):
+        """
+        全地域の予測結果をデータベースに一括保存し、API用の最新予測テーブルを入れ替え
+
+        履歴（regional_delay_predictions）へのCOPYと regional_predictions_current の入れ替えを
+        1トランザクションで行うため、APIから途中までの予測バッチが見えることはない
+        （失敗時は1行も保存されない）
+
+        Args:
+            records: prediction_records() の結果（全地域を結合したもの）
+        """
+        if records is None or records.empty:
             self.logger.warning("No predictions to save")
             return
 
+        table_name, schema = PREDICTION_TABLE
+        created_at = records['prediction_created_at']
         try:
-            # DataFrameをコピーして元のデータを変更しない
-            df_to_save = predictions_df.copy()
-
-            # モデル情報を追加
-            df_to_save['model_version'] = model_version or Path(self.model_path).stem
-            df_to_save['model_path'] = self.model_path
-            df_to_save['prediction_execution_time_ms'] = execution_time_ms
-
-            # データ品質情報を追加
-            df_to_save['input_data_start'] = input_data_start
-            df_to_save['input_data_end'] = input_data_end
-            df_to_save['sequence_count'] = sequence_count
-            df_to_save['confidence_score'] = None  # 将来の拡張用
-
-            # データベースに保存（スキーマとテーブル名を分離）
-            table_name = 'regional_delay_predictions'
-            schema = 'gtfs_realtime'
-
-            self.db_connector.insert_dataframe(
-                df_to_save,
-                table_name=table_name,
-                schema=schema,
-                if_exists='append'
-            )
+            # パーティションの作成は親テーブルをロックするため、保存とは別の短いトランザクションで行う
+            with self.db_connector.transaction() as cursor:
+                cursor.execute(
+                    "SELECT gtfs_realtime.ensure_regional_prediction_partitions(%s, %s)",
+                    (created_at.min().to_pydatetime(), created_at.max().to_pydatetime())
+                )
 
-            self.logger.info(f"Saved {len(df_to_save)} predictions to {schema}.{table_name}")
+            with self.db_connector.transaction() as cursor:
+                saved = self.db_connector.copy_to_cursor(
+                    cursor, records, table_name=table_name, columns=PREDICTION_TABLE_COLUMNS, schema=schema
+                )
+                cursor.execute("SELECT gtfs_realtime.prepare_regional_predictions_staging()")
+                self.db_connector.copy_to_cursor(
+                    cursor, records, table_name=CURRENT_STAGING_TABLE, columns=CURRENT_TABLE_COLUMNS, schema=schema
+                )
+                cursor.execute("SELECT gtfs_realtime.swap_regional_predictions_current()")
+                current_rows = cursor.fetchone()[0]
+                # コミット時に配信される（APIの予測キャッシュが即座に再読み込み）
+                if config.prediction.notify_channel:
+                    cursor.execute(
+                        "SELECT pg_notify(%s, %s)", (config.prediction.notify_channel, str(saved))
+                    )
+            self.logger.info(
+                f"Saved {saved} predictions to {schema}.{table_name} "
+                f"({current_rows} rows in {schema}.regional_predictions_current)"
+            )
 
         except Exception as e:
             self.logger.error(f"Failed to save predictions: {e}", exc_info=True)
             raise DataProcessingError("Failed to save predictions to database") from e
 
+        self.drop_expired_partitions()
+
+    def drop_expired_partitions(self):
+        """保持期間（PREDICTION_RETENTION_DAYS）を過ぎた予測履歴のパーティションを削除"""
+        retention_days = config.prediction.retention_days
+        if retention_days <= 0:
+            return
+        try:
+            with self.db_connector.transaction() as cursor:
+                cursor.execute(
+                    "SELECT gtfs_realtime.drop_regional_prediction_partitions(%s)", (retention_days,)
+                )
+                dropped = cursor.fetchone()[0]
+            if dropped:
+                self.logger.info(f"Dropped {dropped} prediction partitions older than {retention_days} days")
+        except Exception as e:
+            # 予測の保存は完了しているため、次回の実行で再試行する
+            self.logger.warning(f"Failed to drop expired prediction partitions: {e}")
+
     def execute(
         self,
         regions: Optional[List[str]] = None,
@@ -406,34 +1310,57 @@ class RegionalDelayPredictionJob(DataProcessingJob):
         # 各地域について予測実行
         region_results = {}
         total_predictions = 0
+        timings = dict.fromkeys(PREDICTION_STAGES, 0.0)
+        self.predict_calls = 0
+        self.logger.info(f"Inference mode: {self.inference_mode}, workers: {self.workers}")
 
-        for idx, region_id in enumerate(regions, 1):
-            self.logger.info(f"\n[{idx}/{len(regions)}] Processing region: {region_id}")
-
-            region_start = time.time()
-            result = self.predict_region(region_id)
-            region_elapsed = int((time.time() - region_start) * 1000)
+        # 全地域の入力データを1回のクエリで取得（地域ごとに届いた順に前処理する）
+        self.logger.info(f"Fetching prediction inputs for {len(regions)} regions...")
+        region_data = self.repository.iter_predict_status_by_region(regions)
 
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            predicted = self.predict_all_regions(regions, timings, region_data, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        records = []
+        carried_forward = 0
+        for region_id in regions:
+            result = predicted['results'][region_id]
             if result is not None:
                 predictions_df = result['predictions']
                 metadata = result['metadata']
 
+                # インクリメンタルモード: 引き継いだ予測（保存済み）と合わせて次回の比較対象にする
+                carried_df = result['carried_forward']
+                carried_forward += len(carried_df)
+                if self.input_state is not None and not dry_run:
+                    current = pd.concat([df for df in (predictions_df, carried_df) if not df.empty], ignore_index=True)
+                    self.input_state.update(
+                        region_id, predicted['windows'][region_id], current, sequence_keys(current)
+                    )
+
                 if predictions_df is not None and not predictions_df.empty:
                     prediction_count = len(predictions_df)
                     region_results[region_id] = prediction_count
                     total_predictions += prediction_count
 
-                    # データベースに保存（dry_runでない場合）
+                    # 全地域分をまとめてデータベースに保存（dry_runでない場合）
                     if not dry_run:
-                        self.save_predictions(
+                        records.append(self.prediction_records(
                             predictions_df,
-                            execution_time_ms=region_elapsed,
+                            execution_time_ms=predicted['elapsed_ms'][region_id],
                             input_data_start=metadata.get('input_data_start'),
                             input_data_end=metadata.get('input_data_end'),
                             sequence_count=metadata.get('sequence_count')
-                        )
+                        ))
                     else:
-                        self.logger.info(f"  [DRY RUN] Would save {prediction_count} predictions")
+                        self.logger.info(f"  [DRY RUN] Would save {prediction_count} predictions for {region_id}")
+                elif not carried_df.empty:
+                    region_results[region_id] = 0
+                    self.logger.info(f"  No changed input windows for {region_id}, predictions carried forward")
                 else:
                     region_results[region_id] = 0
                     self.logger.warning(f"  No predictions generated for {region_id}")
@@ -441,6 +1368,16 @@ class RegionalDelayPredictionJob(DataProcessingJob):
                 region_results[region_id] = 0
                 self.logger.warning(f"  No predictions generated for {region_id}")
 
+        if records:
+            stage_start = time.perf_counter()
+            self.save_predictions(pd.concat(records, ignore_index=True))
+            timings['save'] += time.perf_counter() - stage_start
+
+        # 予測を保存できた場合のみ状態を更新（dry_runでは更新しない）
+        if self.input_state is not None and not dry_run:
+            self.input_state.commit()
+            self.input_state.save()
+
         # 実行時間計算
         total_elapsed = time.time() - start_time
 
@@ -451,6 +1388,15 @@ class RegionalDelayPredictionJob(DataProcessingJob):
             'execution_time_seconds': round(total_elapsed, 2),
             'average_time_per_region': round(total_elapsed / len(regions), 2) if regions else 0,
             'region_results': region_results,
+            'inference_mode': self.inference_mode,
+            'workers': self.workers,
+            'inference_backend': self.inference_backend,
+            'startup_timings': {stage: round(seconds, 3) for stage, seconds in self.startup_timings.items()},
+            'scaler_path': self.scaler_path if self.standardizer is not None else None,
+            'predict_calls': self.predict_calls,
+            'incremental': self.incremental,
+            'carried_forward_predictions': carried_forward,
+            'stage_timings': {stage: round(seconds, 3) for stage, seconds in timings.items()},
             'dry_run': dry_run
         }
 
@@ -464,6 +1410,30 @@ class RegionalDelayPredictionJob(DataProcessingJob):
         self.logger.info(
             f"Average time per region: {results['average_time_per_region']:.2f}s"
         )
+        self.logger.info(f"Scalers: {results.get('scaler_path') or 'fitted per region'}")
+        if results.get('incremental'):
+            self.logger.info(
+                f"Incremental: {results['total_predictions']} new predictions, "
+                f"{results['carried_forward_predictions']} carried forward from previous runs"
+            )
+
+        startup_timings = results.get('startup_timings', {})
+        if startup_timings:
+            self.logger.info(
+                f"Startup: TensorFlow import {startup_timings['import']:.3f}s, "
+                f"model load {startup_timings['load']:.3f}s, warm-up {startup_timings['warmup']:.3f}s"
+            )
+
+        stage_timings = results.get('stage_timings', {})
+        if stage_timings:
+            self.logger.info(
+                f"\nStage timings ({results.get('inference_mode')}, {results.get('inference_backend')}, "
+                f"{results.get('predict_calls', 0)} predict calls, {results.get('workers', 1)} workers):"
+            )
+            for stage, seconds in stage_timings.items():
+                self.logger.info(f"  {stage:<12} {seconds:8.3f}s")
+            if results.get('workers', 1) > 1:
+                self.logger.info("  (sequence / standardize / decode are summed across workers)")
 
         region_results = results.get('region_results', {})
         if region_results:
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Stop Departures Refresh Job
+
+APIの停留所エンドポイント用の時刻表（gtfs_static.gtfs_stop_departures）を作り直します。
+GTFS Staticの読み込み後と、運行日が変わるたびに（1日1回）実行します。
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from batch.config.database_connector import DatabaseConnector
+from batch.config.settings import config
+from batch.jobs.base_job import DatabaseJob
+from batch.utils.error_handler import DatabaseError
+
+
+class StopDeparturesRefreshJob(DatabaseJob):
+    """停留所時刻表（gtfs_stop_departures）の更新ジョブ"""
+
+    def __init__(
+        self,
+        days_back: Optional[int] = None,
+        days_ahead: Optional[int] = None,
+        db_connector: Optional[DatabaseConnector] = None
+    ):
+        """
+        初期化
+
+        Args:
+            days_back: 今日より前の運行日数（Noneの場合は設定から取得）
+            days_ahead: 今日より後の運行日数（Noneの場合は設定から取得）
+            db_connector: データベース接続（Noneの場合は新規作成）
+        """
+        super().__init__(job_name="StopDeparturesRefreshJob")
+
+        self.days_back = days_back if days_back is not None else config.stop_departures.days_back
+        self.days_ahead = days_ahead if days_ahead is not None else config.stop_departures.days_ahead
+        if self.days_back < 0 or self.days_ahead < 0:
+            raise ValueError(f"days_back and days_ahead must not be negative: {self.days_back}, {self.days_ahead}")
+
+        # データベース接続
+        self.db_connector = db_connector or DatabaseConnector()
+
+    def execute(self, dry_run: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        時刻表を作り直す（1トランザクションで削除と作成を行うため、APIは前後どちらかの時刻表を参照する）
+
+        Args:
+            dry_run: Trueの場合、作り直さずに件数のみ表示
+
+        Returns:
+            実行結果のサマリ
+        """
+        results = {
+            'days_back': self.days_back,
+            'days_ahead': self.days_ahead,
+            'summary': {
+                'inserted_records': 0,
+                'updated_records': 0,
+                'deleted_records': 0
+            }
+        }
+
+        if dry_run:
+            current = self.db_connector.read_sql(
+                "SELECT COUNT(*) AS departures, MIN(service_date) AS first_date, MAX(service_date) AS last_date "
+                "FROM gtfs_static.gtfs_stop_departures"
+            ).iloc[0]
+            self.logger.info(
+                f"[DRY RUN] gtfs_stop_departures has {current['departures']} rows "
+                f"({current['first_date']} - {current['last_date']})"
+            )
+            return results
+
+        try:
+            with self.db_connector.transaction() as cursor:
+                cursor.execute(
+                    "SELECT status, rows_affected, EXTRACT(EPOCH FROM execution_time) "
+                    "FROM gtfs_static.refresh_stop_departures(%s, %s)",
+                    (self.days_back, self.days_ahead)
+                )
+                status, rows, seconds = cursor.fetchone()
+        except Exception as e:
+            raise DatabaseError("Failed to refresh gtfs_stop_departures") from e
+
+        self.inserted_records = rows
+        results['summary']['inserted_records'] = rows
+        results['execution_seconds'] = float(seconds)
+        self.logger.info(
+            f"Refreshed gtfs_stop_departures: {rows} departures for {self.days_back} day(s) back and "
+            f"{self.days_ahead} day(s) ahead in {float(seconds):.1f}s ({status})"
+        )
+        return results
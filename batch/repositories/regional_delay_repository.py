@@ -4,9 +4,11 @@ Regional Delay Repository - Database access for regional delay data
 
 import sys
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Iterator, Tuple
 import logging
 
+import pandas as pd
+
 # プロジェクトルートをパスに追加
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
@@ -15,6 +17,42 @@ from batch.config.database_connector import DatabaseConnector
 
 logger = logging.getLogger(__name__)
 
+# 予測入力（過去9時間）の取得クエリ。WHERE句の地域条件は呼び出し側で追加する
+PREDICT_STATUS_QUERY = """
+    SELECT
+        gtfs_status.region_id,
+        gtfs_status.route_id,
+        gtfs_status.stop_id,
+        gtfs_status.stop_name,
+        gtfs_status.stop_lat,
+        gtfs_status.stop_lon,
+        gtfs_status.datetime_60 as time_bucket,
+        gtfs_status.direction_id,
+        gtfs_status.hour_sin,
+        gtfs_status.hour_cos,
+        gtfs_status.day_cos,
+        gtfs_status.day_sin,
+        gtfs_status.is_peak_hour,
+        gtfs_status.is_weekend,
+        gtfs_status.arrival_delay,
+        gtfs_status.stop_sequence as line_direction_link_order,
+        gtfs_status.delay_mean_by_route_hour,
+        gtfs_status.distance_from_downtown_km,
+        weather.humidex_v as humidex,
+        weather.wind_speed,
+        CASE
+            WHEN weather.cloud_cover_8 > 6 THEN 1
+            ELSE 0
+        END as weather_rainy
+    FROM gtfs_realtime.gtfs_rt_analytics_mv gtfs_status
+    INNER JOIN climate.weather_hourly weather
+        ON gtfs_status.datetime_60 = to_timestamp(weather.unixtime)
+    WHERE gtfs_status.datetime_60 >= CURRENT_TIMESTAMP - INTERVAL '9 hours'
+        AND gtfs_status.region_id {region_condition}
+    ORDER BY gtfs_status.region_id, gtfs_status.datetime_60, gtfs_status.route_id,
+        gtfs_status.direction_id, gtfs_status.stop_sequence
+"""
+
 
 class RegionalDelayRepository:
     """Regional delay data access layer"""
@@ -34,38 +72,50 @@ class RegionalDelayRepository:
         Returns:
             DataFrame with historical data including stop metadata
         """
-        query = f"""
-            SELECT
-                gtfs_status.route_id,
-                gtfs_status.stop_id,
-                gtfs_status.stop_name,
-                gtfs_status.stop_lat,
-                gtfs_status.stop_lon,
-                gtfs_status.datetime_60 as time_bucket,
-                gtfs_status.direction_id,
-                gtfs_status.hour_sin,
-                gtfs_status.hour_cos,
-                gtfs_status.day_cos,
-                gtfs_status.day_sin,
-                gtfs_status.is_peak_hour,
-                gtfs_status.is_weekend,
-                gtfs_status.arrival_delay,
-                gtfs_status.stop_sequence as line_direction_link_order,
-                gtfs_status.delay_mean_by_route_hour,
-                gtfs_status.distance_from_downtown_km,
-                weather.humidex_v as humidex,
-                weather.wind_speed,
-                CASE
-                    WHEN weather.cloud_cover_8 > 6 THEN 1
-                    ELSE 0
-                END as weather_rainy
-            FROM gtfs_realtime.gtfs_rt_analytics_mv gtfs_status
-            INNER JOIN climate.weather_hourly weather
-                ON gtfs_status.datetime_60 = to_timestamp(weather.unixtime)
-            WHERE gtfs_status.datetime_60 >= CURRENT_TIMESTAMP - INTERVAL '9 hours'
-                AND gtfs_status.region_id = '{region_id}'
-            ORDER BY gtfs_status.datetime_60, gtfs_status.route_id,
-                        gtfs_status.direction_id, gtfs_status.stop_sequence;
+        query = PREDICT_STATUS_QUERY.format(region_condition='= %(region_id)s')
+        df = self.db_connector.read_sql(query, params={'region_id': region_id})
+        return df.drop(columns='region_id')
+
+    def iter_predict_status_by_region(
+        self,
+        region_ids: List[str],
+        chunksize: int = 50000
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Find prediction status for several regions with a single query.
+        The analytics view is evaluated once and the rows are streamed with a
+        server-side cursor. Rows are ordered by region_id, so each region is
+        handed off as soon as its last row has arrived and only the region
+        spanning the current chunk boundary is buffered.
+
+        Args:
+            region_ids: Region identifiers
+            chunksize: Rows fetched per round trip
+
+        Yields:
+            (region_id, DataFrame in the same format as find_predict_status)
+            in region_id order (regions without data are omitted)
         """
+        if not region_ids:
+            return
+
+        query = PREDICT_STATUS_QUERY.format(region_condition='= ANY(%(region_ids)s)')
+        current_region, parts = None, []
+        for chunk in self.db_connector.iter_sql(
+            query, params={'region_ids': list(region_ids)}, chunksize=chunksize
+        ):
+            for region_id, group in chunk.groupby('region_id', sort=False):
+                if region_id != current_region and parts:
+                    yield current_region, self._region_frame(parts)
+                    parts = []
+                current_region = region_id
+                parts.append(group)
+
+        if parts:
+            yield current_region, self._region_frame(parts)
 
-        return self.db_connector.read_sql(query)
\ No newline at end of file
+    @staticmethod
+    def _region_frame(parts: List[pd.DataFrame]) -> pd.DataFrame:
+        """Rows of one region (possibly split across chunks) in find_predict_status format"""
+        df = parts[0] if len(parts) == 1 else pd.concat(parts)
+        return df.drop(columns='region_id').reset_index(drop=True)
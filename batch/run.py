@@ -15,6 +15,36 @@ Usage:
     python batch/run.py predict --dry-run
     python batch/run.py load-realtime --dry-run
 
+    # 地域ごとに推論（全地域一括推論との処理時間比較用）
+    python batch/run.py predict --inference-mode per-region --dry-run
+
+    # 地域ごとの前処理・デコードを4プロセスで並列実行
+    python batch/run.py predict --workers 4
+
+    # TFLiteに変換したモデルで推論（未変換の場合はモデルと同じ場所に作成）
+    python batch/run.py predict --inference-backend tflite
+
+    # 入力ウィンドウが前回から変わったバス停のみ予測（他は前回の予測を引き継ぐ）
+    python batch/run.py predict --incremental
+
+    # COPYによる一括ロード
+    python batch/run.py load-realtime --bulk-load
+
+    # 差分ロード（変更のあったstop_time_updatesのみ書き込み）
+    python batch/run.py load-realtime --differential
+
+    # 常駐モード（/health, /metrics を公開）
+    python batch/run.py load-realtime --daemon --bulk-load
+
+    # 保存済み.pbファイルの再ロード
+    python batch/run.py replay-realtime --from batch/downloads/gtfs_realtime --since 2025-01-01 --until 2025-01-08
+
+    # 保存済みファイルから学習用Parquetデータセットのみ作成
+    python batch/run.py replay-realtime --dry-run --export-parquet
+
+    # 停留所時刻表（API用）を作り直す（load-static の後と1日1回）
+    python batch/run.py refresh-departures
+
     # 詳細ログ
     python batch/run.py predict --verbose
 """
@@ -64,18 +94,31 @@ def run_prediction_job(args):
         from batch.jobs.regional_delay_prediction import RegionalDelayPredictionJob
 
         job = RegionalDelayPredictionJob(
-            model_path=args.model_path if hasattr(args, 'model_path') else None
+            model_path=args.model_path if hasattr(args, 'model_path') else None,
+            scaler_path=args.scaler_path if hasattr(args, 'scaler_path') else None,
+            inference_mode=args.inference_mode if hasattr(args, 'inference_mode') else None,
+            batch_size=args.batch_size if hasattr(args, 'batch_size') else None,
+            workers=args.workers if hasattr(args, 'workers') else None,
+            inference_backend=args.inference_backend if hasattr(args, 'inference_backend') else None,
+            batch_buckets=args.batch_buckets if hasattr(args, 'batch_buckets') else None,
+            export_path=args.export_path if hasattr(args, 'export_path') else None,
+            warmup=False if getattr(args, 'no_warmup', False) else None,
+            incremental=True if getattr(args, 'incremental', False) else None,
+            state_path=args.state_path if hasattr(args, 'state_path') else None
         )
 
-        results = job.execute(
+        results = job.run(
             regions=args.regions if hasattr(args, 'regions') else None,
             dry_run=args.dry_run
         )
 
-        # 成功判定
-        if results.get('status') == 'success' and results.get('total_predictions', 0) > 0:
+        # 成功判定（インクリメンタルモードでは全て前回から引き継いだ場合も成功）
+        predictions = results.get('total_predictions', 0) + results.get('carried_forward_predictions', 0)
+        if results.get('status') == 'success' and predictions > 0:
             logger.info(f"\n✅ Regional delay prediction completed successfully!")
             logger.info(f"  Total predictions: {results['total_predictions']}")
+            if results.get('incremental'):
+                logger.info(f"  Carried forward: {results['carried_forward_predictions']}")
             logger.info(f"  Total regions: {results['total_regions']}")
             logger.info(f"  Execution time: {results['execution_time_seconds']:.2f}s")
             return 0
@@ -107,9 +150,23 @@ def run_fetch_job(args):
             save_to_disk=not args.no_save_disk if hasattr(args, 'no_save_disk') else True,
             cleanup_old_files_flag=not args.no_cleanup if hasattr(args, 'no_cleanup') else True,
             days_to_keep=args.days_to_keep if hasattr(args, 'days_to_keep') else 7,
-            refresh_mv=not args.no_refresh_mv if hasattr(args, 'no_refresh_mv') else True
+            refresh_mv=not args.no_refresh_mv if hasattr(args, 'no_refresh_mv') else True,
+            bulk_load=args.bulk_load if hasattr(args, 'bulk_load') else None,
+            differential=args.differential if hasattr(args, 'differential') else None,
+            export_parquet=args.export_parquet if hasattr(args, 'export_parquet') else None
         )
 
+        if getattr(args, 'daemon', False):
+            from batch.jobs.gtfs_realtime_daemon import GTFSRealtimeDaemon
+
+            daemon = GTFSRealtimeDaemon(
+                job,
+                interval=args.interval,
+                health_port=args.health_port
+            )
+            daemon.run(feeds=args.feeds if hasattr(args, 'feeds') else None)
+            return 0
+
         results = job.run(
             feeds=args.feeds if hasattr(args, 'feeds') else None,
             dry_run=args.dry_run
@@ -134,6 +191,43 @@ def run_fetch_job(args):
         return 1
 
 
+def run_replay_job(args):
+    """GTFS Realtime再ロードジョブを実行"""
+    logger = setup_logging(args.verbose, "gtfs_replay")
+
+    try:
+        from batch.jobs.gtfs_realtime_replay import GTFSRealtimeReplayJob, parse_time_argument
+
+        job = GTFSRealtimeReplayJob(
+            source_dir=Path(args.source_dir),
+            since=parse_time_argument(args.since) if args.since else None,
+            until=parse_time_argument(args.until) if args.until else None,
+            feeds=args.feeds,
+            workers=args.workers,
+            parquet_dir=config.gtfs_realtime.parquet_dir or config.directories.gtfs_rt_storage_dir / 'parquet'
+            if args.export_parquet else None
+        )
+
+        results = job.run(dry_run=args.dry_run)
+
+        # 成功判定
+        failed = results['summary']['failed_feeds']
+        if failed == 0:
+            logger.info("\n✅ GTFS realtime replay completed successfully!")
+            return 0
+        else:
+            logger.warning(f"\n⚠️  GTFS realtime replay completed with {failed} failures")
+            return 1
+
+    except KeyboardInterrupt:
+        logger.warning("\n⚠️  Job interrupted by user")
+        return 1
+
+    except Exception as e:
+        logger.error(f"\n❌ Job failed: {e}", exc_info=True)
+        return 1
+
+
 def run_static_load_job(args):
     """GTFS Static読み込みジョブを実行"""
     logger = setup_logging(args.verbose, "gtfs_static_load")
@@ -169,6 +263,32 @@ def run_static_load_job(args):
         return 1
 
 
+def run_stop_departures_job(args):
+    """停留所時刻表の更新ジョブを実行"""
+    logger = setup_logging(args.verbose, "stop_departures")
+
+    try:
+        from batch.jobs.stop_departures_refresh import StopDeparturesRefreshJob
+
+        job = StopDeparturesRefreshJob(
+            days_back=args.days_back if hasattr(args, 'days_back') else None,
+            days_ahead=args.days_ahead if hasattr(args, 'days_ahead') else None
+        )
+
+        job.run(dry_run=args.dry_run)
+
+        logger.info("\n✅ Stop departures refresh completed successfully!")
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("\n⚠️  Job interrupted by user")
+        return 1
+
+    except Exception as e:
+        logger.error(f"\n❌ Job failed: {e}", exc_info=True)
+        return 1
+
+
 def run_weather_scraper_job(args):
     """気象データスクレイピングジョブを実行"""
     logger = setup_logging(args.verbose, "weather_scraper")
@@ -224,11 +344,69 @@ def main():
         type=str,
         help='Path to trained model (default: from config)'
     )
+    predict_parser.add_argument(
+        '--scaler-path',
+        type=str,
+        help='Path to the scalers saved with the model (default: PREDICTION_SCALER_PATH or '
+             '<model name>_scalers.npz next to the model)'
+    )
     predict_parser.add_argument(
         '--regions',
         nargs='+',
         help='Specific regions to predict (default: all regions)'
     )
+    predict_parser.add_argument(
+        '--inference-mode',
+        choices=['batched', 'per-region'],
+        help='Stack all regions into one inference batch or call the model per region '
+             '(default: from PREDICTION_INFERENCE_MODE, batched)'
+    )
+    predict_parser.add_argument(
+        '--batch-size',
+        type=int,
+        help='Maximum sequences per model call, the largest bucket size (default: from PREDICTION_BATCH_SIZE, 1024)'
+    )
+    predict_parser.add_argument(
+        '--inference-backend',
+        choices=['function', 'keras', 'savedmodel', 'tflite'],
+        help='tf.function per bucket size, Keras predict_on_batch, or an exported SavedModel / TFLite model '
+             '(default: from PREDICTION_INFERENCE_BACKEND, function)'
+    )
+    predict_parser.add_argument(
+        '--batch-buckets',
+        type=int,
+        nargs='+',
+        help='Smaller bucket sizes that chunks are zero-padded to (default: from PREDICTION_BATCH_BUCKETS, 64 256)'
+    )
+    predict_parser.add_argument(
+        '--export-path',
+        type=str,
+        help='SavedModel directory or .tflite file for those backends, exported from the Keras model when '
+             'missing (default: next to the model)'
+    )
+    predict_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Processes for per-region sequence building and decoding; inference stays in the main '
+             'process (default: from PREDICTION_WORKERS, 1)'
+    )
+    predict_parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only predict stops whose input window changed since the previous run and carry forward the '
+             'other predictions (default: PREDICTION_INCREMENTAL, false)'
+    )
+    predict_parser.add_argument(
+        '--state-path',
+        type=str,
+        help='State file of the incremental mode (default: PREDICTION_STATE_PATH or '
+             'batch/downloads/prediction_state.pkl)'
+    )
+    predict_parser.add_argument(
+        '--no-warmup',
+        action='store_true',
+        help='Skip running every bucket size once at start-up (default: PREDICTION_WARMUP, true)'
+    )
     predict_parser.add_argument(
         '--dry-run',
         action='store_true',
@@ -283,6 +461,98 @@ def main():
         help='Do not refresh materialized views after loading'
     )
     fetch_parser.add_argument(
+        '--bulk-load',
+        dest='bulk_load',
+        action='store_true',
+        default=None,
+        help='Load each feed with one COPY per table in a single transaction '
+             '(default: GTFS_RT_BULK_LOAD, otherwise per-row ORM)'
+    )
+    fetch_parser.add_argument(
+        '--orm-load',
+        dest='bulk_load',
+        action='store_false',
+        help='Force the per-row ORM load path'
+    )
+    fetch_parser.add_argument(
+        '--differential',
+        dest='differential',
+        action='store_true',
+        default=None,
+        help='Only write stop_time_updates that changed since the previous load (default: from config)'
+    )
+    fetch_parser.add_argument(
+        '--export-parquet',
+        dest='export_parquet',
+        action='store_true',
+        default=None,
+        help='Also write stop_time_updates/vehicle_positions to the Parquet training dataset (default: from config)'
+    )
+    fetch_parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Run continuously, keeping connections and caches between polls'
+    )
+    fetch_parser.add_argument(
+        '--interval',
+        type=int,
+        help='Daemon poll interval in seconds (default: from config)'
+    )
+    fetch_parser.add_argument(
+        '--health-port',
+        type=int,
+        help='Daemon health/metrics port, 0 to disable (default: from config)'
+    )
+    fetch_parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Enable verbose logging'
+    )
+
+    # ===== GTFS Realtime再ロードジョブ =====
+    replay_parser = subparsers.add_parser(
+        'replay-realtime',
+        help='Replay archived GTFS realtime .pb files into the database'
+    )
+    replay_parser.add_argument(
+        '--from',
+        dest='source_dir',
+        type=str,
+        default=str(config.directories.gtfs_rt_storage_dir),
+        help='Directory containing archived .pb files (default: GTFS realtime download dir)'
+    )
+    replay_parser.add_argument(
+        '--since',
+        type=str,
+        help='Only replay feeds with header timestamp at or after this time (ISO format, local time if no offset)'
+    )
+    replay_parser.add_argument(
+        '--until',
+        type=str,
+        help='Only replay feeds with header timestamp at or before this time (ISO format, local time if no offset)'
+    )
+    replay_parser.add_argument(
+        '--feeds',
+        nargs='+',
+        choices=['trip_updates', 'vehicle_positions', 'alerts'],
+        help='Specific feeds to replay (default: all)'
+    )
+    replay_parser.add_argument(
+        '--workers',
+        type=int,
+        help='Parser processes (default: CPU count - 1)'
+    )
+    replay_parser.add_argument(
+        '--export-parquet',
+        action='store_true',
+        help='Also write the replayed feeds to the Parquet training dataset (with --dry-run: Parquet only)'
+    )
+    replay_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Parse files without loading to database'
+    )
+    replay_parser.add_argument(
         '--verbose',
         action='store_true',
         help='Enable verbose logging'
@@ -325,6 +595,32 @@ def main():
         help='Enable verbose logging'
     )
 
+    # ===== 停留所時刻表の更新ジョブ =====
+    departures_parser = subparsers.add_parser(
+        'refresh-departures',
+        help='Rebuild the precomputed stop departures table used by the stop endpoints'
+    )
+    departures_parser.add_argument(
+        '--days-back',
+        type=int,
+        help='Service days before today to include (default: from STOP_DEPARTURES_DAYS_BACK, 1)'
+    )
+    departures_parser.add_argument(
+        '--days-ahead',
+        type=int,
+        help='Service days after today to include (default: from STOP_DEPARTURES_DAYS_AHEAD, 1)'
+    )
+    departures_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show the current table without rebuilding it'
+    )
+    departures_parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Enable verbose logging'
+    )
+
     # ===== 気象データスクレイピングジョブ =====
     weather_parser = subparsers.add_parser(
         'scrape-weather',
@@ -372,8 +668,12 @@ def main():
         sys.exit(run_prediction_job(args))
     elif args.command == 'load-realtime':
         sys.exit(run_fetch_job(args))
+    elif args.command == 'replay-realtime':
+        sys.exit(run_replay_job(args))
     elif args.command == 'load-static':
         sys.exit(run_static_load_job(args))
+    elif args.command == 'refresh-departures':
+        sys.exit(run_stop_departures_job(args))
     elif args.command == 'scrape-weather':
         sys.exit(run_weather_scraper_job(args))
     else:
@@ -2,10 +2,20 @@ from .feed_message_service import FeedMessageService
 from .trip_updates_service import TripUpdatesService
 from .vehicle_positions_service import VehiclePositionsService
 from .alerts_service import AlertsService
+from .bulk_feed_service import BulkFeedService
+from .descriptor_cache import DescriptorIdCache
+from .stop_time_fingerprint import StopTimeFingerprintIndex
+from .prediction_input_state import PredictionInputState
+from .parquet_export_service import ParquetFeedExporter
 
 __all__ = [
     'FeedMessageService',
     'TripUpdatesService',
     'VehiclePositionsService',
-    'AlertsService'
+    'AlertsService',
+    'BulkFeedService',
+    'DescriptorIdCache',
+    'StopTimeFingerprintIndex',
+    'PredictionInputState',
+    'ParquetFeedExporter'
 ]
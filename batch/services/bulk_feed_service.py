@@ -0,0 +1,344 @@
+from typing import Dict, List, Tuple
+from batch.utils.db_utils import copy_rows
+from batch.services.trip_updates_service import stop_time_update_values
+from batch.services.vehicle_positions_service import (
+    VehiclePositionsService,
+    TRIP_SCHEDULE_RELATIONSHIPS,
+    VEHICLE_STOP_STATUSES
+)
+
+SCHEMA = 'gtfs_realtime'
+ALERT_TEXT_TYPES = ['url', 'header_text', 'description_text', 'cause_detail', 'effect_detail']
+
+
+class FeedBuffers:
+    """Per-table row buffers of one flattened FeedMessage (rows reference entities by entity_id)."""
+
+    def __init__(self):
+        self.header = None
+        self.entities: List[tuple] = []
+        self.trip_descriptors: Dict[tuple, str] = {}
+        self.vehicle_descriptors: Dict[tuple, None] = {}
+        self.trip_updates: List[tuple] = []
+        self.stop_time_updates: List[tuple] = []
+        self.vehicle_positions: List[tuple] = []
+        self.alerts: List[tuple] = []
+        self.alert_active_periods: List[tuple] = []
+        self.alert_informed_entities: List[tuple] = []
+        self.alert_texts: List[tuple] = []
+        self.duplicate_entities = 0
+
+    def row_counts(self) -> Dict[str, int]:
+        return {
+            'feed_entities': len(self.entities),
+            'trip_descriptors': len(self.trip_descriptors),
+            'vehicle_descriptors': len(self.vehicle_descriptors),
+            'trip_updates': len(self.trip_updates),
+            'stop_time_updates': len(self.stop_time_updates),
+            'vehicle_positions': len(self.vehicle_positions),
+            'alerts': len(self.alerts),
+            'alert_active_periods': len(self.alert_active_periods),
+            'alert_informed_entities': len(self.alert_informed_entities),
+            'alert_text': len(self.alert_texts),
+        }
+
+
+class BulkFeedService:
+    """
+    Writes a whole FeedMessage with one COPY per table inside a single transaction.
+
+    Generated ids are resolved through ON COMMIT DROP staging tables joined back on
+    natural keys, so no per-row round trips are needed.
+    """
+
+    def __init__(self, connection, descriptor_cache=None, fingerprint_index=None):
+        self.conn = connection
+        self.descriptor_cache = descriptor_cache
+        self.fingerprint_index = fingerprint_index
+
+    def flatten_feed(self, feed_message) -> FeedBuffers:
+        buffers = FeedBuffers()
+        buffers.header = feed_message.header
+        seen_entity_ids = set()
+
+        for entity in feed_message.entity:
+            if entity.id in seen_entity_ids:
+                buffers.duplicate_entities += 1
+                continue
+            seen_entity_ids.add(entity.id)
+
+            if entity.HasField('trip_update'):
+                entity_type = 'trip_update'
+                self._flatten_trip_update(buffers, entity.id, entity.trip_update)
+            elif entity.HasField('vehicle'):
+                entity_type = 'vehicle_position'
+                self._flatten_vehicle_position(buffers, entity.id, entity.vehicle)
+            elif entity.HasField('alert'):
+                entity_type = 'alert'
+                self._flatten_alert(buffers, entity.id, entity.alert)
+            else:
+                entity_type = 'unknown'
+
+            buffers.entities.append((entity.id, getattr(entity, 'is_deleted', False), entity_type))
+
+        return buffers
+
+    def _register_descriptors(self, buffers: FeedBuffers, trip_desc, vehicle_desc) -> Tuple[tuple, tuple]:
+        trip_key = VehiclePositionsService.get_trip_descriptor_key(trip_desc)
+        if trip_key not in buffers.trip_descriptors:
+            buffers.trip_descriptors[trip_key] = (
+                TRIP_SCHEDULE_RELATIONSHIPS.get(trip_desc.schedule_relationship, 'SCHEDULED')
+                if trip_desc.HasField('schedule_relationship') else 'SCHEDULED'
+            )
+        vehicle_key = VehiclePositionsService.get_vehicle_descriptor_key(vehicle_desc)
+        buffers.vehicle_descriptors[vehicle_key] = None
+        return trip_key, vehicle_key
+
+    def _flatten_trip_update(self, buffers: FeedBuffers, entity_id: str, trip_update):
+        trip_key, vehicle_key = self._register_descriptors(buffers, trip_update.trip, trip_update.vehicle)
+        buffers.trip_updates.append((entity_id, trip_key, vehicle_key))
+
+        for stu in trip_update.stop_time_update:
+            values = stop_time_update_values(stu)
+            if self.fingerprint_index is not None:
+                key = self.fingerprint_index.make_key(trip_key[0], trip_key[3], values[0], values[1])
+                if not self.fingerprint_index.is_changed(key, values[1:]):
+                    continue
+            buffers.stop_time_updates.append((entity_id,) + values)
+
+    def _flatten_vehicle_position(self, buffers: FeedBuffers, entity_id: str, vehicle_pos):
+        trip_key, vehicle_key = self._register_descriptors(buffers, vehicle_pos.trip, vehicle_pos.vehicle)
+        has_position = vehicle_pos.HasField('position')
+        buffers.vehicle_positions.append((
+            entity_id,
+            trip_key,
+            vehicle_key,
+            vehicle_pos.position.latitude if has_position and vehicle_pos.position.HasField('latitude') else None,
+            vehicle_pos.position.longitude if has_position and vehicle_pos.position.HasField('longitude') else None,
+            vehicle_pos.current_stop_sequence if vehicle_pos.HasField('current_stop_sequence') else None,
+            VEHICLE_STOP_STATUSES.get(vehicle_pos.current_status, 'IN_TRANSIT_TO')
+            if vehicle_pos.HasField('current_status') else 'IN_TRANSIT_TO',
+            vehicle_pos.timestamp if vehicle_pos.HasField('timestamp') else None,
+            vehicle_pos.stop_id if vehicle_pos.HasField('stop_id') else None,
+        ))
+
+    def _flatten_alert(self, buffers: FeedBuffers, entity_id: str, alert):
+        buffers.alerts.append((
+            entity_id,
+            alert.cause if alert.HasField('cause') else 'UNKNOWN_CAUSE',
+            alert.effect if alert.HasField('effect') else 'UNKNOWN_EFFECT',
+            alert.severity_level if alert.HasField('severity_level') else 'UNKNOWN_SEVERITY',
+        ))
+        for active_period in alert.active_period:
+            period_time = active_period.start if active_period.HasField('start') else None
+            period_time = active_period.end if active_period.HasField('end') else period_time
+            buffers.alert_active_periods.append((entity_id, period_time))
+        for informed_entity in alert.informed_entity:
+            buffers.alert_informed_entities.append((
+                entity_id,
+                informed_entity.agency_id if informed_entity.HasField('agency_id') else None,
+                informed_entity.route_id if informed_entity.HasField('route_id') else None,
+                informed_entity.route_type if informed_entity.HasField('route_type') else None,
+                informed_entity.stop_id if informed_entity.HasField('stop_id') else None,
+            ))
+        for text_type in ALERT_TEXT_TYPES:
+            if hasattr(alert, text_type) and getattr(alert, text_type):
+                for alert_text in getattr(alert, text_type).translation:
+                    buffers.alert_texts.append((
+                        entity_id,
+                        text_type,
+                        alert_text.text if alert_text.HasField('text') else None,
+                        alert_text.language if alert_text.HasField('language') else 'en',
+                    ))
+
+    def write_feed(self, buffers: FeedBuffers, feed_type: str, file_size: int) -> int:
+        return self._write_feed(buffers, feed_type, file_size, skip_existing=False)[0]
+
+    def write_feed_once(self, buffers: FeedBuffers, feed_type: str, file_size: int) -> Tuple[int, bool]:
+        """
+        Write a feed unless a message of the same feed type and header timestamp is already loaded.
+
+        Returns (feed_message_id, written); the id is the existing message's when written is False.
+        """
+        return self._write_feed(buffers, feed_type, file_size, skip_existing=True)
+
+    def find_loaded_timestamps(self, feed_type: str, since: int, until: int) -> set:
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT DISTINCT h.timestamp_seconds
+                FROM {SCHEMA}.gtfs_rt_feed_messages m
+                JOIN {SCHEMA}.gtfs_rt_feed_headers h ON h.feed_message_id = m.id
+                WHERE m.feed_type = %s AND h.timestamp_seconds BETWEEN %s AND %s
+                """,
+                (feed_type, since, until)
+            )
+            timestamps = {row[0] for row in cur.fetchall()}
+        self.conn.commit()
+        return timestamps
+
+    def _write_feed(self, buffers: FeedBuffers, feed_type: str, file_size: int,
+                    skip_existing: bool) -> Tuple[int, bool]:
+        if self.descriptor_cache is not None:
+            # Descriptors are shared across feeds and committed before the feed transaction
+            trip_desc_ids = self.descriptor_cache.resolve_trip_descriptors(buffers.trip_descriptors)
+            vehicle_desc_ids = self.descriptor_cache.resolve_vehicle_descriptors(buffers.vehicle_descriptors)
+
+        try:
+            with self.conn.cursor() as cur:
+                if skip_existing:
+                    existing_id = self._find_loaded_feed(cur, feed_type, buffers.header)
+                    if existing_id is not None:
+                        self.conn.rollback()
+                        return existing_id, False
+
+                feed_message_id = self._insert_feed_message(cur, feed_type, file_size, buffers.header)
+                entity_ids = self._insert_entities(cur, feed_message_id, buffers.entities)
+                if self.descriptor_cache is None:
+                    trip_desc_ids = self._resolve_trip_descriptors(cur, buffers.trip_descriptors)
+                    vehicle_desc_ids = self._resolve_vehicle_descriptors(cur, buffers.vehicle_descriptors)
+
+                trip_update_ids = self._insert_via_staging(
+                    cur, 'gtfs_rt_trip_updates',
+                    ['feed_entity_id', 'trip_descriptor_id', 'vehicle_descriptor_id'],
+                    ((entity_ids[entity_id], trip_desc_ids[trip_key], vehicle_desc_ids[vehicle_key])
+                     for entity_id, trip_key, vehicle_key in buffers.trip_updates),
+                    returning='feed_entity_id, trip_update_id'
+                )
+                copy_rows(
+                    cur, f'{SCHEMA}.gtfs_rt_stop_time_updates',
+                    ['trip_update_id', 'stop_sequence', 'stop_id', 'arrival_delay', 'arrival_time',
+                     'departure_delay', 'departure_time', 'schedule_relationship'],
+                    ((trip_update_ids[entity_ids[row[0]]],) + row[1:] for row in buffers.stop_time_updates)
+                )
+
+                copy_rows(
+                    cur, f'{SCHEMA}.gtfs_rt_vehicle_positions',
+                    ['feed_entity_id', 'trip_descriptor_id', 'vehicle_descriptor_id', 'latitude', 'longitude',
+                     'current_stop_sequence', 'current_status', 'timestamp_seconds', 'stop_id'],
+                    ((entity_ids[row[0]], trip_desc_ids[row[1]], vehicle_desc_ids[row[2]]) + row[3:]
+                     for row in buffers.vehicle_positions)
+                )
+
+                alert_ids = self._insert_via_staging(
+                    cur, 'gtfs_rt_alerts',
+                    ['feed_entity_id', 'cause', 'effect', 'severity_level'],
+                    ((entity_ids[row[0]],) + row[1:] for row in buffers.alerts),
+                    returning='feed_entity_id, alert_id'
+                )
+                for table_name, columns, rows in [
+                    ('gtfs_rt_alert_active_periods', ['alert_id', 'period_time'], buffers.alert_active_periods),
+                    ('gtfs_rt_alert_informed_entities',
+                     ['alert_id', 'agency_id', 'route_id', 'route_type', 'stop_id'], buffers.alert_informed_entities),
+                    ('gtfs_rt_alert_text', ['alert_id', 'text_type', 'text', 'language'], buffers.alert_texts),
+                ]:
+                    copy_rows(
+                        cur, f'{SCHEMA}.{table_name}', columns,
+                        ((alert_ids[entity_ids[row[0]]],) + row[1:] for row in rows)
+                    )
+
+            self.conn.commit()
+            return feed_message_id, True
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def _find_loaded_feed(self, cur, feed_type: str, header):
+        # Serializes concurrent writers of the same snapshot until this transaction ends
+        cur.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))",
+            (f"{SCHEMA}.gtfs_rt_feed_messages:{feed_type}:{header.timestamp}",)
+        )
+        cur.execute(
+            f"""
+            SELECT m.id
+            FROM {SCHEMA}.gtfs_rt_feed_messages m
+            JOIN {SCHEMA}.gtfs_rt_feed_headers h ON h.feed_message_id = m.id
+            WHERE m.feed_type = %s AND h.timestamp_seconds = %s
+            LIMIT 1
+            """,
+            (feed_type, header.timestamp)
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def _insert_feed_message(self, cur, feed_type: str, file_size: int, header) -> int:
+        cur.execute(
+            f"INSERT INTO {SCHEMA}.gtfs_rt_feed_messages (feed_type, file_size) VALUES (%s, %s) RETURNING id",
+            (feed_type, file_size)
+        )
+        feed_message_id = cur.fetchone()[0]
+        cur.execute(
+            f"""
+            INSERT INTO {SCHEMA}.gtfs_rt_feed_headers
+                (feed_message_id, gtfs_realtime_version, incrementality, timestamp_seconds, feed_version)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (
+                feed_message_id,
+                getattr(header, 'gtfs_realtime_version', '2.0'),
+                'FULL_DATASET' if getattr(header, 'incrementality', 0) == 0 else 'DIFFERENTIAL',
+                getattr(header, 'timestamp', None),
+                getattr(header, 'feed_version', None),
+            )
+        )
+        return feed_message_id
+
+    def _insert_entities(self, cur, feed_message_id: int, entities: List[tuple]) -> Dict[str, int]:
+        return self._insert_via_staging(
+            cur, 'gtfs_rt_feed_entities',
+            ['feed_message_id', 'entity_id', 'is_deleted', 'entity_type'],
+            ((feed_message_id,) + row for row in entities),
+            returning='entity_id, id',
+            on_conflict='ON CONFLICT (feed_message_id, entity_id) DO NOTHING'
+        )
+
+    def _resolve_trip_descriptors(self, cur, trip_descriptors: Dict[tuple, str]) -> Dict[tuple, int]:
+        if not trip_descriptors:
+            return {}
+        key_columns = ['trip_id', 'route_id', 'direction_id', 'start_date']
+        self._insert_via_staging(
+            cur, 'gtfs_rt_trip_descriptors',
+            key_columns + ['schedule_relationship'],
+            (key + (schedule_relationship,) for key, schedule_relationship in trip_descriptors.items()),
+            on_conflict='ON CONFLICT (trip_id, route_id, direction_id, start_date) DO NOTHING'
+        )
+        return self._select_staged_ids(cur, 'gtfs_rt_trip_descriptors', key_columns, 'trip_descriptor_id')
+
+    def _resolve_vehicle_descriptors(self, cur, vehicle_descriptors: Dict[tuple, None]) -> Dict[tuple, int]:
+        if not vehicle_descriptors:
+            return {}
+        key_columns = ['vehicle_id', 'label']
+        self._insert_via_staging(
+            cur, 'gtfs_rt_vehicle_descriptors', key_columns, vehicle_descriptors.keys(),
+            on_conflict='ON CONFLICT (vehicle_id, label) DO NOTHING'
+        )
+        return self._select_staged_ids(cur, 'gtfs_rt_vehicle_descriptors', key_columns, 'vehicle_descriptor_id')
+
+    def _insert_via_staging(self, cur, table_name: str, columns: List[str], rows,
+                            returning: str = None, on_conflict: str = '') -> Dict:
+        rows = list(rows)
+        if not rows:
+            return {}
+
+        staging_table = f"staging_{table_name}"
+        column_list = ', '.join(columns)
+        cur.execute(
+            f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {SCHEMA}.{table_name} WITH NO DATA"
+        )
+        copy_rows(cur, staging_table, columns, rows)
+
+        query = f"INSERT INTO {SCHEMA}.{table_name} ({column_list}) SELECT {column_list} FROM {staging_table} {on_conflict}"
+        if returning is None:
+            cur.execute(query)
+            return {}
+        cur.execute(f"{query} RETURNING {returning}")
+        return {key: generated_id for key, generated_id in cur.fetchall()}
+
+    def _select_staged_ids(self, cur, table_name: str, key_columns: List[str], id_column: str) -> Dict[tuple, int]:
+        cur.execute(
+            f"SELECT {', '.join('t.' + c for c in key_columns)}, t.{id_column} "
+            f"FROM {SCHEMA}.{table_name} t JOIN staging_{table_name} s USING ({', '.join(key_columns)})"
+        )
+        return {tuple(row[:-1]): row[-1] for row in cur.fetchall()}
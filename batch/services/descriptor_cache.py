@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+import pytz
+from psycopg2.extras import execute_values
+from batch.services.vehicle_positions_service import VehiclePositionsService, TRIP_SCHEDULE_RELATIONSHIPS
+
+SCHEMA = 'gtfs_realtime'
+TRIP_KEY_COLUMNS = ['trip_id', 'route_id', 'direction_id', 'start_date']
+VEHICLE_KEY_COLUMNS = ['vehicle_id', 'label']
+
+
+class LRUIdCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[tuple, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[int]:
+        descriptor_id = self._data.get(key)
+        if descriptor_id is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return descriptor_id
+
+    def put(self, key: tuple, descriptor_id: int):
+        self._data[key] = descriptor_id
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DescriptorIdCache:
+    """
+    In-process trip/vehicle descriptor id cache keyed on the natural unique keys of
+    gtfs_rt_trip_descriptors and gtfs_rt_vehicle_descriptors.
+
+    Misses for a whole feed are resolved with one INSERT ... ON CONFLICT ... RETURNING
+    per table, and committed immediately so later feed transactions can reference them.
+    """
+
+    def __init__(self, connection=None, maxsize: int = 50000, timezone: str = 'America/Vancouver'):
+        self.connection = connection
+        self.timezone = pytz.timezone(timezone)
+        self.trip_descriptors = LRUIdCache(maxsize)
+        self.vehicle_descriptors = LRUIdCache(maxsize)
+        self.warm_loaded = 0
+
+    def __len__(self) -> int:
+        return len(self.trip_descriptors) + len(self.vehicle_descriptors)
+
+    def warm_load(self) -> int:
+        # Trips running past midnight keep the previous day's start_date
+        today = datetime.now(self.timezone).date()
+        service_dates = [(today - timedelta(days=1)).strftime('%Y%m%d'), today.strftime('%Y%m%d')]
+        loaded = 0
+        with self.connection.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT trip_id, route_id, direction_id, start_date, trip_descriptor_id
+                FROM {SCHEMA}.gtfs_rt_trip_descriptors
+                WHERE start_date = ANY(%s)
+                ORDER BY trip_descriptor_id DESC
+                LIMIT %s
+                """,
+                (service_dates, self.trip_descriptors.maxsize)
+            )
+            for row in reversed(cur.fetchall()):
+                self.trip_descriptors.put(tuple(row[:-1]), row[-1])
+                loaded += 1
+
+            cur.execute(
+                f"""
+                SELECT vehicle_id, label, vehicle_descriptor_id
+                FROM {SCHEMA}.gtfs_rt_vehicle_descriptors
+                ORDER BY vehicle_descriptor_id DESC
+                LIMIT %s
+                """,
+                (self.vehicle_descriptors.maxsize,)
+            )
+            for row in reversed(cur.fetchall()):
+                self.vehicle_descriptors.put(tuple(row[:-1]), row[-1])
+                loaded += 1
+        self.connection.commit()
+
+        self.warm_loaded += loaded
+        return loaded
+
+    def prefetch_feed(self, feed_message):
+        """Resolve every descriptor referenced by a feed; returns (trip ids, vehicle ids) by natural key."""
+        trip_descriptors = {}
+        vehicle_keys = []
+        for entity in feed_message.entity:
+            if entity.HasField('trip_update'):
+                descriptor_source = entity.trip_update
+            elif entity.HasField('vehicle'):
+                descriptor_source = entity.vehicle
+            else:
+                continue
+            trip_desc = descriptor_source.trip
+            trip_key = VehiclePositionsService.get_trip_descriptor_key(trip_desc)
+            if trip_key not in trip_descriptors:
+                trip_descriptors[trip_key] = (
+                    TRIP_SCHEDULE_RELATIONSHIPS.get(trip_desc.schedule_relationship, 'SCHEDULED')
+                    if trip_desc.HasField('schedule_relationship') else 'SCHEDULED'
+                )
+            vehicle_keys.append(VehiclePositionsService.get_vehicle_descriptor_key(descriptor_source.vehicle))
+
+        return (
+            self.resolve_trip_descriptors(trip_descriptors),
+            self.resolve_vehicle_descriptors(vehicle_keys)
+        )
+
+    def resolve_trip_descriptors(self, trip_descriptors: Dict[tuple, str]) -> Dict[tuple, int]:
+        resolved, missing = self._lookup(self.trip_descriptors, trip_descriptors.keys())
+        if missing:
+            rows = [key + (trip_descriptors[key],) for key in missing]
+            fetched = self._upsert(
+                'gtfs_rt_trip_descriptors', TRIP_KEY_COLUMNS, ['schedule_relationship'],
+                'trip_descriptor_id', rows
+            )
+            for key, descriptor_id in fetched.items():
+                self.trip_descriptors.put(key, descriptor_id)
+            resolved.update(fetched)
+        return resolved
+
+    def resolve_vehicle_descriptors(self, vehicle_keys: Iterable[tuple]) -> Dict[tuple, int]:
+        resolved, missing = self._lookup(self.vehicle_descriptors, vehicle_keys)
+        if missing:
+            fetched = self._upsert(
+                'gtfs_rt_vehicle_descriptors', VEHICLE_KEY_COLUMNS, [],
+                'vehicle_descriptor_id', missing
+            )
+            for key, descriptor_id in fetched.items():
+                self.vehicle_descriptors.put(key, descriptor_id)
+            resolved.update(fetched)
+        return resolved
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.trip_descriptors.hits + self.vehicle_descriptors.hits,
+            'misses': self.trip_descriptors.misses + self.vehicle_descriptors.misses,
+            'trip_hits': self.trip_descriptors.hits,
+            'trip_misses': self.trip_descriptors.misses,
+            'vehicle_hits': self.vehicle_descriptors.hits,
+            'vehicle_misses': self.vehicle_descriptors.misses,
+            'warm_loaded': self.warm_loaded,
+            'size': len(self),
+        }
+
+    def _lookup(self, cache: LRUIdCache, keys: Iterable[tuple]):
+        resolved = {}
+        missing = {}
+        for key in keys:
+            if key in resolved or key in missing:
+                continue
+            descriptor_id = cache.get(key)
+            if descriptor_id is None:
+                missing[key] = None
+            else:
+                resolved[key] = descriptor_id
+        return resolved, list(missing)
+
+    def _upsert(self, table_name: str, key_columns, extra_columns, id_column: str, rows) -> Dict[tuple, int]:
+        columns = ', '.join(key_columns + extra_columns)
+        keys = ', '.join(key_columns)
+        # The outer SELECT sees the pre-insert snapshot, so existing and new rows never overlap
+        query = f"""
+            WITH input ({columns}) AS (VALUES %s),
+            inserted AS (
+                INSERT INTO {SCHEMA}.{table_name} ({columns})
+                SELECT {columns} FROM input
+                ON CONFLICT ({keys}) DO NOTHING
+                RETURNING {keys}, {id_column}
+            )
+            SELECT {keys}, {id_column} FROM inserted
+            UNION ALL
+            SELECT {', '.join('t.' + c for c in key_columns)}, t.{id_column}
+            FROM {SCHEMA}.{table_name} t JOIN input USING ({keys})
+        """
+        try:
+            with self.connection.cursor() as cur:
+                result = execute_values(cur, query, rows, page_size=len(rows), fetch=True)
+                fetched = {tuple(row[:-1]): row[-1] for row in result}
+
+                # Rows committed by a concurrent loader after our snapshot are skipped by
+                # DO NOTHING and invisible to the join, so look them up again
+                unresolved = [row[:len(key_columns)] for row in rows if tuple(row[:len(key_columns)]) not in fetched]
+                if unresolved:
+                    result = execute_values(
+                        cur,
+                        f"""
+                        SELECT {', '.join('t.' + c for c in key_columns)}, t.{id_column}
+                        FROM {SCHEMA}.{table_name} t
+                        JOIN (VALUES %s) AS input ({keys}) USING ({keys})
+                        """,
+                        unresolved, page_size=len(unresolved), fetch=True
+                    )
+                    fetched.update({tuple(row[:-1]): row[-1] for row in result})
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return fetched
@@ -0,0 +1,149 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Union
+import pytz
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed when the Parquet export is enabled
+    pa = None
+    pq = None
+
+from batch.controller.feed_decoder import decode_trip_updates, decode_vehicle_positions
+
+def _schemas():
+    timestamp = pa.timestamp('s', tz='UTC')
+    descriptor = [
+        ('feed_timestamp', timestamp),
+        ('entity_id', pa.string()),
+        ('trip_id', pa.string()),
+        ('route_id', pa.string()),
+        ('direction_id', pa.int8()),
+        ('start_date', pa.string()),
+        ('vehicle_id', pa.string()),
+    ]
+    return {
+        'trip_updates': pa.schema(descriptor + [
+            ('stop_sequence', pa.int32()),
+            ('stop_id', pa.string()),
+            ('arrival_delay', pa.int32()),
+            ('arrival_time', timestamp),
+            ('departure_delay', pa.int32()),
+            ('departure_time', timestamp),
+            ('schedule_relationship', pa.string()),
+        ]),
+        'vehicle_positions': pa.schema(descriptor + [
+            ('vehicle_label', pa.string()),
+            ('latitude', pa.float64()),
+            ('longitude', pa.float64()),
+            ('current_stop_sequence', pa.int32()),
+            ('current_status', pa.string()),
+            ('timestamp', timestamp),
+            ('stop_id', pa.string()),
+        ]),
+    }
+
+
+def _arrow(values, arrow_type):
+    # NumPy columns from the decoder: NaN / None become nulls, masked arrays are already Arrow
+    array = values if isinstance(values, pa.Array) else pa.array(values, from_pandas=True)
+    return array.cast(arrow_type)
+
+
+class ParquetFeedExporter:
+    """
+    Writes the stop_time_updates and vehicle_positions of each feed as typed Parquet files,
+    hive-partitioned as <root>/feed_type=<feed>/service_date=<YYYYMMDD>/part-<header_ts>.parquet.
+
+    stop_time_updates are partitioned on the trip start_date, so one feed can write to two
+    partitions around midnight. vehicle_positions use the local date of the feed header,
+    because positions often carry no start_date (stored as the '20250101' placeholder).
+    File names are keyed on the header timestamp, which makes re-exporting the same feed
+    (e.g. from a replay) overwrite instead of duplicate.
+    """
+
+    def __init__(self, root_dir: Union[str, Path], timezone: str = 'America/Vancouver'):
+        if pa is None:
+            raise ImportError("Parquet export requires the pyarrow package (pip install pyarrow)")
+        self.root_dir = Path(root_dir)
+        self.timezone = pytz.timezone(timezone)
+        self.schemas = _schemas()
+
+    def export_feed(self, feed_message, feed_type: str) -> List[Path]:
+        if feed_type == 'trip_updates':
+            arrays = decode_trip_updates(feed_message)
+        elif feed_type == 'vehicle_positions':
+            arrays = decode_vehicle_positions(feed_message)
+        else:
+            return []
+        if len(arrays) == 0:
+            return []
+
+        header_ts = feed_message.header.timestamp if feed_message.header.HasField('timestamp') else None
+        table = self._build_table(arrays, feed_type, header_ts)
+        feed_date = datetime.fromtimestamp(header_ts or 0, self.timezone).strftime('%Y%m%d')
+
+        if feed_type == 'vehicle_positions':
+            return [self._write_partition(feed_type, feed_date, header_ts or 0, table)]
+
+        start_dates = arrays.trip_column('start_date')
+        return [
+            self._write_partition(
+                feed_type, service_date, header_ts or 0, table.filter(pa.array(start_dates == service_date))
+            )
+            for service_date in sorted(set(start_dates))
+        ]
+
+    def _build_table(self, arrays, feed_type: str, header_ts: Optional[int]):
+        if feed_type == 'trip_updates':
+            trips = arrays.trips
+            index = arrays.trip_index
+            columns = {
+                'stop_sequence': pa.array(arrays.stop_sequence, mask=arrays.stop_sequence < 0),
+                'stop_id': arrays.stop_id,
+                'arrival_delay': pa.array(arrays.arrival_delay, mask=~arrays.has_arrival_delay),
+                'arrival_time': pa.array(arrays.arrival_time, mask=arrays.arrival_time == 0),
+                'departure_delay': pa.array(arrays.departure_delay, mask=~arrays.has_departure_delay),
+                'departure_time': pa.array(arrays.departure_time, mask=arrays.departure_time == 0),
+                'schedule_relationship': arrays.schedule_relationship,
+            }
+        else:
+            trips = arrays.trips
+            index = slice(None)
+            columns = {
+                'vehicle_label': trips.vehicle_label,
+                'latitude': arrays.latitude,
+                'longitude': arrays.longitude,
+                'current_stop_sequence': pa.array(
+                    arrays.current_stop_sequence, mask=arrays.current_stop_sequence < 0
+                ),
+                'current_status': arrays.current_status,
+                'timestamp': pa.array(arrays.timestamp, mask=arrays.timestamp == 0),
+                'stop_id': arrays.stop_id,
+            }
+
+        size = len(arrays)
+        columns = {
+            'feed_timestamp': pa.array([header_ts] * size),
+            'entity_id': trips.entity_id[index],
+            'trip_id': trips.trip_id[index],
+            'route_id': trips.route_id[index],
+            'direction_id': trips.direction_id[index],
+            'start_date': trips.start_date[index],
+            'vehicle_id': trips.vehicle_id[index],
+            **columns,
+        }
+        schema = self.schemas[feed_type]
+        return pa.Table.from_arrays([_arrow(columns[field.name], field.type) for field in schema], schema=schema)
+
+    def _write_partition(self, feed_type: str, service_date: str, header_ts: int, table) -> Path:
+        directory = self.root_dir / f'feed_type={feed_type}' / f'service_date={service_date}'
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'part-{header_ts}.parquet'
+        # Write to a dot-file first (ignored by dataset readers) so readers never see a partial file
+        tmp_path = directory / f'.{path.name}.tmp'
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,95 @@
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import pandas as pd
+
+from batch.utils.file_utils import read_state_file, write_state_file
+
+logger = logging.getLogger(__name__)
+
+WINDOW_COLUMNS = ['time_bucket', 'fingerprint']
+
+
+class PredictionInputState:
+    """
+    Input windows and predictions of previous prediction runs, per region and per
+    sequence key (route_id_direction_id_stop_id), persisted on disk between runs.
+
+    A window is identified by its latest input time_bucket and a fingerprint of its raw
+    feature values (the latest hour keeps filling up after its time_bucket first appears).
+    Updates stay pending until commit(), so a run whose predictions were not saved
+    leaves the previous state in place.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, signature: tuple = ()):
+        self.path = Path(path) if path else None
+        # State written with another model, scaler or timestep setting is discarded on load
+        self.signature = tuple(signature)
+        self._windows: Dict[str, pd.DataFrame] = {}
+        self._predictions: Dict[str, pd.DataFrame] = {}
+        self._pending: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return sum(len(windows) for windows in self._windows.values())
+
+    def reusable_windows(self, region_id: str, current_hour) -> Optional[pd.DataFrame]:
+        """
+        Windows whose previous predictions were made in current_hour (their earliest
+        target is current_hour), indexed by sequence key. Only these may be carried
+        forward: predictions from an earlier hour start at a past target and lack the
+        last horizon, so they are recomputed.
+        """
+        windows = self._windows.get(region_id)
+        predictions = self._predictions.get(region_id)
+        if windows is None or predictions is None or predictions.empty:
+            return None
+        earliest_target = predictions.groupby('sequence_key')['prediction_target_time'].min()
+        current = earliest_target.index[earliest_target == current_hour]
+        return windows[windows.index.isin(current)]
+
+    def carry_forward(self, region_id: str, keys) -> pd.DataFrame:
+        """Previous prediction rows of the given sequence keys, unchanged (prediction_created_at included)."""
+        predictions = self._predictions.get(region_id)
+        if predictions is None or len(keys) == 0:
+            return pd.DataFrame()
+        carried = predictions[predictions['sequence_key'].isin(keys)]
+        return carried.drop(columns='sequence_key').reset_index(drop=True)
+
+    def update(self, region_id: str, windows: pd.DataFrame, predictions: pd.DataFrame, keys):
+        """
+        Stage the region's windows and the prediction rows (new and carried forward) of this run.
+        keys gives the sequence key of each prediction row.
+        """
+        predictions = predictions.assign(sequence_key=list(keys))
+        self._pending[region_id] = (
+            windows[windows.index.isin(predictions['sequence_key'])][WINDOW_COLUMNS],
+            predictions.reset_index(drop=True)
+        )
+
+    def commit(self):
+        for region_id, (windows, predictions) in self._pending.items():
+            self._windows[region_id] = windows
+            self._predictions[region_id] = predictions
+        self._pending.clear()
+
+    def discard(self):
+        self._pending.clear()
+
+    def load(self) -> int:
+        state = read_state_file(self.path, 'prediction state')
+        if state is None:
+            return 0
+        if state.get('signature') != self.signature:
+            logger.warning(f"Prediction state {self.path} was written with another model setup, starting empty")
+            return 0
+        self._windows = state['windows']
+        self._predictions = state['predictions']
+        return len(self)
+
+    def save(self):
+        if self.path is None:
+            return
+        state = {'signature': self.signature, 'windows': self._windows, 'predictions': self._predictions}
+        write_state_file(self.path, lambda f: pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL))
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pytz
+
+from batch.utils.file_utils import read_state_file, write_state_file
+
+logger = logging.getLogger(__name__)
+
+StopTimeKey = tuple  # (trip_id, start_date, stop_sequence or stop_id)
+
+
+class StopTimeFingerprintIndex:
+    """
+    Fingerprints of the stop_time_update values written by previous loads, keyed on
+    (trip_id, start_date, stop_sequence) and persisted on disk between runs.
+
+    The index is held as three sorted NumPy arrays (64-bit key hash, 64-bit value
+    fingerprint and start date as YYYYMMDD), about 20 bytes per stop time, and saved
+    as an .npz file, so a cron run loads and rewrites it without building Python objects
+    per entry. Fingerprints of rows accepted by is_changed() stay pending until commit(),
+    so a failed feed write can be discarded without poisoning the index.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, retention_days: int = 1,
+                 timezone: str = 'America/Vancouver'):
+        self.path = Path(path) if path else None
+        self.retention_days = retention_days
+        self.timezone = pytz.timezone(timezone)
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._fingerprints = np.empty(0, dtype=np.uint64)
+        self._start_dates = np.empty(0, dtype=np.uint32)
+        # key hash -> (fingerprint, start date)
+        self._pending: Dict[int, Tuple[int, int]] = {}
+        self.written = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def make_key(trip_id: str, start_date: str, stop_sequence, stop_id) -> StopTimeKey:
+        return (trip_id, start_date, stop_sequence if stop_sequence is not None else stop_id)
+
+    @staticmethod
+    def fingerprint(values: tuple) -> int:
+        digest = hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    @staticmethod
+    def _start_date(key: StopTimeKey) -> int:
+        # Keys without a usable start_date sort before any retention cut-off and are pruned
+        start_date = key[1]
+        return int(start_date) if isinstance(start_date, str) and start_date.isdigit() else 0
+
+    def _committed(self, key_hash: int) -> Optional[int]:
+        idx = int(np.searchsorted(self._keys, np.uint64(key_hash)))
+        if idx < len(self._keys) and int(self._keys[idx]) == key_hash:
+            return int(self._fingerprints[idx])
+        return None
+
+    def is_changed(self, key: StopTimeKey, values: tuple) -> bool:
+        key_hash = self.fingerprint(key)
+        fingerprint = self.fingerprint(values)
+        pending = self._pending.get(key_hash)
+        previous = pending[0] if pending is not None else self._committed(key_hash)
+        if previous == fingerprint:
+            self.skipped += 1
+            return False
+        self._pending[key_hash] = (fingerprint, self._start_date(key))
+        self.written += 1
+        return True
+
+    def reset_counts(self):
+        self.written = 0
+        self.skipped = 0
+
+    def commit(self):
+        if not self._pending:
+            return
+        keys = np.fromiter(self._pending.keys(), dtype=np.uint64, count=len(self._pending))
+        entries = np.array(list(self._pending.values()), dtype=np.uint64).reshape(-1, 2)
+        self._pending.clear()
+
+        keys = np.concatenate([self._keys, keys])
+        fingerprints = np.concatenate([self._fingerprints, entries[:, 0]])
+        start_dates = np.concatenate([self._start_dates, entries[:, 1].astype(np.uint32)])
+        # Stable sort keeps the new entry after the committed one; keep the last of each key
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        last = np.append(keys[1:] != keys[:-1], True)
+        self._keys = keys[last]
+        self._fingerprints = fingerprints[order][last]
+        self._start_dates = start_dates[order][last]
+
+    def discard(self):
+        self._pending.clear()
+
+    def prune(self) -> int:
+        # Trips running past midnight keep the previous day's start_date
+        oldest = int((datetime.now(self.timezone).date() - timedelta(days=self.retention_days)).strftime('%Y%m%d'))
+        keep = self._start_dates >= oldest
+        expired = len(keep) - int(keep.sum())
+        if expired:
+            self._keys = self._keys[keep]
+            self._fingerprints = self._fingerprints[keep]
+            self._start_dates = self._start_dates[keep]
+        return expired
+
+    @staticmethod
+    def _read_arrays(f) -> tuple:
+        with np.load(f) as data:
+            return (
+                data['keys'].astype(np.uint64, copy=False),
+                data['fingerprints'].astype(np.uint64, copy=False),
+                data['start_dates'].astype(np.uint32, copy=False)
+            )
+
+    def load(self) -> int:
+        arrays = read_state_file(self.path, 'stop time fingerprints', self._read_arrays)
+        if arrays is None:
+            return 0
+        keys, fingerprints, start_dates = arrays
+        if not (len(keys) == len(fingerprints) == len(start_dates)):
+            logger.warning(f"Stop time fingerprints in {self.path} are inconsistent, starting empty")
+            return 0
+        self._keys, self._fingerprints, self._start_dates = keys, fingerprints, start_dates
+        self.prune()
+        return len(self)
+
+    def save(self):
+        if self.path is None:
+            return
+        self.prune()
+        write_state_file(self.path, lambda f: np.savez(
+            f, keys=self._keys, fingerprints=self._fingerprints, start_dates=self._start_dates
+        ))
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from batch.controller.gtfs_rt_enums import TRIP_SCHEDULE_RELATIONSHIPS, VEHICLE_STOP_STATUSES
 from batch.models.realtime.trip_descriptors import GTFSRTTripDescriptor
 from batch.models.realtime.vehicle_descriptors import GTFSRTVehicleDescriptor
 from batch.models.realtime.vehicle_positions import GTFSRTVehiclePosition
@@ -8,11 +9,22 @@ class VehiclePositionsService:
     def __init__(self, db_session: Session):
         self.db = db_session
 
-    def create_or_get_trip_descriptor(self, trip_desc) -> GTFSRTTripDescriptor:
+    @staticmethod
+    def get_trip_descriptor_key(trip_desc) -> tuple:
         trip_id = trip_desc.trip_id if trip_desc.HasField('trip_id') else 'UNKNOWN'
         route_id = trip_desc.route_id if trip_desc.HasField('route_id') else 'UNKNOWN'
         direction_id = trip_desc.direction_id if trip_desc.HasField('direction_id') else 0
         start_date = trip_desc.start_date if trip_desc.HasField('start_date') else '20250101'
+        return trip_id, route_id, direction_id, start_date
+
+    @staticmethod
+    def get_vehicle_descriptor_key(vehicle_desc) -> tuple:
+        vehicle_id = vehicle_desc.id if vehicle_desc.HasField('id') else 'UNKNOWN'
+        label = vehicle_desc.label if vehicle_desc.HasField('label') else 'UNKNOWN'
+        return vehicle_id, label
+
+    def create_or_get_trip_descriptor(self, trip_desc) -> GTFSRTTripDescriptor:
+        trip_id, route_id, direction_id, start_date = self.get_trip_descriptor_key(trip_desc)
         existing = self.db.query(GTFSRTTripDescriptor).filter(
             GTFSRTTripDescriptor.trip_id == trip_id,
             GTFSRTTripDescriptor.route_id == route_id,
@@ -34,8 +46,7 @@ class VehiclePositionsService:
         return trip_descriptor
 
     def create_or_get_vehicle_descriptor(self, vehicle_desc) -> GTFSRTVehicleDescriptor:
-        vehicle_id = vehicle_desc.id if vehicle_desc.HasField('id') else 'UNKNOWN'
-        label = vehicle_desc.label if vehicle_desc.HasField('label') else 'UNKNOWN'
+        vehicle_id, label = self.get_vehicle_descriptor_key(vehicle_desc)
         existing = self.db.query(GTFSRTVehicleDescriptor).filter(
             GTFSRTVehicleDescriptor.vehicle_id == vehicle_id,
             GTFSRTVehicleDescriptor.label == label
@@ -69,9 +80,7 @@ class VehiclePositionsService:
         return vehicle_position
 
     def _get_schedule_relationship(self, relationship) -> str:
-        mapping = {0: 'SCHEDULED', 1: 'ADDED', 2: 'UNSCHEDULED', 3: 'CANCELED', 5: 'REPLACEMENT', 6: 'DUPLICATED', 7: 'DELETED', 8: 'NEW'}
-        return mapping.get(relationship, 'SCHEDULED')
+        return TRIP_SCHEDULE_RELATIONSHIPS.get(relationship, 'SCHEDULED')
 
     def _get_vehicle_stop_status(self, status) -> str:
-        mapping = {0: 'INCOMING_AT', 1: 'STOPPED_AT', 2: 'IN_TRANSIT_TO'}
-        return mapping.get(status, 'IN_TRANSIT_TO')
+        return VEHICLE_STOP_STATUSES.get(status, 'IN_TRANSIT_TO')
@@ -2,61 +2,204 @@
 データ標準化クラス
 """
 
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+
+def _standard_scaler():
+    """StandardScaler（sklearnのインポートは重いため、パラメータを学習する場合のみ読み込む）"""
+    from sklearn.preprocessing import StandardScaler
+    return StandardScaler()
+
+
 class DataStandardizer:
     """データ標準化クラス"""
-    
+
     def __init__(self):
         """初期化"""
-        self.feature_scaler = StandardScaler()
-        self.target_scaler = StandardScaler()
-        
+        # 学習時に作成する sklearn の StandardScaler
+        self.feature_scaler = None
+        self.target_scaler = None
+        # 保存済みの標準化パラメータから作成した変換係数（transform_features で使用）
+        self.feature_mean = None
+        self.feature_scale = None
+        self.target_mean = None
+        self.target_scale = None
+
+    @staticmethod
+    def scaler_path(model_path):
+        """
+        モデルファイルに対応する標準化パラメータのパス
+
+        Args:
+            model_path (str | Path): モデルファイルのパス（例: best_delay_model.h5）
+
+        Returns:
+            Path: 同じディレクトリの <モデル名>_scalers.npz
+        """
+        model_path = Path(model_path)
+        return model_path.with_name(f"{model_path.stem}_scalers.npz")
+
     def fit_scalers(self, X_train, y_train):
         """
         標準化パラメータを学習
-        
+
         Args:
             X_train (np.array): 訓練用入力データ
             y_train (np.array): 訓練用目標データ
         """
         # 入力データ用スケーラー（3D -> 2D -> fit）
         X_train_2d = X_train.reshape(-1, X_train.shape[-1])
-        self.feature_scaler.fit(X_train_2d)
-        
+        self.feature_scaler = _standard_scaler().fit(X_train_2d)
+
         # 目標データ用スケーラー
-        self.target_scaler.fit(y_train.reshape(-1, 1))
-        
+        self.target_scaler = _standard_scaler().fit(y_train.reshape(-1, 1))
+        self._set_feature_params(self.feature_scaler.mean_, self.feature_scaler.scale_)
+        self._set_target_params(self.target_scaler.mean_[0], self.target_scaler.scale_[0])
+
     def transform_features(self, X):
         """
         入力データの標準化
-        
+
         Args:
             X (np.array): 入力データ
-            
+
         Returns:
             np.array: 標準化済み入力データ
         """
-        original_shape = X.shape
-        X_2d = X.reshape(-1, X.shape[-1])
-        X_scaled = self.feature_scaler.transform(X_2d)
-        return X_scaled.reshape(original_shape)
-    
+        if self.feature_mean is None:
+            raise ValueError("Feature scaler is not fitted. Call fit_scalers, fit_transform_features or load_scalers first.")
+        return self._apply_feature_params(X)
+
     def fit_transform_features(self, X):
         """
         入力データの学習と標準化を同時実行
-        
+
         Args:
             X (np.array): 入力データ
-            
+
         Returns:
             np.array: 標準化済み入力データ
         """
         original_shape = X.shape
         X_2d = X.reshape(-1, X.shape[-1])
+        self.feature_scaler = _standard_scaler()
         X_scaled = self.feature_scaler.fit_transform(X_2d)
-        return X_scaled.reshape(original_shape)
\ No newline at end of file
+        self._set_feature_params(self.feature_scaler.mean_, self.feature_scaler.scale_)
+        return X_scaled.reshape(original_shape)
+
+    def fit_transform_targets(self, y):
+        """
+        目標データの学習と標準化を同時実行
+
+        Args:
+            y (np.array): 目標データ
+
+        Returns:
+            np.array: 標準化済み目標データ
+        """
+        self.target_scaler = _standard_scaler().fit(y.reshape(-1, 1))
+        self._set_target_params(self.target_scaler.mean_[0], self.target_scaler.scale_[0])
+        return self.transform_targets(y)
+
+    def transform_targets(self, y):
+        """
+        目標データの標準化
+
+        Args:
+            y (np.array): 目標データ
+
+        Returns:
+            np.array: 標準化済み目標データ
+        """
+        return (np.asarray(y, dtype=np.float64) - self.target_mean) / self.target_scale
+
+    def inverse_transform_targets(self, y_scaled):
+        """
+        標準化済み目標データ（予測値）を元のスケールに戻す
+
+        Args:
+            y_scaled (np.array): 標準化済み目標データ
+
+        Returns:
+            np.array: 元のスケールの目標データ
+        """
+        return np.asarray(y_scaled) * self.target_scale + self.target_mean
+
+    @property
+    def has_target_params(self):
+        """目標データの標準化パラメータがあるか（モデルが標準化済みの目標で学習されたか）"""
+        return self.target_mean is not None
+
+    def save_scalers(self, path):
+        """
+        学習済みの標準化パラメータ（平均・標準偏差）を保存
+
+        目標データのパラメータは fit_scalers / fit_transform_targets で学習した場合のみ保存する。
+
+        Args:
+            path (str | Path): 保存先（.npz）。通常は scaler_path(モデルのパス)
+
+        Returns:
+            Path: 保存先のパス
+        """
+        if self.feature_mean is None:
+            raise ValueError("Feature scaler is not fitted. Call fit_scalers or fit_transform_features first.")
+
+        params = {
+            'feature_mean': self.feature_mean,
+            'feature_scale': self.feature_scale,
+        }
+        if self.has_target_params:
+            params['target_mean'] = np.float64(self.target_mean)
+            params['target_scale'] = np.float64(self.target_scale)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, **params)
+        return path
+
+    @classmethod
+    def load_scalers(cls, path):
+        """
+        save_scalers で保存した標準化パラメータを読み込む
+
+        Args:
+            path (str | Path): 標準化パラメータのパス（.npz）
+
+        Returns:
+            DataStandardizer: transform_features（と目標データの変換）が使用可能なインスタンス
+        """
+        standardizer = cls()
+        with np.load(path) as params:
+            standardizer._set_feature_params(params['feature_mean'], params['feature_scale'])
+            if 'target_mean' in params:
+                standardizer._set_target_params(params['target_mean'], params['target_scale'])
+        return standardizer
+
+    def _set_feature_params(self, mean, scale):
+        self.feature_mean = np.asarray(mean, dtype=np.float64)
+        self.feature_scale = np.asarray(scale, dtype=np.float64)
+        # (X - mean) / scale を X * (1 / scale) + (-mean / scale) の1回の積和で計算する
+        self._feature_multiplier = 1.0 / self.feature_scale
+        self._feature_offset = -self.feature_mean * self._feature_multiplier
+
+    def _set_target_params(self, mean, scale):
+        self.target_mean = float(mean)
+        self.target_scale = float(scale)
+
+    def _apply_feature_params(self, X):
+        if X.shape[-1] != len(self.feature_mean):
+            raise ValueError(
+                f"Feature count mismatch: input has {X.shape[-1]} features, "
+                f"scaler was fitted on {len(self.feature_mean)}"
+            )
+        # 特徴量に bool 列があると object 配列になるため、先に float64 に変換する
+        X_scaled = np.asarray(X, dtype=np.float64) * self._feature_multiplier
+        X_scaled += self._feature_offset
+        return X_scaled
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -50,6 +51,85 @@ class SequenceCreator:
 
         return organized_features, group_info
     
+    def _sort_stop_groups(self, data, route_col, direction_col, stop_col, time_col='time_bucket'):
+        """
+        route_id + direction_id + stop_id のグループごとに行を時間順に並べる
+
+        グループ順は従来のループ（路線 -> 方向 -> バス停をそれぞれ出現順に処理）と同じ。
+        キーが欠損している行は除外する。
+
+        Returns:
+            tuple: (並べ替え後の行位置, 各グループの開始位置, 各グループの終了位置,
+                    各グループの路線・方向・バス停の値を取る行位置 (グループ数, 3))
+        """
+        keys = data[[route_col, direction_col, stop_col]]
+        rows = np.flatnonzero(keys.notna().all(axis=1).to_numpy())
+        if len(rows) == 0:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty, np.empty((0, 3), dtype=np.int64)
+
+        keys = keys.iloc[rows]
+        # 出現順の番号（路線・路線+方向・路線+方向+バス停）
+        route_ids = keys.groupby(route_col, sort=False).ngroup().to_numpy()
+        direction_ids = keys.groupby([route_col, direction_col], sort=False).ngroup().to_numpy()
+        stop_ids = keys.groupby([route_col, direction_col, stop_col], sort=False).ngroup().to_numpy()
+        time_codes = pd.factorize(data[time_col].iloc[rows], sort=True)[0]
+
+        order = np.lexsort((time_codes, stop_ids, direction_ids, route_ids))
+        perm = rows[order]
+        sorted_stops = stop_ids[order]
+        sorted_times = time_codes[order]
+
+        boundaries = np.flatnonzero(sorted_stops[1:] != sorted_stops[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(perm)]))
+
+        # 同時刻の行や欠損時刻を含むグループは、従来の sort_values と同じ並べ方をする
+        # （quicksortは安定ソートではないため、同時刻の行の順序は元の並びとソート対象の型に依存する）
+        same_time = np.flatnonzero(
+            (sorted_times[1:] == sorted_times[:-1]) & (sorted_stops[1:] == sorted_stops[:-1])
+        ) + 1
+        missing_time = np.flatnonzero(sorted_times < 0)
+        tie_groups = np.unique(
+            np.searchsorted(starts, np.concatenate((same_time, missing_time)), side='right') - 1
+        )
+        times = data[time_col]
+        if isinstance(times.dtype, pd.DatetimeTZDtype):
+            # sort_values はUTCのdatetime64配列を並べ替える
+            time_values = np.asarray(times.dt.tz_convert(None))
+        elif times.dtype.kind in 'iufmM':
+            time_values = times.to_numpy()
+        else:
+            time_values = None
+
+        for group in tie_groups:
+            group_rows = np.sort(perm[starts[group]:ends[group]])
+            if time_values is not None:
+                # pandas の nargsort と同じ: 欠損以外を quicksort し、欠損は元の順で末尾へ
+                values = time_values[group_rows]
+                missing = pd.isna(values)
+                group_order = np.concatenate((
+                    np.flatnonzero(~missing)[values[~missing].argsort(kind='quicksort')],
+                    np.flatnonzero(missing)
+                ))
+                perm[starts[group]:ends[group]] = group_rows[group_order]
+            else:
+                group_times = pd.Series(times.array[group_rows], index=group_rows)
+                perm[starts[group]:ends[group]] = group_times.sort_values().index.to_numpy()
+
+        # 従来のループと同じく、キーの値はそれぞれの初出行から取る
+        # （路線・路線+方向・バス停の各グループは並べ替え後に連続しているので、区間ごとの最小行位置）
+        key_rows = []
+        for ids in (route_ids, direction_ids, stop_ids):
+            sorted_ids = ids[order]
+            segment_starts = np.concatenate(([0], np.flatnonzero(sorted_ids[1:] != sorted_ids[:-1]) + 1))
+            first_row = np.empty(sorted_ids.max() + 1, dtype=perm.dtype)
+            first_row[sorted_ids[segment_starts]] = np.minimum.reduceat(perm, segment_starts)
+            key_rows.append(first_row[sorted_ids[starts]])
+        key_rows = np.column_stack(key_rows)
+
+        return perm, starts, ends, key_rows
+
     def create_stop_aware_sequences(self, data, target_col=None, feature_cols=None,
                                    route_col='route_id', direction_col='direction_id',
                                    stop_col='stop_id', spatial_organization=True,
@@ -70,7 +150,6 @@ class SequenceCreator:
         Returns:
             tuple: (X配列, y配列, route_direction_stop情報, 使用特徴量リスト, グループ情報)
         """
-        X_all, y_all = [], []
         route_direction_stop_info = []  # route_id + direction_id + stop_id情報を保持
 
         # デフォルト値の設定
@@ -107,80 +186,54 @@ class SequenceCreator:
         print(f"Using features (in spatial order): {available_features}")
 
         # route_id + direction_id + stop_idの組み合わせごとにシーケンスを作成
-        total_sequences = 0
-        processed_stops = 0
-        skipped_stops = 0
+        # 予測モードと学習モードで必要なデータ長が異なる
+        if prediction_mode:
+            # 予測モード: 最新のinput_timesteps分のみ必要
+            min_required_length = self.input_timesteps
+        else:
+            # 学習モード: input + output が必要
+            min_required_length = self.input_timesteps + self.output_timesteps
 
-        for route_id in data[route_col].unique():
-            for direction_id in data[data[route_col] == route_id][direction_col].unique():
-                route_direction_data = data[
-                    (data[route_col] == route_id) & (data[direction_col] == direction_id)
-                ]
-
-                # このroute+directionに含まれるバス停を処理
-                for stop_id in route_direction_data[stop_col].unique():
-                    # 特定のroute_id + direction_id + stop_idのデータを抽出
-                    stop_data = route_direction_data[
-                        route_direction_data[stop_col] == stop_id
-                    ].copy()
-
-                    # 時間順にソート
-                    stop_data = stop_data.sort_values('time_bucket').reset_index(drop=True)
-
-                    route_direction_stop_key = f"{route_id}_{direction_id}_{stop_id}"
-
-                    # 予測モードと学習モードで必要なデータ長が異なる
-                    if prediction_mode:
-                        # 予測モード: 最新のinput_timesteps分のみ必要
-                        min_required_length = self.input_timesteps
-                    else:
-                        # 学習モード: input + output が必要
-                        min_required_length = self.input_timesteps + self.output_timesteps
-
-                    if len(stop_data) >= min_required_length:
-                        # 利用可能な特徴量のみを使用（空間配置順序）
-                        try:
-                            features = stop_data[available_features].values
-
-                            X_stop, y_stop = [], []
-
-                            if prediction_mode:
-                                # 予測モード: 最新のinput_timesteps分のみ使用
-                                X_stop.append(features[-self.input_timesteps:])
-                                # yは空のまま（ダミー値として空配列を追加）
-                                y_stop.append(np.zeros(self.output_timesteps))
-                            else:
-                                # 学習モード: スライディングウィンドウで全シーケンス作成
-                                for i in range(len(features) - self.input_timesteps - self.output_timesteps + 1):
-                                    # 入力シーケンス（過去のデータ）
-                                    X_stop.append(features[i:i+self.input_timesteps])
-
-                                    # 出力シーケンス（予測対象）
-                                    target_start = i + self.input_timesteps
-                                    target_end = target_start + self.output_timesteps
-
-                                    # target_colのインデックスを取得
-                                    target_idx = available_features.index(target_col)
-                                    y_stop.append(features[target_start:target_end, target_idx])
-
-                            if len(X_stop) > 0:
-                                X_stop = np.array(X_stop)
-                                y_stop = np.array(y_stop)
-
-                                X_all.append(X_stop)
-                                y_all.append(y_stop)
-                                route_direction_stop_info.extend([route_direction_stop_key] * len(X_stop))
-
-                                total_sequences += len(X_stop)
-                                processed_stops += 1
-                            else:
-                                skipped_stops += 1
-
-                        except Exception as e:
-                            print(f"Error processing stop {stop_id} on route {route_id} direction {direction_id}: {str(e)}")
-                            skipped_stops += 1
-                    else:
-                        skipped_stops += 1
+        perm, starts, ends, key_rows = self._sort_stop_groups(data, route_col, direction_col, stop_col)
+        lengths = ends - starts
+        eligible = np.flatnonzero(lengths >= min_required_length)
+        processed_stops = len(eligible)
+        skipped_stops = len(starts) - processed_stops
+
+        X_all, y_all = [], []
+        if processed_stops > 0:
+            # 利用可能な特徴量のみを使用（空間配置順序）
+            features = data[available_features].values
+
+            if prediction_mode:
+                # 予測モード: 各バス停の最新のinput_timesteps分のみ使用
+                rows = perm[ends[eligible, None] - self.input_timesteps + np.arange(self.input_timesteps)]
+                X_all.append(features[rows])
+                # yは空のまま（ダミー値としてゼロを追加）
+                y_all.append(np.zeros((processed_stops, self.output_timesteps)))
+                counts = np.ones(processed_stops, dtype=np.int64)
+            else:
+                # 学習モード: スライディングウィンドウで全シーケンス作成
+                window = self.input_timesteps + self.output_timesteps
+                counts = lengths[eligible] - window + 1
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                window_starts = np.repeat(starts[eligible], counts) + offsets
+
+                # (rows - window + 1, features, window) のビュー
+                windows = sliding_window_view(features[perm], window, axis=0)[window_starts]
+                target_idx = available_features.index(target_col)
+                X_all.append(np.ascontiguousarray(windows[:, :, :self.input_timesteps].transpose(0, 2, 1)))
+                y_all.append(np.ascontiguousarray(windows[:, target_idx, self.input_timesteps:]))
+
+            # route_id + direction_id + stop_id情報
+            key_rows = key_rows[eligible]
+            keys = zip(
+                data[route_col].array[key_rows[:, 0]],
+                data[direction_col].array[key_rows[:, 1]],
+                data[stop_col].array[key_rows[:, 2]]
+            )
+            for (route_id, direction_id, stop_id), count in zip(keys, counts):
+                route_direction_stop_info.extend([f"{route_id}_{direction_id}_{stop_id}"] * int(count))
 
         print(f"\nProcessed {processed_stops} stops, skipped {skipped_stops} stops (insufficient data)")
 
@@ -4,8 +4,9 @@ Database Utilities
 データベース操作に関する共通ユーティリティ
 """
 
+import io
 import logging
-from typing import List, Set, Optional
+from typing import Any, Iterable, List, Optional, Sequence, Set
 import pandas as pd
 from sqlalchemy import text, MetaData, Table, Engine
 
@@ -210,3 +211,61 @@ def insert_with_conflict_handling(
     except Exception as e:
         logger.error(f"Error in conflict handling insert for {schema}.{table_name}: {e}")
         raise
+
+
+def format_copy_value(value: Any) -> str:
+    """
+    値をCOPY text形式の1フィールドに変換
+
+    Args:
+        value: 変換する値（NoneはNULL）
+
+    Returns:
+        エスケープ済みの文字列
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text_value = str(value)
+    return (
+        text_value.replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_rows(
+    cursor,
+    table_name: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]]
+) -> int:
+    """
+    行データをCOPY FROM STDINで一括投入
+
+    Args:
+        cursor: psycopg2カーソル
+        table_name: テーブル名（スキーマ修飾可）
+        columns: 投入するカラムのリスト
+        rows: 各行の値のシーケンス
+
+    Returns:
+        投入した行数
+    """
+    buffer = io.StringIO()
+    row_count = 0
+    for row in rows:
+        buffer.write('\t'.join(format_copy_value(value) for value in row))
+        buffer.write('\n')
+        row_count += 1
+
+    if row_count == 0:
+        return 0
+
+    buffer.seek(0)
+    column_list = ', '.join(columns)
+    cursor.copy_expert(f"COPY {table_name} ({column_list}) FROM STDIN", buffer)
+    logger.debug(f"Copied {row_count} rows into {table_name}")
+    return row_count
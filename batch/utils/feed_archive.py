@@ -0,0 +1,405 @@
+"""
+Feed Archive Utilities
+
+GTFS Realtimeフィードの追記型圧縮アーカイブ
+
+フィードごと・1時間ごとのセグメントファイルに、圧縮済みレコードを長さ付きで追記する。
+各セグメントには (ヘッダー時刻, オフセット, 長さ) の固定長エントリを並べたサイドカーインデックスを持ち、
+リーダーはセグメントをメモリマップして時刻で二分探索・順次読み出しができる。
+
+ファイル構成:
+    <archive_dir>/<feed_type>/<YYYYMMDD>/<feed_type>_<YYYYMMDD_HH>.seg  （時刻はUTC）
+    <archive_dir>/<feed_type>/<YYYYMMDD>/<feed_type>_<YYYYMMDD_HH>.idx
+
+セグメント形式:
+    ファイルヘッダー 8バイト: b'GTRA' + バージョン(1) + コーデック(1) + 予約(2)
+    レコード: ヘッダー時刻(int64) + 圧縮データ長(uint32) + 圧縮データ
+"""
+
+import bisect
+import gzip
+import logging
+import mmap
+import os
+import shutil
+import struct
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandardが無い環境ではgzipを使用
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b'GTRA'
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct('<4sBB2x')
+RECORD_HEADER = struct.Struct('<qI')
+INDEX_ENTRY = struct.Struct('<qQI')
+
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {'gzip': CODEC_GZIP, 'zstd': CODEC_ZSTD}
+
+
+def default_codec() -> str:
+    """利用可能な既定コーデック（zstandardがあればzstd）"""
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def _compress(codec: int, data: bytes, level: Optional[int]) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=level or 10).compress(data)
+    return gzip.compress(data, compresslevel=level or 6)
+
+
+def _decompress(codec: int, payload: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed archive segments")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return gzip.decompress(payload)
+
+
+def segment_path(archive_dir: Path, feed_type: str, timestamp: int) -> Path:
+    """
+    ヘッダー時刻に対応するセグメントファイルのパスを取得
+
+    Args:
+        archive_dir: アーカイブのルートディレクトリ
+        feed_type: フィード種別
+        timestamp: フィードヘッダー時刻（UNIX時刻）
+
+    Returns:
+        セグメントファイルのパス
+    """
+    hour = datetime.fromtimestamp(timestamp, timezone.utc)
+    return Path(archive_dir) / feed_type / hour.strftime('%Y%m%d') / f"{feed_type}_{hour.strftime('%Y%m%d_%H')}.seg"
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_suffix('.idx')
+
+
+class FeedArchiveWriter:
+    """フィードアーカイブへの追記クラス"""
+
+    def __init__(self, archive_dir: Path, codec: Optional[str] = None, level: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            archive_dir: アーカイブのルートディレクトリ
+            codec: 'zstd' または 'gzip'（Noneの場合は利用可能な方）
+            level: 圧縮レベル（Noneの場合はコーデックの既定値）
+        """
+        codec = codec or default_codec()
+        if codec not in CODEC_NAMES:
+            raise ValueError(f"Unknown archive codec '{codec}'. Must be one of: {list(CODEC_NAMES)}")
+        if codec == 'zstd' and zstandard is None:
+            raise ValueError("zstd archive codec requires the zstandard package")
+
+        self.archive_dir = Path(archive_dir)
+        self.codec = CODEC_NAMES[codec]
+        self.level = level
+
+    def append(self, feed_type: str, timestamp: int, data: bytes) -> Path:
+        """
+        フィードを1レコードとして追記
+
+        レコード本体を書き込んでからインデックスエントリを追記するため、
+        書き込み途中で停止してもインデックスは完全なレコードのみを指す。
+
+        Args:
+            feed_type: フィード種別
+            timestamp: フィードヘッダー時刻（UNIX時刻）
+            data: 生のprotobufデータ
+
+        Returns:
+            書き込んだセグメントファイルのパス
+        """
+        path = segment_path(self.archive_dir, feed_type, timestamp)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = _compress(self.codec, data, self.level)
+
+        with open(path, 'ab') as segment:
+            if segment.tell() < SEGMENT_HEADER.size:
+                # 新規セグメント（ヘッダーの書き込み途中で停止したものを含む）
+                segment.truncate(0)
+                segment.seek(0)
+                segment.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, self.codec))
+            else:
+                codec = self._segment_codec(path)
+                if codec != self.codec:
+                    # 既存セグメントはそのコーデックで書き続ける
+                    payload = _compress(codec, data, self.level)
+            offset = self._valid_end(path, segment.tell())
+            segment.truncate(offset)
+            segment.seek(offset)
+            segment.write(RECORD_HEADER.pack(timestamp, len(payload)))
+            segment.write(payload)
+            segment.flush()
+            os.fsync(segment.fileno())
+
+        with open(_index_path(path), 'ab') as index:
+            index.write(INDEX_ENTRY.pack(timestamp, offset, len(payload)))
+
+        return path
+
+    @staticmethod
+    def _segment_codec(path: Path) -> int:
+        with open(path, 'rb') as f:
+            magic, version, codec = SEGMENT_HEADER.unpack(f.read(SEGMENT_HEADER.size))
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"Not a feed archive segment: {path}")
+        return codec
+
+    @staticmethod
+    def _valid_end(path: Path, size: int) -> int:
+        """インデックス済みの最後のレコードの終端（中断された書き込みの残骸を切り捨てる位置）"""
+        index_path = _index_path(path)
+        index_size = index_path.stat().st_size if index_path.exists() else 0
+        if index_size < INDEX_ENTRY.size:
+            if size <= SEGMENT_HEADER.size:
+                return size
+            # インデックスが無い場合はレコードを走査して完全なレコードの終端を求める
+            with FeedArchiveReader(path) as reader:
+                entries = reader._scan()
+            FeedArchiveWriter._rebuild_index(index_path, entries)
+            if not entries:
+                return SEGMENT_HEADER.size
+            _, offset, length = entries[-1]
+            return offset + RECORD_HEADER.size + length
+        with open(index_path, 'r+b') as f:
+            # 書き込み途中のインデックスエントリを切り捨てる
+            f.truncate(index_size - index_size % INDEX_ENTRY.size)
+            f.seek(-INDEX_ENTRY.size, os.SEEK_END)
+            _, offset, length = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+        return min(size, offset + RECORD_HEADER.size + length)
+
+    @staticmethod
+    def _rebuild_index(index_path: Path, entries: List[Tuple[int, int, int]]):
+        with open(index_path, 'wb') as f:
+            for entry in entries:
+                f.write(INDEX_ENTRY.pack(*entry))
+
+
+class FeedArchiveReader:
+    """セグメントファイルの読み出しクラス（メモリマップ）"""
+
+    def __init__(self, path: Path):
+        """
+        初期化
+
+        Args:
+            path: セグメントファイルのパス
+        """
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = None
+        if os.fstat(self._file.fileno()).st_size < SEGMENT_HEADER.size:
+            # 作成直後（ヘッダーの書き込み完了前）に停止したセグメントにはレコードがない
+            self.codec = None
+            self._entries = []
+            self._timestamps = []
+            return
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, codec = SEGMENT_HEADER.unpack_from(self._mmap, 0)
+        if magic != SEGMENT_MAGIC:
+            self.close()
+            raise ValueError(f"Not a feed archive segment: {self.path}")
+        self.codec = codec
+        self._entries = self._load_index()
+        self._timestamps = [entry[0] for entry in self._entries]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _load_index(self) -> List[Tuple[int, int, int]]:
+        """サイドカーインデックスを読み込む（無い・壊れている場合はセグメントを走査して再構築）"""
+        index_path = _index_path(self.path)
+        if index_path.exists():
+            with open(index_path, 'rb') as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX_ENTRY.size
+            entries = [entry for entry in INDEX_ENTRY.iter_unpack(raw[:usable])
+                       if entry[1] + RECORD_HEADER.size + entry[2] <= len(self._mmap)]
+            if entries:
+                return sorted(entries)
+        return self._scan()
+
+    def _scan(self) -> List[Tuple[int, int, int]]:
+        entries = []
+        if self._mmap is None:
+            return entries
+        offset = SEGMENT_HEADER.size
+        size = len(self._mmap)
+        while offset + RECORD_HEADER.size <= size:
+            timestamp, length = RECORD_HEADER.unpack_from(self._mmap, offset)
+            if offset + RECORD_HEADER.size + length > size:
+                break  # 書き込み途中のレコード
+            entries.append((timestamp, offset, length))
+            offset += RECORD_HEADER.size + length
+        return sorted(entries)
+
+    def timestamps(self) -> List[int]:
+        """レコードのヘッダー時刻一覧（昇順）"""
+        return list(self._timestamps)
+
+    def seek(self, timestamp: int) -> int:
+        """
+        指定時刻以降の最初のレコード位置を取得
+
+        Args:
+            timestamp: UNIX時刻
+
+        Returns:
+            レコード番号（該当なしの場合はlen(self)）
+        """
+        return bisect.bisect_left(self._timestamps, timestamp)
+
+    def read(self, position: int) -> Tuple[int, bytes]:
+        """
+        レコードを読み出す
+
+        Args:
+            position: レコード番号
+
+        Returns:
+            (ヘッダー時刻, 生のprotobufデータ)
+        """
+        timestamp, offset, length = self._entries[position]
+        start = offset + RECORD_HEADER.size
+        return timestamp, _decompress(self.codec, self._mmap[start:start + length])
+
+    def iter_records(self, since: Optional[int] = None, until: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+        """
+        時刻範囲のレコードを順に読み出す
+
+        Args:
+            since: この時刻以降（Noneの場合は先頭から）
+            until: この時刻以前（Noneの場合は末尾まで）
+
+        Yields:
+            (ヘッダー時刻, 生のprotobufデータ)
+        """
+        position = self.seek(since) if since is not None else 0
+        while position < len(self._entries):
+            if until is not None and self._timestamps[position] > until:
+                break
+            yield self.read(position)
+            position += 1
+
+
+def list_segments(
+    archive_dir: Path,
+    feed_type: str,
+    since: Optional[int] = None,
+    until: Optional[int] = None
+) -> List[Path]:
+    """
+    時刻範囲に重なるセグメントファイルを時刻順に取得
+
+    Args:
+        archive_dir: アーカイブのルートディレクトリ
+        feed_type: フィード種別
+        since: この時刻以降（Noneの場合は制限なし）
+        until: この時刻以前（Noneの場合は制限なし）
+
+    Returns:
+        セグメントファイルのパスのリスト
+    """
+    first = segment_path(archive_dir, feed_type, since).name if since is not None else None
+    last = segment_path(archive_dir, feed_type, until).name if until is not None else None
+    segments = []
+    for path in sorted((Path(archive_dir) / feed_type).glob('*/*.seg')):
+        if (first is not None and path.name < first) or (last is not None and path.name > last):
+            continue
+        segments.append(path)
+    return segments
+
+
+def iter_archive(
+    archive_dir: Path,
+    feed_type: str,
+    since: Optional[int] = None,
+    until: Optional[int] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    アーカイブから時刻範囲のフィードを時刻順に読み出す
+
+    Args:
+        archive_dir: アーカイブのルートディレクトリ
+        feed_type: フィード種別
+        since: この時刻以降（Noneの場合は制限なし）
+        until: この時刻以前（Noneの場合は制限なし）
+
+    Yields:
+        (ヘッダー時刻, 生のprotobufデータ)
+    """
+    for path in list_segments(archive_dir, feed_type, since, until):
+        with FeedArchiveReader(path) as reader:
+            yield from reader.iter_records(since, until)
+
+
+def cleanup_old_segments(archive_dir: Path, days_to_keep: int = 7) -> int:
+    """
+    保持期間を過ぎた日のセグメントディレクトリを削除
+
+    Args:
+        archive_dir: アーカイブのルートディレクトリ
+        days_to_keep: 保持日数
+
+    Returns:
+        削除されたディレクトリ数
+    """
+    archive_dir = Path(archive_dir)
+    if not archive_dir.exists():
+        return 0
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days_to_keep)).strftime('%Y%m%d')
+    deleted_count = 0
+    for day_dir in archive_dir.glob('*/*'):
+        if day_dir.is_dir() and day_dir.name.isdigit() and day_dir.name < cutoff:
+            shutil.rmtree(day_dir)
+            deleted_count += 1
+            logger.debug(f"Deleted archive segments: {day_dir}")
+
+    if deleted_count > 0:
+        logger.info(f"Deleted {deleted_count} archive day directories older than {days_to_keep} days")
+    return deleted_count
+
+
+def archive_stats(archive_dir: Path) -> Dict[str, int]:
+    """
+    アーカイブのセグメント数・レコード数・サイズを集計
+
+    Args:
+        archive_dir: アーカイブのルートディレクトリ
+
+    Returns:
+        segments, records, bytes を含む辞書
+    """
+    stats = {'segments': 0, 'records': 0, 'bytes': 0}
+    for path in Path(archive_dir).glob('*/*/*.seg'):
+        stats['segments'] += 1
+        stats['bytes'] += path.stat().st_size + (_index_path(path).stat().st_size if _index_path(path).exists() else 0)
+        with FeedArchiveReader(path) as reader:
+            stats['records'] += len(reader)
+    return stats
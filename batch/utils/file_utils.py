@@ -5,9 +5,12 @@ File Utilities
 """
 
 import logging
+import os
+import pickle
+import zipfile
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, BinaryIO, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -136,3 +139,50 @@ def ensure_directory(directory: Path, create: bool = True) -> bool:
     except Exception as e:
         logger.error(f"Error ensuring directory {directory}: {e}")
         return False
+
+
+# 状態ファイルの読み込み時に壊れたファイルとして扱う例外（pickle・npz）
+STATE_FILE_ERRORS = (OSError, EOFError, ValueError, KeyError, AttributeError, pickle.UnpicklingError, zipfile.BadZipFile)
+
+
+def read_state_file(
+    path: Optional[Path],
+    description: str,
+    reader: Callable[[BinaryIO], Any] = pickle.load
+) -> Optional[Any]:
+    """
+    実行間で引き継ぐ状態ファイルを読み込む
+
+    Args:
+        path: ファイルパス（Noneの場合は読み込まない）
+        description: ログに出力する状態の名前
+        reader: 開いたファイルから状態を読み込む関数（デフォルトはpickle）
+
+    Returns:
+        読み込んだ状態（ファイルがない・読み込めない場合はNone。読み込めない場合は警告を出力）
+    """
+    if path is None or not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return reader(f)
+    except STATE_FILE_ERRORS as e:
+        logger.warning(f"Could not read {description} from {path} ({e}), starting empty")
+        return None
+
+
+def write_state_file(path: Path, writer: Callable[[BinaryIO], None]):
+    """
+    実行間で引き継ぐ状態ファイルを書き込む
+
+    一時ファイルに書き込んでから置き換えるため、中断されても途中までのファイルは残らない。
+
+    Args:
+        path: ファイルパス
+        writer: 開いたファイルに状態を書き込む関数
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        writer(f)
+    os.replace(tmp_path, path)
@@ -5,7 +5,9 @@ GTFS Bus Delay Prediction Package
 """
 
 # データ接続
-from .data_connection import DatabaseConnector, GTFSDataRetriever, GTFSDataRetrieverV2, WeatherDataRetriever
+from .data_connection import (
+    DatabaseConnector, GTFSDataRetriever, GTFSDataRetrieverV2, GTFSParquetRetriever, WeatherDataRetriever
+)
 
 # データ前処理
 from .data_preprocessing import DataPreprocessor, DataAggregator, FeatureEngineer
@@ -31,6 +33,7 @@ __all__ = [
     'DatabaseConnector',
     'GTFSDataRetriever', 
     'GTFSDataRetrieverV2',
+    'GTFSParquetRetriever',
     'WeatherDataRetriever',
     
     # Data Preprocessing
@@ -6,10 +6,12 @@ from .database_connector import DatabaseConnector
 from .gtfs_data_retriever import GTFSDataRetriever
 from .weather_data_retriever import WeatherDataRetriever
 from .gtfs_data_retriever_v2 import GTFSDataRetrieverV2
+from .gtfs_parquet_retriever import GTFSParquetRetriever
 
 __all__ = [
     'DatabaseConnector',
     'GTFSDataRetriever',
     'WeatherDataRetriever',
-    'GTFSDataRetrieverV2'
+    'GTFSDataRetrieverV2',
+    'GTFSParquetRetriever'
 ]
@@ -9,6 +9,36 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+# get_gtfs_data() が返すカラムのデータ型（Parquetリーダーと共通）
+ANALYTICS_DTYPE_SPEC = {
+    'day_of_week': 'int16',
+    'line_direction_link_order': 'int16',
+    'trip_id': 'str',
+    'stop_id': 'str',
+    'start_date': 'str',
+    'route_id': 'str',
+    'direction_id': 'int8',
+    'arrival_delay': 'float32',
+    'delay_mean_by_stop_datetime': 'float32',
+    'hour_of_day': 'int8',
+    'hour_sin': 'float32',
+    'hour_cos': 'float32',
+    'day_sin': 'float32',
+    'day_cos': 'float32',
+    'is_peak_hour': 'bool',
+    'is_weekend': 'bool',
+    'region_id': 'str',
+    'distance_from_downtown_km': 'float32',
+    'lat_sin': 'float32',
+    'lat_cos': 'float32',
+    'lon_sin': 'float32',
+    'lon_cos': 'float32',
+    'lat_relative': 'float32',
+    'lon_relative': 'float32',
+    'area_density_score': 'float32'
+}
+
+
 class GTFSDataRetrieverV2:
     """GTFSデータ取得用クラス (最適化版)"""
 
@@ -143,33 +173,7 @@ class GTFSDataRetrieverV2:
         print("  [1/3] Executing SQL query...")
 
         # データ型を明示的に指定して高速化
-        dtype_spec = {
-            'day_of_week': 'int16',
-            'line_direction_link_order': 'int16',
-            'trip_id': 'str',
-            'stop_id': 'str',
-            'start_date': 'str',
-            'route_id': 'str',
-            'direction_id': 'int8',
-            'arrival_delay': 'float32',
-            'delay_mean_by_stop_datetime': 'float32',
-            'hour_of_day': 'int8',
-            'hour_sin': 'float32',
-            'hour_cos': 'float32',
-            'day_sin': 'float32',
-            'day_cos': 'float32',
-            'is_peak_hour': 'bool',
-            'is_weekend': 'bool',
-            'region_id': 'str',
-            'distance_from_downtown_km': 'float32',
-            'lat_sin': 'float32',
-            'lat_cos': 'float32',
-            'lon_sin': 'float32',
-            'lon_cos': 'float32',
-            'lat_relative': 'float32',
-            'lon_relative': 'float32',
-            'area_density_score': 'float32'
-        }
+        dtype_spec = ANALYTICS_DTYPE_SPEC
 
         result = self.db_connector.read_sql(
             gtfs_query,
@@ -0,0 +1,247 @@
+"""
+GTFSデータ取得クラス（Parquet版）
+バッチの取り込み時に出力されたParquetデータセットから学習データを取得する
+
+データセット構成（batch.services.ParquetFeedExporter）:
+    <dataset_dir>/feed_type=trip_updates/service_date=YYYYMMDD/part-<header_ts>.parquet
+    <dataset_dir>/feed_type=vehicle_positions/service_date=YYYYMMDD/part-<header_ts>.parquet
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .gtfs_data_retriever_v2 import ANALYTICS_DTYPE_SPEC
+
+# GTFSDataRetrieverV2.get_gtfs_data() と同じカラム順
+ANALYTICS_COLUMNS = [
+    'datetime', 'datetime_60', 'day_of_week', 'line_direction_link_order', 'trip_id', 'stop_id',
+    'start_date', 'route_id', 'direction_id', 'arrival_delay', 'delay_mean_by_stop_datetime',
+    'hour_of_day', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos', 'is_peak_hour', 'is_weekend',
+    'region_id', 'distance_from_downtown_km', 'lat_sin', 'lat_cos', 'lon_sin', 'lon_cos',
+    'lat_relative', 'lon_relative', 'area_density_score'
+]
+
+STOP_FEATURE_COLUMNS = [
+    'stop_id', 'region_id', 'distance_from_downtown_km', 'lat_sin', 'lat_cos', 'lon_sin', 'lon_cos',
+    'lat_relative', 'lon_relative', 'area_density_score'
+]
+
+TIMEZONE = 'America/Vancouver'
+
+
+class GTFSParquetRetriever:
+    """GTFSデータ取得用クラス (Parquet版)"""
+
+    def __init__(self, dataset_dir, db_connector=None, stop_features_path=None):
+        """
+        Args:
+            dataset_dir (str or Path): Parquetデータセットのルートディレクトリ
+            db_connector (DatabaseConnector, optional): 停留所特徴量のキャッシュ作成時のみ使用
+            stop_features_path (str or Path, optional): 停留所特徴量キャッシュのパス
+                （デフォルト: <dataset_dir>/static/stops_enhanced.parquet）
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("GTFSParquetRetriever requires the pyarrow package (pip install pyarrow)") from e
+
+        self.dataset_dir = Path(dataset_dir)
+        self.db_connector = db_connector
+        self.stop_features_path = Path(stop_features_path) if stop_features_path else \
+            self.dataset_dir / 'static' / 'stops_enhanced.parquet'
+        self._stop_features = None
+
+    def _dataset(self, feed_type):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partitioning = ds.partitioning(pa.schema([('service_date', pa.string())]), flavor='hive')
+        return ds.dataset(
+            self.dataset_dir / f'feed_type={feed_type}',
+            format='parquet',
+            partitioning=partitioning
+        )
+
+    def read_feed(self, feed_type, start_date=None, end_date=None, columns=None, row_filter=None):
+        """
+        フィード種別のParquetデータを読み込む（パーティション・述語・カラムのプッシュダウン）
+
+        Args:
+            feed_type (str): 'trip_updates' または 'vehicle_positions'
+            start_date (str, optional): 開始サービス日 (YYYYMMDD形式)
+            end_date (str, optional): 終了サービス日 (YYYYMMDD形式)
+            columns (list, optional): 読み込むカラム（Noneの場合は全カラム）
+            row_filter (pyarrow.compute.Expression, optional): 追加の行フィルター
+
+        Returns:
+            pd.DataFrame: フラット化されたフィードデータ
+        """
+        import pyarrow.dataset as ds
+
+        if not (self.dataset_dir / f'feed_type={feed_type}').exists():
+            raise FileNotFoundError(f"No Parquet data for {feed_type} under {self.dataset_dir}")
+
+        expression = row_filter
+        if start_date is not None:
+            condition = ds.field('service_date') >= start_date
+            expression = condition if expression is None else expression & condition
+        if end_date is not None:
+            condition = ds.field('service_date') <= end_date
+            expression = condition if expression is None else expression & condition
+
+        table = self._dataset(feed_type).to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+
+    def load_stop_features(self, refresh=False):
+        """
+        停留所の地理的特徴量を取得（gtfs_stops_enhanced_mv のキャッシュ）
+
+        Args:
+            refresh (bool): Trueの場合、データベースから再取得してキャッシュを更新
+
+        Returns:
+            pd.DataFrame: 停留所ごとの region_id と地理的特徴量
+        """
+        if self._stop_features is not None and not refresh:
+            return self._stop_features
+
+        if self.stop_features_path.exists() and not refresh:
+            self._stop_features = pd.read_parquet(self.stop_features_path)
+            return self._stop_features
+
+        if self.db_connector is None:
+            raise FileNotFoundError(
+                f"Stop features cache not found: {self.stop_features_path}. "
+                "Pass db_connector to build it from gtfs_static.gtfs_stops_enhanced_mv."
+            )
+
+        print("Building stop features cache from gtfs_stops_enhanced_mv...")
+        stop_features = self.db_connector.read_sql(
+            f"SELECT {', '.join(STOP_FEATURE_COLUMNS)} FROM gtfs_static.gtfs_stops_enhanced_mv"
+        )
+        for col in STOP_FEATURE_COLUMNS[2:]:
+            stop_features[col] = stop_features[col].astype('float32')
+
+        self.stop_features_path.parent.mkdir(parents=True, exist_ok=True)
+        stop_features.to_parquet(self.stop_features_path, index=False)
+        self._stop_features = stop_features
+        return stop_features
+
+    def get_gtfs_data(self, route_id=None, start_date='20250818', end_date=None):
+        """
+        バンクーバー遅延予測用GTFSデータを取得（GTFSDataRetrieverV2.get_gtfs_data と同じカラム）
+
+        gtfs_rt_analytics_mv と同様に、(trip_id, stop_sequence, start_date) ごとに
+        最新のフィードの到着実績を採用し、時系列・地理的特徴量を付与する。
+
+        Args:
+            route_id (str or list): 路線ID（単一文字列または複数IDのリスト）
+            start_date (str): 開始日 (YYYYMMDD形式)
+            end_date (str, optional): 終了日 (YYYYMMDD形式)。指定しない場合は制限なし
+
+        Returns:
+            pd.DataFrame: GTFSデータ
+        """
+        import pyarrow.dataset as ds
+
+        if isinstance(route_id, str):
+            route_id_list = [route_id]
+        elif isinstance(route_id, list):
+            route_id_list = route_id
+        else:
+            route_id_list = None
+
+        print(f"Retrieving Vancouver delay prediction GTFS data for routes: {route_id_list}...")
+        print(f"Date range: {start_date}" + (f" to {end_date}" if end_date else " (no end limit)"))
+        print(f"Data source: Parquet dataset ({self.dataset_dir})")
+
+        start_time = time.time()
+        print("  [1/3] Scanning Parquet dataset...")
+
+        # MVと同じく外れ値・到着時刻なしの行を除外してから最新の更新を選ぶ
+        expression = (
+            ds.field('arrival_time').is_valid()
+            & (ds.field('arrival_delay') >= -3600)
+            & (ds.field('arrival_delay') <= 3600)
+            & (ds.field('start_date') >= start_date)
+        )
+        if end_date is not None:
+            expression = expression & (ds.field('start_date') <= end_date)
+        if route_id_list is not None:
+            expression = expression & ds.field('route_id').isin(route_id_list)
+
+        updates = self.read_feed(
+            'trip_updates',
+            start_date=start_date,
+            end_date=end_date,
+            columns=['feed_timestamp', 'trip_id', 'route_id', 'direction_id', 'start_date',
+                     'stop_id', 'stop_sequence', 'arrival_delay', 'arrival_time'],
+            row_filter=expression
+        )
+
+        scan_time = time.time() - start_time
+        print(f"  [2/3] Scanned {len(updates):,} rows in {scan_time:.2f}s, building features...")
+
+        feature_start = time.time()
+        result = self._build_features(updates)
+
+        print(f"  [3/3] Features built in {time.time() - feature_start:.2f}s")
+        print(f"  Total time: {time.time() - start_time:.2f}s")
+        print(f"Retrieved {len(result):,} records")
+        return result
+
+    def _build_features(self, updates):
+        """
+        stop_time_updatesから gtfs_rt_analytics_mv 相当の特徴量を作成
+
+        Args:
+            updates (pd.DataFrame): read_feed('trip_updates') の結果
+
+        Returns:
+            pd.DataFrame: ANALYTICS_COLUMNS のデータフレーム
+        """
+        # (trip_id, stop_sequence, start_date) ごとに最新のフィードのみ残す
+        latest = (
+            updates.sort_values('feed_timestamp', ascending=False, kind='stable')
+            .drop_duplicates(['trip_id', 'stop_sequence', 'start_date'], keep='first')
+        )
+
+        # 停留所の地理的特徴量（MVと同じく未登録の停留所は除外）
+        df = latest.merge(self.load_stop_features(), on='stop_id', how='inner')
+
+        actual = pd.to_datetime(df['arrival_time'], utc=True)
+        df['datetime'] = actual.dt.tz_convert(TIMEZONE)
+        # バンクーバーのUTCオフセットは整時間なので、UTCで切り捨ててから変換しても同じ
+        df['datetime_60'] = actual.dt.floor('h').dt.tz_convert(TIMEZONE)
+        df['line_direction_link_order'] = df['stop_sequence']
+
+        hour = df['datetime'].dt.hour
+        day_of_week = pd.to_datetime(df['start_date'], format='%Y%m%d').dt.dayofweek + 1  # ISO曜日
+        df['hour_of_day'] = hour
+        df['hour_sin'] = np.sin(2 * np.pi * hour / 24)
+        df['hour_cos'] = np.cos(2 * np.pi * hour / 24)
+        df['day_of_week'] = day_of_week
+        df['day_sin'] = np.sin(2 * np.pi * day_of_week / 7)
+        df['day_cos'] = np.cos(2 * np.pi * day_of_week / 7)
+        df['is_peak_hour'] = hour.isin([7, 8, 17, 18])
+        df['is_weekend'] = day_of_week.isin([6, 7])
+
+        # 停留所・1時間単位の平均遅延
+        df['delay_mean_by_stop_datetime'] = (
+            df.groupby(['stop_id', 'datetime_60'])['arrival_delay'].transform('mean')
+        )
+
+        result = df[ANALYTICS_COLUMNS].copy()
+        for col, dtype in ANALYTICS_DTYPE_SPEC.items():
+            try:
+                result[col] = result[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass  # 変換失敗時はスキップ（例: direction_id の欠損）
+
+        return result.sort_values(
+            ['route_id', 'direction_id', 'start_date', 'trip_id', 'line_direction_link_order'],
+            kind='stable'
+        ).reset_index(drop=True)
@@ -147,7 +147,8 @@ def main():
     # モデル訓練
     history = model_trainer.train_model(
         X_train_reshaped, y_train_scaled,
-        batch_size=32, epochs=50, validation_split=0.2
+        batch_size=32, epochs=50, validation_split=0.2,
+        model_path='best_delay_model.h5'
     )
     
     # ===== 5. 評価・可視化 =====
@@ -185,8 +186,11 @@ def main():
     if history is not None:
         visualizer.plot_training_history(history)
     
-    # モデル保存
+    # モデル保存（標準化パラメータはバッチ予測で再利用するためモデルと同じ場所に保存）
     model_trainer.save_model('delay_prediction_model.h5')
+    for model_path in ('best_delay_model.h5', 'delay_prediction_model.h5'):
+        scaler_path = standardizer.save_scalers(DataStandardizer.scaler_path(model_path))
+        logger.info(f"Scalers saved to {scaler_path}")
     
     logger.info("\n=== パイプライン完了 ===")
     logger.info("結果:")